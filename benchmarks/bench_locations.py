@@ -0,0 +1,103 @@
+"""
+Compares the longest prefix match index against a linear scan of networks
+
+Run with: python -m benchmarks.bench_locations
+"""
+# Standard Library
+import csv
+import math
+import random
+import importlib.resources
+from time import perf_counter
+from ipaddress import IPv4Address, IPv4Network, ip_network
+
+# Local Modules
+from fgpe.ip_index import IPNetworkIndex
+
+
+def load_networks() -> list[tuple[IPv4Network, str]]:
+    csv_path = importlib.resources.files('fgpe') / 'data' / 'Fall_Guys_IP_Networks.csv'
+    with open(csv_path, encoding='utf-8') as f:
+        return [(ip_network(row['IP Network']), row['Location']) for row in csv.DictReader(f)]
+
+
+def scaled_networks(scale: int, seed: int = 0) -> list[tuple[IPv4Network, str]]:
+    """
+    The real networks plus random networks with the same prefix lengths, scale times as many in total
+    """
+    rng = random.Random(seed)
+    networks = load_networks()
+    scaled = list(networks)
+    seen = {network for network, _ in networks}
+    while len(scaled) < len(networks) * scale:
+        template, location = rng.choice(networks)
+        network = IPv4Network((rng.getrandbits(32), template.prefixlen), strict=False)
+        if network not in seen:
+            seen.add(network)
+            scaled.append((network, location))
+    return scaled
+
+
+def random_addresses(networks: list[tuple[IPv4Network, str]], count: int, seed: int = 1) -> list[IPv4Address]:
+    """
+    Half the addresses fall inside a known network, the other half are random
+    """
+    rng = random.Random(seed)
+    addresses = []
+    for i in range(count):
+        if i % 2:
+            network, _ = rng.choice(networks)
+            addresses.append(network.network_address + rng.randrange(network.num_addresses))
+        else:
+            addresses.append(IPv4Address(rng.getrandbits(32)))
+    return addresses
+
+
+def linear_scan(lookup: dict[IPv4Network, str], ip_addr: IPv4Address):
+    for network, location in lookup.items():
+        if ip_addr in network:
+            return location
+    return None
+
+
+def run(scale: int = 100, n_lookups: int = 2_000) -> dict[str, float]:
+    networks = scaled_networks(scale)
+    addresses = random_addresses(networks, n_lookups)
+
+    start = perf_counter()
+    lookup = dict(networks)
+    index: IPNetworkIndex[str] = IPNetworkIndex()
+    for network, location in networks:
+        index.add_network(network, location)
+    build_seconds = perf_counter() - start
+
+    start = perf_counter()
+    for ip_addr in addresses:
+        linear_scan(lookup, ip_addr)
+    scan_seconds = perf_counter() - start
+
+    # A pass takes milliseconds, so the fastest of several is kept
+    index_seconds = math.inf
+    for _ in range(5):
+        start = perf_counter()
+        for ip_addr in addresses:
+            index.lookup(ip_addr)
+        index_seconds = min(index_seconds, perf_counter() - start)
+
+    return {
+        'networks': len(networks),
+        'lookups': n_lookups,
+        'index_build_ms': build_seconds * 1_000,
+        'linear_scan_us_per_lookup': scan_seconds / n_lookups * 1_000_000,
+        'index_us_per_lookup': index_seconds / n_lookups * 1_000_000,
+        'speedup': scan_seconds / index_seconds,
+    }
+
+
+def main():
+    for name, value in run().items():
+        print(f'{name}: {value:,.2f}' if isinstance(value, float) else f'{name}: {value:,}')
+
+
+if __name__ == '__main__':
+    main()
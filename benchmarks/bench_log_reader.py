@@ -0,0 +1,101 @@
+"""
+Times LogReader on synthetic Player.log files of several hundred MB
+
+Compares the previous text mode line by line scan against the byte level
+tail engine for a cold start, a full forward read and small appends.
+
+Run with: python -m benchmarks.bench_log_reader
+"""
+# Standard Library
+import os
+import random
+from pathlib import Path
+from time import perf_counter
+from tempfile import TemporaryDirectory
+
+# Local Modules
+from fgpe.log_reader import LogReader
+
+CONNECT = "[StateConnectToGame] We're connected to the server! Host: {}:{}\n"
+SHUTDOWN = '[FG_UnityInternetNetworkManager] FG_NetworkManager shutdown completed!\n'
+NOISE = [
+    '[GameStateMachine] Replacing FGClient.StatePrivateLobby with FGClient.StateMainMenu\n',
+    'Loaded scene: FallGuy_DoorDash, took 1.2345 seconds\n',
+    '[ClientGameManager] Handling bootstrap for local player FallGuy [42] (FG.Common.MPGNetObject), playerID = 42\n',
+    '    at UnityEngine.Debug.Log (System.Object message) [0x00000] in <00000000000000000000000000000000>:0\n',
+]
+
+
+def write_synthetic_log(path: Path, size_mb: int, lines_per_match: int = 20_000, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    noise = ''.join(rng.choice(NOISE) for _ in range(lines_per_match))
+    with open(path, 'w', newline='') as f:
+        while f.tell() < target:
+            f.write(CONNECT.format(f'10.0.{rng.randrange(256)}.{rng.randrange(256)}', rng.randrange(1024, 65535)))
+            f.write(noise)
+            f.write(SHUTDOWN)
+            f.write(noise)
+        f.write(CONNECT.format('10.1.2.3', 7777))
+
+
+def old_scan(log_location: str) -> tuple[str, str]:
+    """
+    The previous LogReader._update_ip_from_log_file reading from the start of the file
+    """
+    ip_address, port = '0.0.0.0', '0'
+    with open(log_location, errors='ignore') as f:
+        for line in f:
+            if '[FG_UnityInternetNetworkManager] FG_NetworkManager shutdown completed!' in line:
+                ip_address = '0.0.0.0'
+                port = '0'
+            elif "[StateConnectToGame] We're connected to the server!" in line:
+                ip_address, port = line.split()[-1].split(':')
+    return ip_address, port
+
+
+def run(size_mb: int = 300) -> dict[str, float]:
+    results: dict[str, float] = {'size_mb': size_mb}
+    with TemporaryDirectory() as temp_dir:
+        log = Path(temp_dir) / 'Player.log'
+        write_synthetic_log(log, size_mb)
+
+        start = perf_counter()
+        old_scan(str(log))
+        results['old_full_scan_seconds'] = perf_counter() - start
+
+        start = perf_counter()
+        reader = LogReader(str(log))
+        reader.get_connection_details()
+        results['cold_start_ms'] = (perf_counter() - start) * 1_000
+
+        start = perf_counter()
+        forward = LogReader(str(log))
+        forward.file_id = (os.stat(log).st_dev, os.stat(log).st_ino)
+        forward.get_connection_details()
+        results['forward_full_read_seconds'] = perf_counter() - start
+        results['forward_mb_per_second'] = size_mb / results['forward_full_read_seconds']
+
+        start = perf_counter()
+        for _ in range(100):
+            reader.get_connection_details()
+        results['unchanged_tick_us'] = (perf_counter() - start) / 100 * 1_000_000
+
+        append_seconds = 0.0
+        for i in range(100):
+            with open(log, 'a', newline='') as f:
+                f.write(NOISE[i % len(NOISE)] * 10)
+            start = perf_counter()
+            reader.get_connection_details()
+            append_seconds += perf_counter() - start
+        results['append_1kb_tick_us'] = append_seconds / 100 * 1_000_000
+    return results
+
+
+def main():
+    for name, value in run().items():
+        print(f'{name}: {value:,.2f}' if isinstance(value, float) else f'{name}: {value:,}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Times ProcessTracker against scanning every process on each check
+
+Run with: python -m benchmarks.bench_process_tracker
+"""
+# Standard Library
+import os
+from time import perf_counter
+
+# Third Party Modules
+import psutil
+
+# Local Modules
+from fgpe.process_tracker import ProcessTracker
+
+
+def full_scan(name: str) -> bool:
+    """
+    The previous Events._check_process
+    """
+    for process in psutil.process_iter():
+        if process.name() == name:
+            return True
+    return False
+
+
+def run(checks: int = 200) -> dict[str, float]:
+    # Track this process so the tracked check has a PID to follow
+    name = psutil.Process(os.getpid()).name()
+    results: dict[str, float] = {'processes': len(psutil.pids())}
+
+    start = perf_counter()
+    for _ in range(checks):
+        full_scan(name)
+    results['full_scan_us'] = (perf_counter() - start) / checks * 1_000_000
+
+    tracker = ProcessTracker(name)
+    tracker.is_running()
+    start = perf_counter()
+    for _ in range(checks):
+        tracker.is_running()
+    results['tracked_check_us'] = (perf_counter() - start) / checks * 1_000_000
+    results['speedup'] = results['full_scan_us'] / results['tracked_check_us']
+    return results
+
+
+def main():
+    for name, value in run().items():
+        print(f'{name}: {value:,.2f}')
+
+
+if __name__ == '__main__':
+    main()
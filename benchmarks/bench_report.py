@@ -0,0 +1,77 @@
+"""
+Times the stats report over a synthetic multi-million row stats.csv
+
+Run with: python -m benchmarks.bench_report
+"""
+# Standard Library
+import csv
+import random
+from pathlib import Path
+from time import perf_counter
+from tempfile import TemporaryDirectory
+from datetime import datetime, timedelta
+
+# Local Modules
+from fgpe.report import Report
+from fgpe.locations import LocationLookup
+from fgpe.stats_store import STATS_CSV_HEADER
+from benchmarks.bench_locations import load_networks
+
+
+def write_synthetic_stats(path: Path, n_rows: int, n_ips: int = 5_000, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    networks = load_networks()
+    ips = []
+    for _ in range(n_ips):
+        network, _ = rng.choice(networks)
+        ips.append(str(network.network_address + rng.randrange(network.num_addresses)))
+
+    start = datetime(2021, 1, 1)
+    with open(path, 'w', newline='') as f:
+        f.write(STATS_CSV_HEADER + '\r\n')
+        writer = csv.writer(f)
+        rows = []
+        for i in range(n_rows):
+            start_time = (start + timedelta(minutes=i // 4)).strftime('%Y-%m-%d %H:%M:%S')
+            mean = round(rng.lognormvariate(3.5, 0.3), 2)
+            rows.append([start_time, start_time, rng.choice(ips), '7777', rng.randint(5, 200),
+                         mean * 0.8, mean * 1.5, mean, mean, mean * 1.1, mean * 1.2, 1.5, 0.0])
+            if len(rows) == 10_000:
+                writer.writerows(rows)
+                rows.clear()
+        writer.writerows(rows)
+
+
+def run(n_rows: int = 2_000_000) -> dict[str, float]:
+    with TemporaryDirectory() as temp_dir:
+        csv_path = Path(temp_dir) / 'stats.csv'
+        write_synthetic_stats(csv_path, n_rows)
+        size_mb = csv_path.stat().st_size / 1024 / 1024
+
+        locations = LocationLookup()
+        start = perf_counter()
+        report = Report(locations, 'week')
+        report.add_file(csv_path)
+        scan_seconds = perf_counter() - start
+
+        start = perf_counter()
+        report.format()
+        format_seconds = perf_counter() - start
+
+    return {
+        'rows': n_rows,
+        'file_mb': size_mb,
+        'scan_seconds': scan_seconds,
+        'rows_per_second': n_rows / scan_seconds,
+        'aggregate_and_format_seconds': format_seconds,
+        'location_lookups': locations.cache_info().misses,
+    }
+
+
+def main():
+    for name, value in run().items():
+        print(f'{name}: {value:,.2f}' if isinstance(value, float) else f'{name}: {value:,}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Times keeping the per region rollups up to date against rescanning stats.csv for a region's typical ping
+
+Run with: python -m benchmarks.bench_rollups
+"""
+# Standard Library
+import random
+from pathlib import Path
+from time import perf_counter
+from tempfile import TemporaryDirectory
+
+# Local Modules
+from fgpe.report import Report
+from fgpe.rollups import RollupStore
+from fgpe.locations import LocationLookup
+from fgpe.streaming_stats import ConnectionStats
+from benchmarks.bench_report import write_synthetic_stats
+
+
+def run(n_rows: int = 1_000_000, n_sessions: int = 200, seed: int = 0) -> dict[str, float]:
+    rng = random.Random(seed)
+    with TemporaryDirectory() as temp_dir:
+        csv_path = Path(temp_dir) / 'stats.csv'
+        write_synthetic_stats(csv_path, n_rows)
+        locations = LocationLookup()
+
+        start = perf_counter()
+        report = Report(locations, 'month')
+        report.add_file(csv_path)
+        by_region, _, _ = report.aggregates()
+        rescan_seconds = perf_counter() - start
+        region = max(by_region, key=lambda name: by_region[name].sessions)
+
+        store = RollupStore(Path(temp_dir) / 'rollups.json', locations)
+        start = perf_counter()
+        store.rebuild(csv_path)
+        rebuild_seconds = perf_counter() - start
+
+        # A played session of a few hundred pings, ended in to the rebuilt store
+        ips = list(report.ip_locations)
+        sessions = []
+        for _ in range(n_sessions):
+            session = ConnectionStats()
+            for _ in range(300):
+                session.add(rng.lognormvariate(3.5, 0.3))
+            sessions.append((rng.choice(ips), session))
+        start = perf_counter()
+        for ip, session in sessions:
+            store.add_session(ip, session)
+        add_session_us = (perf_counter() - start) / n_sessions * 1_000_000
+        store.close()
+
+        # What typical() works out after each session ends, repeated as one call is only microseconds
+        sketch = store.regions[region].sketch
+        start = perf_counter()
+        for _ in range(1_000):
+            sketch.quantile(0.5)
+            sketch.quantile(0.9)
+        typical_us = (perf_counter() - start) * 1_000
+
+    return {
+        'rows': n_rows,
+        'rescan_seconds': rescan_seconds,
+        'rebuild_seconds': rebuild_seconds,
+        'add_session_us': add_session_us,
+        'typical_us': typical_us,
+        'typical_speedup': rescan_seconds * 1_000_000 / typical_us,
+    }
+
+
+def main():
+    for name, value in run().items():
+        print(f'{name}: {value:,.2f}' if isinstance(value, float) else f'{name}: {value:,}')
+
+
+if __name__ == '__main__':
+    main()
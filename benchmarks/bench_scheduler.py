@@ -0,0 +1,82 @@
+"""
+Simulates an hour with the game not running, and the start of a match, on a fake clock
+
+Compares the adaptive scheduler with the fixed one second updates it replaced.
+
+Run with: python -m benchmarks.bench_scheduler
+"""
+# Standard Library
+from pathlib import Path
+from time import process_time
+from tempfile import TemporaryDirectory
+
+# Local Modules
+from fgpe.stats import Stats
+from fgpe.scheduler import Scheduler
+from fgpe.stats_store import CSVStatsStore
+from fgpe.__main__ import Events, LOG_INTERVAL, NEW_CONNECTION_PROBE_INTERVAL
+
+FIXED_PROBE_INTERVAL = 5.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def idle_hour(temp_dir: Path, name: str, fixed: bool) -> tuple[int, float]:
+    """
+    Wakeups and CPU seconds for an hour of updates with no game log
+    """
+    clock = FakeClock()
+    stats = Stats(store=CSVStatsStore(temp_dir / f'{name}.csv'))
+    events = Events(log_location=str(temp_dir / 'missing' / 'Player.log'), stats=stats, scheduler=Scheduler(clock))
+    events.has_first_run = True
+    if fixed:
+        events.scheduler.add(events.clients[0].log_timer, LOG_INTERVAL)
+
+    start = process_time()
+    while clock.now < 60 * 60:
+        wait_time, _ = events.update_text()
+        clock.now += wait_time / 1_000
+    cpu_seconds = process_time() - start
+    events.shutdown()
+    return events.scheduler.wakeups, cpu_seconds
+
+
+def probes_in_first_minute() -> int:
+    clock = FakeClock()
+    scheduler = Scheduler(clock)
+    scheduler.add('probe', NEW_CONNECTION_PROBE_INTERVAL, FIXED_PROBE_INTERVAL, backoff=1.5, wakes=False)
+    probes = 0
+    while clock.now < 60:
+        probes += 1
+        clock.now += scheduler.interval('probe')
+        scheduler.ran('probe', active=False)
+    return probes
+
+
+def run() -> dict[str, float]:
+    with TemporaryDirectory() as temp_dir:
+        adaptive_wakeups, adaptive_cpu = idle_hour(Path(temp_dir), 'adaptive', fixed=False)
+        fixed_wakeups, fixed_cpu = idle_hour(Path(temp_dir), 'fixed', fixed=True)
+    return {
+        'idle_wakeups_per_hour': adaptive_wakeups,
+        'fixed_idle_wakeups_per_hour': fixed_wakeups,
+        'idle_cpu_ms_per_hour': adaptive_cpu * 1_000,
+        'fixed_idle_cpu_ms_per_hour': fixed_cpu * 1_000,
+        'first_minute_probes': probes_in_first_minute(),
+        'fixed_first_minute_probes': int(60 / FIXED_PROBE_INTERVAL),
+    }
+
+
+def main():
+    for name, value in run().items():
+        print(f'{name}: {value:,.4f}' if isinstance(value, float) else f'{name}: {value:,}')
+
+
+if __name__ == '__main__':
+    main()
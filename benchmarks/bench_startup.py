@@ -0,0 +1,58 @@
+"""
+Compares parsing the IP network CSV against loading the compiled binary index
+
+Run with: python -m benchmarks.bench_startup
+"""
+# Standard Library
+import csv
+from pathlib import Path
+from time import perf_counter
+from tempfile import TemporaryDirectory
+
+# Local Modules
+from fgpe.locations import FallGuysLocation, read_ip_network_csv
+from fgpe.ip_index import read_index_cache, write_index_cache
+from benchmarks.bench_locations import scaled_networks
+
+
+def write_scaled_csv(path: Path, scale: int) -> None:
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Fall Guys Region', 'IP Network', 'Location', 'Provider'])
+        for network, location in scaled_networks(scale):
+            writer.writerow(['Region', str(network), location, 'Provider'])
+
+
+def best_of(repeat: int, func) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+
+def run(scales: tuple[int, ...] = (1, 100), repeat: int = 5) -> dict[str, float]:
+    results = {}
+    with TemporaryDirectory() as temp_dir:
+        for scale in scales:
+            csv_path = Path(temp_dir) / f'networks_{scale}.csv'
+            cache_path = Path(temp_dir) / f'networks_{scale}.idx'
+            write_scaled_csv(csv_path, scale)
+            write_index_cache(cache_path, 'key', read_ip_network_csv(csv_path))
+
+            csv_seconds = best_of(repeat, lambda: read_ip_network_csv(csv_path))
+            cache_seconds = best_of(repeat, lambda: read_index_cache(cache_path, 'key', FallGuysLocation._make))
+            results[f'x{scale}_csv_parse_ms'] = csv_seconds * 1_000
+            results[f'x{scale}_index_load_ms'] = cache_seconds * 1_000
+            results[f'x{scale}_speedup'] = csv_seconds / cache_seconds
+    return results
+
+
+def main():
+    for name, value in run().items():
+        print(f'{name}: {value:,.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Compares the fixed memory streaming statistics against exact statistics over a full list of pings
+
+Run with: python -m benchmarks.bench_stats
+"""
+# Standard Library
+import random
+import tracemalloc
+from time import perf_counter
+from statistics import mean, median, quantiles
+
+# Local Modules
+from fgpe.streaming_stats import ConnectionStats
+
+
+def ping_samples(n: int, seed: int = 0) -> list[float]:
+    """
+    Log normal pings around 35ms with occasional spikes
+    """
+    rng = random.Random(seed)
+    return [rng.lognormvariate(3.5, 0.3) * (5 if rng.random() < 0.01 else 1) for _ in range(n)]
+
+
+def old_tick(pings: list[float], avg_size: int = 10) -> tuple[float, float, float]:
+    """
+    What the previous Stats.stats_string computed each tick
+    """
+    return max(pings), min(pings), float(mean(pings[-avg_size:]))
+
+
+def run(n_samples: int = 1_000_000) -> dict[str, float]:
+    samples = ping_samples(n_samples)
+
+    tracemalloc.start()
+    start = perf_counter()
+    session = ConnectionStats()
+    for sample in samples:
+        session.add(sample)
+        session.recent.mean
+    streaming_seconds = perf_counter() - start
+    streaming_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = perf_counter()
+    sketch_quantiles = [session.quantile(q) for q in (0.5, 0.75, 0.9)]
+    sketch_seconds = perf_counter() - start
+
+    tracemalloc.start()
+    pings: list[float] = []
+    for sample in samples:
+        pings.append(sample)
+    list_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Old per tick cost once the list holds every sample
+    start = perf_counter()
+    old_tick(pings)
+    old_tick_seconds = perf_counter() - start
+
+    start = perf_counter()
+    exact_quantiles = [median(pings), quantiles(pings, method='inclusive')[-1], quantiles(pings, n=10, method='inclusive')[-1]]
+    exact_seconds = perf_counter() - start
+
+    results = {
+        'samples': n_samples,
+        'streaming_us_per_tick': streaming_seconds / n_samples * 1_000_000,
+        'list_us_per_tick_at_end': old_tick_seconds * 1_000_000,
+        'streaming_memory_kb': streaming_bytes / 1024,
+        'list_memory_kb': list_bytes / 1024,
+        'sketch_quantiles_ms': sketch_seconds * 1_000,
+        'exact_quantiles_ms': exact_seconds * 1_000,
+        'mean_abs_error': abs(session.mean - mean(pings)),
+    }
+    for name, sketch_value, exact_value in zip(('p50', 'p75', 'p90'), sketch_quantiles, exact_quantiles):
+        results[f'{name}_relative_error'] = abs(sketch_value - exact_value) / exact_value
+    return results
+
+
+def main():
+    for name, value in run().items():
+        print(f'{name}: {value:,.4f}' if isinstance(value, float) else f'{name}: {value:,}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Times a full Events.update_text tick with the ping and process checks stubbed out
+
+The scheduler runs on a fake clock moved on by each tick's wait, so every
+tick is a wakeup with the log timer due, as it is once a second while
+connected. Ticks between wakeups, when nothing is due, are timed apart.
+
+Run with: python -m benchmarks.bench_tick
+"""
+# Standard Library
+import threading
+from pathlib import Path
+from time import perf_counter
+from statistics import quantiles
+from tempfile import TemporaryDirectory
+
+# Local Modules
+from fgpe.stats import Stats
+from fgpe.__main__ import Events
+from fgpe.pinger import PingConnect
+from fgpe.ping_worker import PingWorker
+from fgpe.scheduler import Scheduler
+from fgpe.stats_store import CSVStatsStore
+from fgpe.instrumentation import Instrumentation
+
+CONNECT = "[StateConnectToGame] We're connected to the server! Host: {}:7777\n"
+# Far faster than real probing, but slow enough that eight stub pingers don't starve the updates of the GIL
+PROBE_INTERVAL = 0.001
+
+
+class StubPinger:
+    def __init__(self, ip_address: str):
+        self.ip_address = ip_address
+
+    def get_ping_time(self) -> tuple[PingConnect, float]:
+        return PingConnect.CONNECTED, 42.0
+
+
+class StubProcessTracker:
+    def is_running(self) -> bool:
+        return True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def time_ticks(events: Events, clock: FakeClock, ticks: int, due: bool = True) -> list[float]:
+    timings = []
+    for _ in range(ticks):
+        start = perf_counter()
+        wait_time, _ = events.update_text()
+        timings.append(perf_counter() - start)
+        if due:
+            clock.now += wait_time / 1_000
+    return timings
+
+
+def run(ticks: int = 20_000) -> dict[str, float]:
+    results: dict[str, float] = {}
+    with TemporaryDirectory() as temp_dir:
+        log = Path(temp_dir) / 'Player.log'
+        log.write_text('Some other log line\n' * 1_000 + CONNECT.format('129.227.152.1'))
+
+        for name, instrumentation in (('tick', Instrumentation()), ('tick_instrumented', Instrumentation(enabled=True))):
+            clock = FakeClock()
+            stats = Stats(store=CSVStatsStore(Path(temp_dir) / f'{name}.csv'))
+            events = Events(log_location=str(log), instrumentation=instrumentation, stats=stats,
+                            scheduler=Scheduler(clock))
+            events.has_first_run = True
+            events.process_tracker = StubProcessTracker()  # type: ignore
+            events.ping_worker = PingWorker(interval=PROBE_INTERVAL, pinger_factory=StubPinger)  # type: ignore
+
+            # Warm up until samples are flowing and the location is cached
+            while not events.update_text()[1].startswith('Region='):
+                clock.now += 1
+            timings = time_ticks(events, clock, ticks)
+            not_due_timings = time_ticks(events, clock, ticks, due=False)
+            events.shutdown()
+
+            results[f'{name}_mean_us'] = sum(timings) / len(timings) * 1_000_000
+            results[f'{name}_99th_us'] = quantiles(timings, n=100)[98] * 1_000_000
+            results[f'{name}_not_due_mean_us'] = sum(not_due_timings) / len(not_due_timings) * 1_000_000
+
+        # Several clients, each with its own log and server, share one ping pool so threads stay fixed as
+        # clients are added
+        n_clients = 8
+        stats = Stats(store=CSVStatsStore(Path(temp_dir) / 'clients.csv'))
+        log_locations = {}
+        for number in range(n_clients):
+            client_log = Path(temp_dir) / f'Player {number}.log'
+            client_log.write_text('Some other log line\n' * 1_000 + CONNECT.format(f'129.227.152.{number + 1}'))
+            log_locations[f'Client {number}'] = str(client_log)
+        clock = FakeClock()
+        events = Events(stats=stats, log_locations=log_locations, scheduler=Scheduler(clock))
+        events.has_first_run = True
+        events.process_tracker = StubProcessTracker()  # type: ignore
+        assert events.ping_pool is not None
+        events.ping_pool.pinger_factory = StubPinger  # type: ignore
+        for client in events.clients:
+            client.probe_interval = PROBE_INTERVAL
+        while events.update_text()[1].count('Region=') < n_clients:
+            clock.now += 1
+        threads = threading.active_count()
+        timings = time_ticks(events, clock, ticks // n_clients)
+        events.shutdown()
+
+        per_client_us = sum(timings) / len(timings) * 1_000_000 / n_clients
+        results[f'tick_{n_clients}_clients_mean_us'] = per_client_us * n_clients
+        results[f'tick_{n_clients}_clients_per_client_us'] = per_client_us
+        # Above 1 while a client costs less than a tick with one client, the work they share counted once
+        results[f'tick_{n_clients}_clients_speedup'] = results['tick_mean_us'] / per_client_us
+        results[f'{n_clients}_clients_threads'] = threads
+    return results
+
+
+def main():
+    for name, value in run().items():
+        print(f'{name}: {value:,.2f}')
+
+
+if __name__ == '__main__':
+    main()
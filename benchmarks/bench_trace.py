@@ -0,0 +1,70 @@
+"""
+Times recording samples to a trace and replaying a synthetic trace of many sessions
+
+Run with: python -m benchmarks.bench_trace
+"""
+# Standard Library
+import random
+from pathlib import Path
+from time import perf_counter
+from tempfile import TemporaryDirectory
+
+# Local Modules
+from fgpe.pinger import PingConnect
+from fgpe.ping_worker import PingSample
+from fgpe.locations import LocationLookup
+from fgpe.log_reader import ServerState, ConnectionDetails
+from fgpe.trace import RECORD, TraceRecorder, replay
+
+SERVERS = [ConnectionDetails(f'129.227.{i}.{j}', '7777') for i in range(4) for j in range(1, 26)]
+
+
+def write_trace(path: Path, n_samples: int, samples_per_session: int = 600, seed: int = 0) -> None:
+    """
+    Sessions of one sample a second on random servers, with 1% loss
+    """
+    rng = random.Random(seed)
+    trace = TraceRecorder(path, flush_interval=float('inf'))
+    timestamp = 0.0
+    trace.process(True, timestamp)
+    for sample_number in range(n_samples):
+        if sample_number % samples_per_session == 0:
+            connection = rng.choice(SERVERS)
+            trace.log_event(ServerState.CONNECTED, connection, timestamp)
+        timestamp += 1
+        if rng.random() < 0.01:
+            trace.ping(PingSample(timestamp, connection, PingConnect.NOT_CONNECTED, None))
+        else:
+            trace.ping(PingSample(timestamp, connection, PingConnect.CONNECTED, rng.lognormvariate(3.5, 0.3)))
+    trace.process(False, timestamp)
+    trace.close()
+
+
+def run(n_samples: int = 1_000_000) -> dict[str, float]:
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / 'trace.bin'
+        start = perf_counter()
+        write_trace(path, n_samples)
+        record_seconds = perf_counter() - start
+
+        locations = LocationLookup()
+        locations.ip_network_index
+        result = replay(path, locations=locations)
+        return {
+            'records': result.records,
+            'record_size_bytes': RECORD.size,
+            'trace_mb': path.stat().st_size / 1024 / 1024,
+            'record_us': record_seconds / result.records * 1_000_000,
+            'replay_seconds': result.seconds,
+            'replay_records_per_second': result.records_per_second,
+            'sessions': len(result.sessions),
+        }
+
+
+def main():
+    for name, value in run().items():
+        print(f'{name}: {value:,.4f}' if isinstance(value, float) else f'{name}: {value:,}')
+
+
+if __name__ == '__main__':
+    main()
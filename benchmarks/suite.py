@@ -0,0 +1,157 @@
+"""
+Runs the benchmarks with fixed seeds and sizes, writes the results to JSON and compares them with a stored baseline
+
+Needs no network and runs on Linux. Each benchmark runs several times and
+the median of each metric is kept. Speedups compare two timings taken on the
+same machine in the same run, so only they are checked against the baseline
+by default, and the suite exits with status 1 if one regressed by more than
+its tolerance. Absolute timings are only checked with --gate-timings, which
+is meaningful when the baseline was made on the same machine.
+
+Run with: python -m benchmarks.suite [--update-baseline]
+"""
+# Standard Library
+import sys
+import json
+import argparse
+import platform
+from pathlib import Path
+from datetime import datetime
+from statistics import median
+from typing import Any, Callable, Optional
+
+# Local Modules
+from . import (
+    bench_locations, bench_log_reader, bench_report, bench_rollups, bench_scheduler, bench_startup, bench_stats,
+    bench_tick, bench_trace,
+)
+
+BASELINE_PATH = Path(__file__).parent / 'baseline.json'
+
+# Sizes are smaller than each module's defaults so the whole suite runs in well under a minute
+BENCHMARKS: dict[str, Callable[[], dict[str, float]]] = {
+    'locations': lambda: bench_locations.run(scale=100, n_lookups=2_000),
+    'startup': lambda: bench_startup.run(scales=(1, 100), repeat=3),
+    'log_reader': lambda: bench_log_reader.run(size_mb=50),
+    'stats': lambda: bench_stats.run(n_samples=200_000),
+    'report': lambda: bench_report.run(n_rows=200_000),
+    'rollups': lambda: bench_rollups.run(n_rows=200_000),
+    'tick': lambda: bench_tick.run(ticks=10_000),
+    'scheduler': bench_scheduler.run,
+    'trace': lambda: bench_trace.run(n_samples=200_000),
+}
+
+LOWER_IS_BETTER = ('_ms', '_us', '_seconds')
+HIGHER_IS_BETTER = ('speedup', '_per_second')
+# Ratios of two timings from the same run, comparable across machines
+RATIOS = ('speedup',)
+
+# Tolerances for metrics noisier than the default allows, as a fraction
+TOLERANCES = {
+    # Index lookups take a few microseconds, varying by up to half between processes on the same machine
+    'locations.speedup': 0.5,
+    # Four orders of magnitude, and both sides vary between processes, only a large change matters
+    'rollups.typical_speedup': 0.5,
+    # Parsing the unscaled CSV takes about a millisecond, so the ratio moves with a single slow read
+    'startup.x1_speedup': 0.5,
+    # Eight clients' stub pingers share the GIL with the updates, so both sides of the ratio move with the load
+    'tick.tick_8_clients_speedup': 0.5,
+}
+
+
+def direction(metric: str) -> int:
+    """
+    1 if a larger value is a regression, -1 if a smaller value is, 0 if the metric isn't a timing
+    """
+    if metric.endswith(HIGHER_IS_BETTER):
+        return -1
+    if metric.endswith(LOWER_IS_BETTER):
+        return 1
+    return 0
+
+
+def run_suite(names: Optional[list[str]] = None, repeat: int = 3) -> dict[str, Any]:
+    """
+    Run each benchmark repeat times and keep the median of each metric
+    """
+    results = {}
+    for name, benchmark in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        print(f'Running {name}...', file=sys.stderr)
+        runs = [benchmark() for _ in range(repeat)]
+        results[name] = {metric: median(run[metric] for run in runs) for metric in runs[0]}
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float, timings: bool = False) -> list[str]:
+    """
+    Describe each ratio, and each timing if timings, that is worse than the baseline by more than its tolerance
+
+    Tolerances are fractions, tolerance unless the metric is in TOLERANCES.
+    """
+    regressions = []
+    for name, metrics in results['results'].items():
+        baseline_metrics = baseline['results'].get(name, {})
+        for metric, value in metrics.items():
+            sign = direction(metric)
+            baseline_value = baseline_metrics.get(metric)
+            if not sign or not baseline_value or not (timings or metric.endswith(RATIOS)):
+                continue
+            change = (value - baseline_value) / baseline_value
+            if change * sign > TOLERANCES.get(f'{name}.{metric}', tolerance):
+                regressions.append(f'{name}.{metric}: {baseline_value:,.4g} -> {value:,.4g} ({change:+.0%})')
+    return regressions
+
+
+def main(args=None) -> None:
+    parser = argparse.ArgumentParser(prog='benchmarks.suite', description='Run the benchmark suite')
+    parser.add_argument('names', nargs='*', metavar='NAME',
+                        help=f'Only run these benchmarks: {", ".join(BENCHMARKS)}')
+    parser.add_argument('--output', type=Path, default=Path('bench_results.json'))
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Fraction a metric may be worse than the baseline before it is a regression')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of each benchmark, the median is kept')
+    parser.add_argument('--gate-timings', action='store_true',
+                        help='Also fail on absolute timings, only meaningful against a baseline from this machine')
+    parser.add_argument('--update-baseline', action='store_true', help='Save the results as the new baseline')
+    parsed = parser.parse_args(args)
+    unknown = set(parsed.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(sorted(unknown))}')
+
+    if parsed.repeat < 1:
+        parser.error('--repeat must be at least 1')
+
+    results = run_suite(parsed.names, parsed.repeat)
+    parsed.output.write_text(json.dumps(results, indent=2) + '\n')
+    for name, metrics in results['results'].items():
+        for metric, value in metrics.items():
+            print(f'{name}.{metric}: {value:,.4f}' if isinstance(value, float) else f'{name}.{metric}: {value:,}')
+
+    if parsed.update_baseline:
+        parsed.baseline.write_text(json.dumps(results, indent=2) + '\n')
+        print(f'Baseline written to {parsed.baseline}')
+        return
+
+    if not parsed.baseline.exists():
+        print(f'No baseline at {parsed.baseline}, run with --update-baseline to create one')
+        return
+
+    regressions = compare(results, json.loads(parsed.baseline.read_text()), parsed.tolerance, parsed.gate_timings)
+    if regressions:
+        print(f'{len(regressions)} regressions against {parsed.baseline}:')
+        for regression in regressions:
+            print(f'  {regression}')
+        sys.exit(1)
+    print(f'No regressions against {parsed.baseline}')
+
+
+if __name__ == '__main__':
+    main()
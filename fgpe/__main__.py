@@ -1,141 +1,284 @@
 # Standard Library
-import os
 import sys
-import csv
-import time
-import shutil
 import logging
+import argparse
 from pathlib import Path
-from typing import Optional
+from functools import partial
+from typing import Callable, Optional, TextIO
 from os.path import expandvars
-from datetime import datetime, timezone
-from tempfile import TemporaryDirectory
-
-# Third Party Modules
-import psutil
-import requests
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry  # type: ignore
 
 # Local Modules
 from .stats import Stats
-from .pinger import Pinger, PingConnect
-from .overlay import Overlay, GracefulExit
-from .locations import LocationLookup, UNKNOWN_LOCATION
+from .stats_store import CSVStatsStore, MultiStatsStore, SQLiteStatsStore
+from .pinger import Pinger, PingConnect, PROBE_BACKENDS
+from .ping_worker import PingPool, PingWorker, PingSample, StreamingPingWorker
+from .exceptions import GracefulExit
+from .instrumentation import Instrumentation
+from .process_tracker import ProcessTracker
+from .ip_updater import IPNetworkUpdater
+from .rollups import RollupStore, format_typical
+from .scheduler import Scheduler
+from .survey import RegionSurvey, format_survey, representative_hosts
+from .locations import LocationLookup, FallGuysLocation, UNKNOWN_LOCATION
 from .log_reader import LogReader, ServerState, ConnectionDetails
 
 # Logger
 logger = logging.getLogger(__name__)
 
 # Globals
-IP_URL = 'https://raw.githubusercontent.com/notatallshaw/fall_guys_ping_estimate/main/fgpe/data/Fall_Guys_IP_Networks.csv'
-API_URL = 'https://api.github.com/repos/notatallshaw/fall_guys_ping_estimate/commits?path=fgpe%2Fdata%2FFall_Guys_IP_Networks.csv'
 DATA_DIRECTORY = expandvars(r'%APPDATA%\fgpe')
 
+# Seconds between updates while connected or the log is being written, backing off to the idle interval otherwise
+LOG_INTERVAL = 1.0
+IDLE_LOG_INTERVAL = 10.0
+# Seconds between checks for the game process once the log goes quiet, backing off while the game isn't running
+PROCESS_INTERVAL = 10.0
+IDLE_PROCESS_INTERVAL = 60.0
+# Seconds between probes right after joining a server, relaxing to the ping worker's interval
+NEW_CONNECTION_PROBE_INTERVAL = 1.0
+LOCATION_INTERVAL = 60.0
+
+
+class Client:
+    """
+    The log, pings and stats session of one game client, and the names of its timers
+    """
+    def __init__(self, name: str, reader: LogReader, stats: Stats, ping_worker: PingWorker, number: int = 0):
+        self.name = name
+        self.reader = reader
+        self.stats = stats
+        self.ping_worker = ping_worker
+        # Probing is this often once a new connection has settled
+        self.probe_interval = ping_worker.interval
+        self.current_connection: Optional[ConnectionDetails] = None
+        self.last_ping_status: Optional[PingConnect] = None
+        self.location: Optional[FallGuysLocation] = None
+        # Shown until the client's log timer is next due
+        self.text = ''
+        self.log_timer = f'log {number}'
+        self.probe_timer = f'probe {number}'
+        self.location_timer = f'location {number}'
+        # Start probing as soon as the log shows a new connection rather than on the next update
+        self.reader.add_listener(self._on_connection_change)
+
+    def _on_connection_change(self, status: ServerState, connection: ConnectionDetails) -> None:
+        if status == ServerState.CONNECTED:
+            self.ping_worker.start(connection)
+
+    def clear_connection(self) -> None:
+        self.ping_worker.stop()
+        self.stats.end_session(self.current_connection)
+        self.current_connection = None
+        self.last_ping_status = None
+        self.location = None
+
+    def shutdown(self) -> None:
+        self.reader.stop_watching()
+        self.ping_worker.stop()
+        self.stats.end_session(self.current_connection)
+
 
 class Events:
     """
-    This the main logic that is called by the GUIs event loop
+    This the main logic that is called by the GUIs event loop, or the headless loop
+
+    Each log location is a client with its own log reader, pings and stats session. With more than one client their
+    pings share a PingPool and the text shows a line per client. Sample listeners are called with every ping sample, the
+    location of its server and the name of its client. With a trace recorder every change in the log and game process,
+    and every sample, is recorded so the session can be replayed
     """
-    def __init__(self, exit_after_n_updates=None):
-        self.reader = LogReader()
-        self.stats = Stats()
+    def __init__(self, exit_after_n_updates=None, streaming_ping=False, probe='ping', burst_size=1, stats_db=False,
+                 log_location=None, instrumentation: Optional[Instrumentation] = None, show_timings=False,
+                 stats: Optional[Stats] = None, survey=False, survey_port=None, trace=None,
+                 log_locations: Optional[dict[str, Optional[str]]] = None, graph=False,
+                 scheduler: Optional[Scheduler] = None):
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self.show_timings = show_timings and self.instrumentation.enabled
+        if log_locations is None:
+            log_locations = {'': log_location}
+        if trace is not None and len(log_locations) > 1:
+            raise ValueError('A trace can only record one client')
+        if stats is not None:
+            self.stats_store = stats.store
+        elif stats_db:
+            # stats.csv is still written so the report and rollup rebuild see every session
+            self.stats_store = MultiStatsStore(
+                CSVStatsStore(Path(DATA_DIRECTORY) / 'stats.csv'),
+                SQLiteStatsStore(Path(DATA_DIRECTORY) / 'stats.db'),
+            )
+        else:
+            self.stats_store = None
         self.locations = LocationLookup()
-        self.current_connection: Optional[ConnectionDetails] = None
+        # Typical pings per region come from the given stats, or from rollups.json next to stats.csv
+        self.rollups: Optional[RollupStore] = (
+            stats.rollups if stats is not None else RollupStore(Path(DATA_DIRECTORY) / 'rollups.json', self.locations)
+        )
+        self.process_tracker = ProcessTracker()
+        self.ip_updater = IPNetworkUpdater(self.locations)
+        self.ping_pool: Optional[PingPool] = None
+        if len(log_locations) > 1 and not (streaming_ping and probe == 'ping'):
+            self.ping_pool = PingPool(
+                pinger_factory=partial(Pinger, backend=PROBE_BACKENDS[probe]()),
+                burst_size=burst_size,
+                instrumentation=self.instrumentation,
+            )
+
+        self.clients: list[Client] = []
+        for name, location in log_locations.items():
+            # Clients share one store so their sessions are written to one stats file, but each has its own
+            # sessions so two clients on the same server don't merge in to one
+            if stats is None:
+                client_stats = Stats(store=self.stats_store, rollups=self.rollups)
+                self.stats_store = client_stats.store
+            elif not self.clients:
+                client_stats = stats
+            else:
+                client_stats = Stats(stats.avg_size, store=stats.store, rollups=stats.rollups)
+            if self.ping_pool is not None:
+                ping_worker: PingWorker = self.ping_pool.worker()
+            elif streaming_ping and probe == 'ping':
+                ping_worker = StreamingPingWorker()
+            else:
+                ping_worker = PingWorker(
+                    pinger_factory=partial(Pinger, backend=PROBE_BACKENDS[probe]()),
+                    burst_size=burst_size,
+                    instrumentation=self.instrumentation,
+                )
+            self.clients.append(Client(name, LogReader(location), client_stats, ping_worker, len(self.clients)))
+
+        # Updates wake up only when a timer is due, and back off while the game is idle or not running
+        self.scheduler = scheduler if scheduler is not None else Scheduler()
+        self.scheduler.add('process', PROCESS_INTERVAL, IDLE_PROCESS_INTERVAL, wakes=False)
+        for client in self.clients:
+            self.scheduler.add(client.log_timer, LOG_INTERVAL, IDLE_LOG_INTERVAL)
+            self.scheduler.add(client.location_timer, LOCATION_INTERVAL, wakes=False)
+            client.reader.add_listener(partial(self._on_log_change, client))
+        # Called from the log watcher thread when a client's log timer is reset, so the loop can update early
+        self.wake_listeners: list[Callable[[], None]] = []
+
+        self.survey: Optional[RegionSurvey] = None
+        if survey:
+            self.survey = RegionSurvey(
+                lambda: representative_hosts(self.locations.ip_network_index),
+                backend=PROBE_BACKENDS[probe](),
+                port=survey_port,
+            )
+        for client in self.clients:
+            client.reader.watch()
+        self.sample_listeners: list[Callable[[PingSample, FallGuysLocation, str], None]] = []
+        self.trace = trace
+        self._traced_log: Optional[tuple[ServerState, ConnectionDetails]] = None
+        self._traced_process: Optional[bool] = None
+        self._process_running: Optional[bool] = None
+        # Ping times for the overlay graph of the first client, None for a lost ping
+        self.graph = graph
+        self._graph_samples: list[Optional[float]] = []
         self.has_first_run = False
         self.exit_on_n_updates = exit_after_n_updates
         self.n_updates = 0
 
+    # The first client, for callers that only ever have one
+    @property
+    def reader(self) -> LogReader:
+        return self.clients[0].reader
+
+    @property
+    def stats(self) -> Stats:
+        return self.clients[0].stats
+
+    @property
+    def ping_worker(self) -> PingWorker:
+        return self.clients[0].ping_worker
+
+    @ping_worker.setter
+    def ping_worker(self, ping_worker: PingWorker) -> None:
+        self.clients[0].ping_worker = ping_worker
+        self.clients[0].probe_interval = ping_worker.interval
+
+    @property
+    def current_connection(self) -> Optional[ConnectionDetails]:
+        return self.clients[0].current_connection
+
+    def shutdown(self) -> None:
+        self.ip_updater.stop()
+        if self.survey is not None:
+            self.survey.stop()
+        for client in self.clients:
+            client.shutdown()
+        if self.ping_pool is not None:
+            self.ping_pool.stop()
+        if self.stats_store is not None:
+            self.stats_store.close()
+        if self.rollups is not None:
+            self.rollups.close()
+        self.locations.close()
+        if self.trace is not None:
+            self.trace.close()
+        if self.instrumentation.enabled:
+            self.instrumentation.dump()
+
     def close(self, _) -> None:
-        self.stats.end_session(self.current_connection)
+        self.shutdown()
         sys.exit()
 
-    def _check_if_for_updated_ips(self) -> None:
-        with requests.Session() as session:
-            retries = Retry(total=5, backoff_factor=0.1, status_forcelist=[500, 502, 503, 504])
-            session.mount('https://', HTTPAdapter(max_retries=retries))
-
-            # Get last commit time for comparison
-            api_response = session.get(API_URL, timeout=10)
-            api_response.raise_for_status()
-            last_commit_timestamp = datetime.strptime(api_response.json()[0]["commit"]["author"]["date"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp()
-
-            # Return is already up to date
-            if self.locations.download_csv_file_path.exists():
-                file_timestamp = self.locations.download_csv_file_path.stat().st_mtime
-                if file_timestamp >= last_commit_timestamp:
-                    return
-
-            # Get new file
-            response = session.get(IP_URL, timeout=10)
-            if response.status_code != 200:
-                return
-
-            with TemporaryDirectory() as temp_dir:
-                temp_file = Path(temp_dir) / self.locations.download_csv_file_path.name
-                temp_file.write_bytes(response.content)
-                os.utime(temp_file, (last_commit_timestamp, last_commit_timestamp))
-                shutil.move(temp_file, self.locations.download_csv_file_path)
-            self.locations.clear_ip_network_lookup_cache()
-
-    def _clear_old_ips(self) -> None:
-        # Clear existing Unknown IP addresses
-        if self.locations.unknown_ip_path.exists():
-            updated = False
-            with TemporaryDirectory() as temp_dir:
-                temp_file = Path(temp_dir) / self.locations.unknown_ip_path.name
-                with open(self.locations.unknown_ip_path) as f_in, open(temp_file, 'w', newline='') as f_out:
-                    reader = csv.DictReader(f_in)
-                    if reader.fieldnames is None:
-                        return
-                    writer = csv.DictWriter(f_out, fieldnames=reader.fieldnames)
-                    writer.writeheader()
-                    for row in reader:
-                        if self.locations.lookup(row["IP Address"], record_unknown=False) is UNKNOWN_LOCATION:
-                            writer.writerow(row)
-                        else:
-                            updated = True
-                if updated:
-                    shutil.move(temp_file, self.locations.unknown_ip_path)
-
     def first_run(self) -> str:
-        # Check if recently updated
-        if self.locations.download_csv_file_path.exists():
-            # After successful commit wait 1 hour before checking again
-            if time.time() - self.locations.download_csv_file_path.stat().st_mtime < 24 * 60:
-                return 'IP Addresses already updated recently'
-
-        try:
-            result = self._check_if_for_updated_ips()
-        except Exception:
-            logger.exception('Unexpected exception checking for IPs')
-            return 'Error checking for new IP Addresses'
-
-        if result is None:
-            return "IP Addresses are already up to date"
-
-        try:
-            self._clear_old_ips()
-        except Exception:
-            logger.exception('Unexpected exception clearing old IPs')
-            return 'Error clearing old IP Addresses'
-
-        return 'Downloaded new IP addresses'
-
-    def _clear_connection(self) -> None:
-        self.stats.end_session(self.current_connection)
-        self.current_connection = None
+        # Downloads happen in the background so the overlay never waits on the network
+        self.ip_updater.start()
+        if self.survey is not None:
+            self.survey.start()
+        return self.ip_updater.status
+
+    def graph_samples(self) -> tuple[Optional[ConnectionDetails], list[Optional[float]]]:
+        """
+        The first client's connection and the ping times since the last call
+        """
+        samples, self._graph_samples = self._graph_samples, []
+        return self.clients[0].current_connection, samples
+
+    def _on_log_change(self, client: Client, status: ServerState, connection: ConnectionDetails) -> None:
+        # A backed off client is updated as soon as its log shows a connection change, not at its next update
+        self.scheduler.reset(client.log_timer)
+        for listener in self.wake_listeners:
+            listener()
 
     def _check_process(self) -> bool:
-        for process in psutil.process_iter():
-            if process.name() == 'FallGuys_client_game.exe':
-                return True
-        return False
+        # Checked only when due however many clients need it, less often while the game isn't running
+        if self._process_running is None or self.scheduler.due('process'):
+            self._process_running = self.process_tracker.is_running()
+            self.scheduler.ran('process', active=self._process_running)
+        return self._process_running
+
+    def _client_location(self, client: Client, connection: ConnectionDetails) -> FallGuysLocation:
+        # Looked up again now and then to pick up new IP networks or a new GeoIP database
+        if client.location is None or self.scheduler.due(client.location_timer):
+            with self.instrumentation.phase('location'):
+                client.location = self.locations.lookup(connection.ip)
+            self.scheduler.ran(client.location_timer)
+        return client.location
+
+    def _trace_process(self, running: bool) -> None:
+        if self.trace is not None and running != self._traced_process:
+            self._traced_process = running
+            self.trace.process(running)
+
+    def _trace_log(self, status: ServerState, connection: ConnectionDetails) -> None:
+        if self.trace is not None and (status, connection) != self._traced_log:
+            self._traced_log = (status, connection)
+            self.trace.log_event(status, connection)
 
     def update_text(self) -> tuple[int, str]:
         """
         Return tuple of milliseconds till next update and string message to display
         """
+        with self.instrumentation.tick():
+            wait_time, text = self._update_text()
+        if self.survey is not None and self.survey.latest is not None:
+            text = f'{text}\n{format_survey(self.survey.latest)}'
+        if self.show_timings:
+            text = f'{text}\n{self.instrumentation.summary_line()}'
+        return wait_time, text
+
+    def _update_text(self) -> tuple[int, str]:
         # Check if need to exit
         if self.exit_on_n_updates is not None:
             self.n_updates += 1
@@ -147,57 +290,183 @@ class Events:
             self.has_first_run = True
             return 1_000, self.first_run()
 
+        # A client whose log timer isn't due keeps its last text, so each client backs off on its own
+        for client in self.clients:
+            if self.scheduler.due(client.log_timer):
+                client.text = self._update_client(client)
+        if len(self.clients) == 1:
+            text = self.clients[0].text
+        else:
+            text = '\n'.join(f'{client.name}: {client.text}' for client in self.clients)
+        return self.scheduler.wait_ms(), text
+
+    def _update_client(self, client: Client) -> str:
+        instrumentation = self.instrumentation
+        scheduler = self.scheduler
+
         # Check if Fall Guys is Running
-        log_age = time.time() - os.path.getmtime(self.reader.log_location)
-        if log_age > 30 * 60:
-            self._clear_connection()
-            return (1_000, 'Fall Guys Game is not Running')
+        with instrumentation.phase('log_age'):
+            log_age = client.reader.log_age()
+        if log_age is None or log_age > 30 * 60:
+            self._trace_process(False)
+            client.clear_connection()
+            scheduler.ran(client.log_timer, active=False)
+            return 'Fall Guys Game is not Running'
 
         if log_age > 10:
             try:
-                process_result = self._check_process()
+                with instrumentation.phase('process'):
+                    process_result = self._check_process()
             except Exception:
                 logger.exception('Unexpected exception checking for process')
-                return (500, 'Error checking Fall Guys Status')
+                scheduler.ran(client.log_timer)
+                return 'Error checking Fall Guys Status'
 
+            self._trace_process(process_result)
             if not process_result:
-                self._clear_connection()
-                return (10_000, 'Fall Guys Game is not Running')
+                client.clear_connection()
+                scheduler.ran(client.log_timer, active=False)
+                return 'Fall Guys Game is not Running'
 
         # Check if connected to Fall Guys Server
-        status, connection =  self.reader.get_connection_details()
+        with instrumentation.phase('log'):
+            status, connection = client.reader.get_connection_details()
+        self._trace_log(status, connection)
         if status != ServerState.CONNECTED:
-            self._clear_connection()
-            return (1_000, 'Not Connected to Fall Guys Server')
-
-        # Set Current Connection
-        self.current_connection = connection
+            client.clear_connection()
+            # A log still being written means the game is in use, so a connection could come at any moment
+            scheduler.ran(client.log_timer, active=log_age <= 10)
+            return 'Not Connected to Fall Guys Server'
+        scheduler.ran(client.log_timer)
+
+        # Set Current Connection, pinging happens in the background, quickly at first then relaxing
+        if connection != client.current_connection:
+            client.last_ping_status = None
+            client.location = None
+            scheduler.add(client.probe_timer, min(NEW_CONNECTION_PROBE_INTERVAL, client.probe_interval),
+                          client.probe_interval, backoff=1.5, wakes=False)
+        client.current_connection = connection
+        client.ping_worker.interval = scheduler.interval(client.probe_timer)
+        client.ping_worker.start(connection)
+
+        # Update Stats from any pings that have completed since the last update
+        samples = [sample for sample in client.ping_worker.drain() if sample.connection == connection]
+        instrumentation.count('samples', len(samples))
+        if self.trace is not None:
+            for sample in samples:
+                self.trace.ping(sample)
+        with instrumentation.phase('stats'):
+            for sample in samples:
+                if sample.status == PingConnect.CONNECTED and sample.ping_time is not None:
+                    client.stats.add(connection, sample.ping_time, sample.timestamp)
+                else:
+                    client.stats.add_loss(connection, sample.timestamp)
+        if self.graph and samples and client is self.clients[0]:
+            self._graph_samples.extend(
+                sample.ping_time if sample.status == PingConnect.CONNECTED else None for sample in samples
+            )
+        if samples:
+            replied = any(sample.status == PingConnect.CONNECTED for sample in samples)
+            client.last_ping_status = PingConnect.CONNECTED if replied else PingConnect.NOT_CONNECTED
+            scheduler.ran(client.probe_timer, active=False)
+        if samples and self.sample_listeners:
+            sample_location = self._client_location(client, connection)
+            for listener in self.sample_listeners:
+                for sample in samples:
+                    listener(sample, sample_location, client.name)
 
         # Check if can ping IP
-        pinger = Pinger(connection.ip)
-        status, ping_time = pinger.get_ping_time()
-        if status != PingConnect.CONNECTED or ping_time is None:
-            return (1_000, f'Could not reach Fall Guys IP: {connection.ip}')
-
-        # Update Stats, lookup location, and report
-        self.stats.add(connection, ping_time)
-        location = self.locations.lookup(pinger.ip_address)
+        if client.last_ping_status is None:
+            return f'Pinging Fall Guys IP: {connection.ip}{self._typical_text(client, connection)}'
+        if client.last_ping_status != PingConnect.CONNECTED:
+            return f'Could not reach Fall Guys IP: {connection.ip}{self._typical_text(client, connection)}'
+
+        # Lookup location and report
+        location = self._client_location(client, connection)
+        with instrumentation.phase('format'):
+            stats_string = client.stats.stats_string(connection)
         if location == UNKNOWN_LOCATION:
-            return (5_000, f'IP={pinger.ip_address}, {self.stats.stats_string(connection)}')
-        return (5_000, f'Region={location.region}, Location={location.location}, {self.stats.stats_string(connection)}')
-
+            return f'IP={connection.ip}, {stats_string}'
+        return (f'Region={location.region}, Location={location.location}, {stats_string}'
+                f'{self._typical_text(client, connection)}')
+
+    def _typical_text(self, client: Client, connection: ConnectionDetails) -> str:
+        # The region's usual ping from past sessions, known as soon as the server's location is
+        if self.rollups is None:
+            return ''
+        location = self._client_location(client, connection)
+        if location == UNKNOWN_LOCATION:
+            return ''
+        return format_typical(self.rollups.typical(location.region))
+
+
+def run_overlay(exit_after_n_updates=None, streaming_ping=False, probe='ping', burst_size=1, stats_db=False,
+                instrumentation=None, show_timings=False, survey=False, survey_port=None, trace=None, log_locations=None,
+                graph=False):
+    # Local Modules
+    from .overlay import Overlay
+
+    # Events is created on the first update so the window appears before anything else is set up
+    events: Optional[Events] = None
+
+    def update_text() -> tuple[int, str]:
+        nonlocal events
+        if events is None:
+            events = Events(exit_after_n_updates, streaming_ping, probe, burst_size, stats_db,
+                            instrumentation=instrumentation, show_timings=show_timings, survey=survey,
+                            survey_port=survey_port, trace=trace, log_locations=log_locations, graph=graph)
+            events.wake_listeners.append(overlay.wake)
+        return events.update_text()
+
+    def close(event) -> None:
+        if events is None:
+            sys.exit()
+        events.close(event)
+
+    def graph_samples() -> tuple[Optional[ConnectionDetails], list[Optional[float]]]:
+        if events is None:
+            return None, []
+        return events.graph_samples()
 
-def run_overlay(exit_after_n_updates=None):
-    events = Events(exit_after_n_updates)
     overlay = Overlay(
-        events.close,
+        close,
         'Checking for IP address updates...',
         500,
-        events.update_text
+        update_text,
+        graph_samples if graph else None,
         )
     overlay.run()
 
 
+def run_headless(output: TextIO, metrics_port=None, max_updates=None, streaming_ping=False, probe='ping', burst_size=1,
+                 stats_db=False, instrumentation=None, survey=False, survey_port=None, trace=None, log_locations=None):
+    """
+    Run without a window, writing a JSON line per ping sample and per region survey to output, and optionally
+    serving Prometheus metrics
+    """
+    # Local Modules
+    from .headless import JSONLinesWriter, run_headless_loop
+    from .metrics import PingMetrics, MetricsServer
+
+    events = Events(None, streaming_ping, probe, burst_size, stats_db, instrumentation=instrumentation,
+                    survey=survey, survey_port=survey_port, trace=trace, log_locations=log_locations)
+    writer = JSONLinesWriter(output)
+    events.sample_listeners.append(writer)
+    if events.survey is not None:
+        events.survey.on_result = writer.write_survey
+    metrics_server = None
+    if metrics_port is not None:
+        metrics = PingMetrics()
+        events.sample_listeners.append(metrics.observe)
+        metrics_server = MetricsServer(metrics, port=metrics_port)
+        metrics_server.start()
+    try:
+        run_headless_loop(events, max_updates)
+    finally:
+        if metrics_server is not None:
+            metrics_server.stop()
+
+
 def set_up_logs():
     log_directory = Path(DATA_DIRECTORY)
     log_directory.mkdir(parents=True, exist_ok=True)
@@ -209,9 +478,131 @@ def set_up_logs():
     )
 
 
+def positive_int(text: str) -> int:
+    """
+    argparse type for counts that must be at least 1
+    """
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid int value: {text!r}') from None
+    if value < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1, not {value}')
+    return value
+
+
+def parse_log_locations(logs: Optional[list[str]]) -> Optional[dict[str, Optional[str]]]:
+    """
+    Client names and log paths from --log NAME=PATH or --log PATH, which is named by its position
+
+    Raises ValueError if two logs have the same name.
+    """
+    if not logs:
+        return None
+    log_locations: dict[str, Optional[str]] = {}
+    for number, log in enumerate(logs, 1):
+        name, separator, path = log.partition('=')
+        if not separator or '/' in name or '\\' in name:
+            name, path = f'Client {number}', log
+        if name in log_locations:
+            raise ValueError(f'--log {name} is given more than once, each client needs its own name')
+        log_locations[name] = path
+    return log_locations
+
+
+def parse_args(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='fgpe', description='Fall Guys Ping Estimate')
+    parser.add_argument('--streaming-ping', action='store_true',
+                        help='Keep one ping process running per server instead of starting one per sample')
+    parser.add_argument('--probe', choices=sorted(PROBE_BACKENDS), default='ping',
+                        help='How to measure round trip time: the ping command, or a TCP connect or UDP '
+                             'datagram to the game server port without starting a subprocess')
+    parser.add_argument('--burst', type=positive_int, default=1, metavar='N', dest='burst_size',
+                        help='Send N probes concurrently each update to measure jitter and packet loss')
+    parser.add_argument('--stats-db', action='store_true',
+                        help='Also store sessions and every ping in stats.db (SQLite)')
+    parser.add_argument('--headless', action='store_true',
+                        help='Run without the overlay window and write one JSON line per ping sample')
+    parser.add_argument('--output', type=argparse.FileType('a'), default=sys.stdout, metavar='FILE',
+                        help='Where --headless writes JSON lines, defaults to stdout')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='With --headless serve Prometheus metrics on http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--log', action='append', metavar='[NAME=]PATH', dest='logs',
+                        help='Watch the Player.log of another game client, repeat for each client. Each client gets '
+                             'a line in the overlay and its own stats sessions')
+    parser.add_argument('--graph', action='store_true',
+                        help='Show a graph of the last 60 pings under the overlay text, with the average and lost '
+                             'pings marked')
+    parser.add_argument('--survey', action='store_true',
+                        help='Probe a few servers in every region every 5 minutes and show the latency to each region')
+    parser.add_argument('--survey-port', type=int, metavar='PORT',
+                        help='Port the --survey probes use with --probe tcp or udp')
+    parser.add_argument('--trace', action='store_true',
+                        help='Record every log change, game process change and ping sample to trace.bin, '
+                             'replay it with python -m fgpe.trace')
+    parser.add_argument('--timings', action='store_true',
+                        help='Time each phase of every update and write a summary to timings.txt once a minute')
+    parser.add_argument('--show-timings', action='store_true',
+                        help='Implies --timings, and shows mean phase times in the overlay')
+    parser.add_argument('--profile-ticks', type=int, default=0, metavar='N',
+                        help='Profile the first N updates with cProfile and write profile.prof')
+    parsed = parser.parse_args(args)
+    try:
+        parsed.log_locations = parse_log_locations(parsed.logs)
+    except ValueError as e:
+        parser.error(str(e))
+    if parsed.streaming_ping and parsed.probe != 'ping':
+        parser.error('--streaming-ping keeps a ping command running, it can only be used with --probe ping')
+    if parsed.survey and parsed.probe != 'ping' and parsed.survey_port is None:
+        parser.error(f'--survey with --probe {parsed.probe} needs --survey-port, the servers only answer on the game port')
+    if parsed.trace and parsed.log_locations is not None and len(parsed.log_locations) > 1:
+        parser.error('--trace records one client, pass at most one --log')
+    return parsed
+
+
 def main():
+    args = parse_args()
     set_up_logs()
-    run_overlay()
+    instrumentation = Instrumentation(
+        enabled=args.timings or args.show_timings,
+        dump_path=Path(DATA_DIRECTORY) / 'timings.txt',
+        profile_ticks=args.profile_ticks,
+        profile_path=Path(DATA_DIRECTORY) / 'profile.prof',
+    )
+    trace = None
+    if args.trace:
+        # Local Modules
+        from .trace import TraceRecorder
+
+        trace = TraceRecorder(Path(DATA_DIRECTORY) / 'trace.bin')
+    if args.headless:
+        run_headless(
+            args.output,
+            metrics_port=args.metrics_port,
+            streaming_ping=args.streaming_ping,
+            probe=args.probe,
+            burst_size=args.burst_size,
+            stats_db=args.stats_db,
+            instrumentation=instrumentation,
+            survey=args.survey,
+            survey_port=args.survey_port,
+            trace=trace,
+            log_locations=args.log_locations,
+        )
+        return
+    run_overlay(
+        streaming_ping=args.streaming_ping,
+        probe=args.probe,
+        burst_size=args.burst_size,
+        stats_db=args.stats_db,
+        instrumentation=instrumentation,
+        show_timings=args.show_timings,
+        survey=args.survey,
+        survey_port=args.survey_port,
+        trace=trace,
+        log_locations=args.log_locations,
+        graph=args.graph,
+    )
 
 
 if __name__ == '__main__':
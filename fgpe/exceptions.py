@@ -0,0 +1,2 @@
+class GracefulExit(Exception):
+    "Allows callbacks to gracefully exit without logging error"
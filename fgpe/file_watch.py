@@ -0,0 +1,344 @@
+# Standard Library
+import os
+import sys
+import select
+import logging
+import threading
+from enum import Enum
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FileEvent(Enum):
+    APPENDED = 1
+    ROTATED = 2  # Created, replaced or truncated
+
+
+class FileWatcher(ABC):
+    """
+    Calls callback from a background thread when the watched file is appended to or rotated
+
+    Subclasses only decide when to look, whether the file changed is always
+    decided by comparing its identity and size with the last stat, so a
+    spurious wake up costs a single stat and a missed notification is caught
+    by the next look.
+    """
+    def __init__(self, path: str, callback: Callable[[FileEvent], None]):
+        self.path = path
+        self.callback = callback
+        self._state: Optional[tuple[int, int, int]] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._state = self._stat()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'watch-{os.path.basename(self.path)}', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _stat(self) -> Optional[tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_dev, stat.st_ino, stat.st_size
+
+    def _check(self) -> bool:
+        """
+        Stat the file and call callback if it changed, returns if it changed
+        """
+        previous, self._state = self._state, self._stat()
+        if self._state is None or self._state == previous:
+            return False
+
+        if previous is None or self._state[:2] != previous[:2] or self._state[2] < previous[2]:
+            event = FileEvent.ROTATED
+        else:
+            event = FileEvent.APPENDED
+
+        try:
+            self.callback(event)
+        except Exception:
+            logger.exception('Unexpected exception handling change to %s', self.path)
+        return True
+
+    def _poll_instead(self) -> None:
+        """
+        Run a PollingFileWatcher on this thread, for when a native watch fails
+        """
+        fallback = PollingFileWatcher(self.path, self.callback)
+        fallback._state = self._state
+        fallback._stop_event = self._stop_event
+        fallback._run()
+
+    @abstractmethod
+    def _run(self) -> None:
+        ...
+
+
+class PollingFileWatcher(FileWatcher):
+    """
+    Stats the file on an interval that halves back to min_interval on a change and doubles up to max_interval while idle
+    """
+    def __init__(self,
+                 path: str,
+                 callback: Callable[[FileEvent], None],
+                 min_interval: float = 0.1,
+                 max_interval: float = 2.0):
+        super().__init__(path, callback)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+    def _run(self) -> None:
+        interval = self.min_interval
+        while not self._stop_event.wait(interval):
+            if self._check():
+                interval = self.min_interval
+            else:
+                interval = min(interval * 2, self.max_interval)
+
+
+class InotifyFileWatcher(FileWatcher):
+    """
+    Linux inotify on the file's directory so writes, renames and new files wake the thread immediately
+
+    The directory is watched rather than the file so a rotated log is
+    picked up without re-adding a watch, the thread also looks every
+    safety_interval seconds in case a notification was missed.
+    """
+    # From sys/inotify.h
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, path: str, callback: Callable[[FileEvent], None], safety_interval: float = 5.0):
+        super().__init__(path, callback)
+        self.safety_interval = safety_interval
+        self._inotify_fd: Optional[int] = None
+        self._wake_read: Optional[int] = None
+        self._wake_write: Optional[int] = None
+
+        # Standard Library
+        import ctypes
+        import ctypes.util
+
+        self._ctypes = ctypes
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+
+    def start(self) -> None:
+        """
+        Open the inotify watch and wake pipe, stop closes them so the watcher can be started again
+        """
+        try:
+            self._open()
+        except (OSError, AttributeError):
+            logger.exception('Watching %s failed, falling back to polling', self.path)
+            self._close()
+        super().start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop_event.set()
+            if self._wake_write is not None:
+                os.write(self._wake_write, b'\0')
+        super().stop()
+        self._close()
+
+    def _open(self) -> None:
+        ctypes = self._ctypes
+        self._inotify_fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._inotify_fd < 0:
+            self._inotify_fd = None
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        directory = os.path.dirname(os.path.abspath(self.path))
+        if self._libc.inotify_add_watch(self._inotify_fd, os.fsencode(directory), self.WATCH_MASK) < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {directory}')
+        self._wake_read, self._wake_write = os.pipe()
+
+    def _close(self) -> None:
+        for fd in (self._inotify_fd, self._wake_read, self._wake_write):
+            if fd is not None:
+                os.close(fd)
+        self._inotify_fd = self._wake_read = self._wake_write = None
+
+    def _run(self) -> None:
+        if self._wake_read is None:
+            self._poll_instead()
+            return
+        while not self._stop_event.is_set():
+            readable, _, _ = select.select([self._inotify_fd, self._wake_read], [], [], self.safety_interval)
+            if self._inotify_fd in readable:
+                self._drain()
+            self._check()
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                if not os.read(self._inotify_fd, 64 * 1024):
+                    return
+            except BlockingIOError:
+                return
+
+
+class WindowsFileWatcher(FileWatcher):
+    """
+    ReadDirectoryChangesW on the file's directory, with the same safety_interval look as InotifyFileWatcher
+
+    Windows can delay size notifications for a file another process holds
+    open, so the safety look matters more here.
+    """
+    FILE_LIST_DIRECTORY = 0x0001
+    FILE_SHARE_ALL = 0x0001 | 0x0002 | 0x0004
+    OPEN_EXISTING = 3
+    FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+    FILE_FLAG_OVERLAPPED = 0x40000000
+    NOTIFY_FILTER = 0x0001 | 0x0008 | 0x0010  # FILE_NAME, SIZE, LAST_WRITE
+    WAIT_OBJECT_0 = 0
+    WAIT_TIMEOUT = 0x102
+    INVALID_HANDLE_VALUE = -1
+
+    def __init__(self, path: str, callback: Callable[[FileEvent], None], safety_interval: float = 5.0):
+        super().__init__(path, callback)
+        self.safety_interval = safety_interval
+
+        # Standard Library
+        import ctypes
+        from ctypes import wintypes
+
+        class OVERLAPPED(ctypes.Structure):
+            _fields_ = [
+                ('Internal', ctypes.c_void_p),
+                ('InternalHigh', ctypes.c_void_p),
+                ('Offset', wintypes.DWORD),
+                ('OffsetHigh', wintypes.DWORD),
+                ('hEvent', wintypes.HANDLE),
+            ]
+
+        self._ctypes = ctypes
+        self._kernel32 = kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)  # type: ignore
+        kernel32.CreateFileW.restype = wintypes.HANDLE
+        kernel32.CreateEventW.restype = wintypes.HANDLE
+        # Handles are pointer sized, without argtypes ctypes would pass them as 32 bit ints
+        kernel32.ReadDirectoryChangesW.argtypes = [
+            wintypes.HANDLE, ctypes.c_void_p, wintypes.DWORD, wintypes.BOOL, wintypes.DWORD,
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p,
+        ]
+        kernel32.WaitForMultipleObjects.argtypes = [wintypes.DWORD, ctypes.c_void_p, wintypes.BOOL, wintypes.DWORD]
+        kernel32.WaitForMultipleObjects.restype = wintypes.DWORD
+        kernel32.GetOverlappedResult.argtypes = [wintypes.HANDLE, ctypes.c_void_p, ctypes.c_void_p, wintypes.BOOL]
+        kernel32.CancelIoEx.argtypes = [wintypes.HANDLE, ctypes.c_void_p]
+        for name in ('SetEvent', 'ResetEvent', 'CloseHandle'):
+            getattr(kernel32, name).argtypes = [wintypes.HANDLE]
+        self._overlapped = OVERLAPPED()
+        self._handle = None
+        self._wake_event = None
+
+    def start(self) -> None:
+        """
+        Open the directory and events, stop closes them so the watcher can be started again
+        """
+        try:
+            self._open()
+        except OSError:
+            logger.exception('Watching %s failed, falling back to polling', self.path)
+            self._close()
+        super().start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop_event.set()
+            if self._wake_event is not None:
+                self._kernel32.SetEvent(self._wake_event)
+        super().stop()
+        self._close()
+
+    def _open(self) -> None:
+        ctypes = self._ctypes
+        kernel32 = self._kernel32
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle = kernel32.CreateFileW(
+            directory,
+            self.FILE_LIST_DIRECTORY,
+            self.FILE_SHARE_ALL,
+            None,
+            self.OPEN_EXISTING,
+            self.FILE_FLAG_BACKUP_SEMANTICS | self.FILE_FLAG_OVERLAPPED,
+            None,
+        )
+        if handle is None or handle == ctypes.c_void_p(self.INVALID_HANDLE_VALUE).value:
+            raise ctypes.WinError(ctypes.get_last_error())  # type: ignore
+        self._handle = handle
+        self._overlapped.hEvent = kernel32.CreateEventW(None, True, False, None)
+        self._wake_event = kernel32.CreateEventW(None, True, False, None)
+
+    def _close(self) -> None:
+        for handle in (self._handle, self._overlapped.hEvent, self._wake_event):
+            if handle:
+                self._kernel32.CloseHandle(handle)
+        self._handle = self._overlapped.hEvent = self._wake_event = None
+
+    def _run(self) -> None:
+        if self._handle is None:
+            self._poll_instead()
+            return
+        ctypes = self._ctypes
+        kernel32 = self._kernel32
+        buffer = ctypes.create_string_buffer(64 * 1024)
+        transferred = ctypes.c_ulong()
+        handles = (ctypes.c_void_p * 2)(self._overlapped.hEvent, self._wake_event)
+        pending = False
+        try:
+            while not self._stop_event.is_set():
+                if not pending:
+                    kernel32.ResetEvent(self._overlapped.hEvent)
+                    if not kernel32.ReadDirectoryChangesW(
+                        self._handle, buffer, len(buffer), False, self.NOTIFY_FILTER,
+                        None, ctypes.byref(self._overlapped), None,
+                    ):
+                        raise ctypes.WinError(ctypes.get_last_error())
+                    pending = True
+
+                result = kernel32.WaitForMultipleObjects(2, handles, False, int(self.safety_interval * 1_000))
+                if result == self.WAIT_OBJECT_0:
+                    # Which files changed doesn't matter, _check looks at the watched file
+                    kernel32.GetOverlappedResult(self._handle, ctypes.byref(self._overlapped), ctypes.byref(transferred),
+                                                 False)
+                    pending = False
+                elif result != self.WAIT_TIMEOUT:
+                    break
+                self._check()
+        except OSError:
+            logger.exception('Watching %s failed, falling back to polling', self.path)
+            self._poll_instead()
+        finally:
+            if pending:
+                kernel32.CancelIoEx(self._handle, ctypes.byref(self._overlapped))
+                kernel32.GetOverlappedResult(self._handle, ctypes.byref(self._overlapped), ctypes.byref(transferred),
+                                             True)
+
+
+def watch_file(path: str, callback: Callable[[FileEvent], None]) -> FileWatcher:
+    """
+    The best watcher available on this platform, polling if the directory can't be watched
+    """
+    try:
+        if sys.platform.startswith('linux'):
+            return InotifyFileWatcher(path, callback)
+        if sys.platform == 'win32':
+            return WindowsFileWatcher(path, callback)
+    except (OSError, AttributeError):
+        logger.debug('Unable to watch %s natively, polling instead', path, exc_info=True)
+    return PollingFileWatcher(path, callback)
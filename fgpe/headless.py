@@ -0,0 +1,83 @@
+# Standard Library
+import json
+import time
+import logging
+import threading
+from functools import partial
+from typing import Any, Callable, Optional, TextIO
+
+# Local Modules
+from .pinger import PingConnect
+from .exceptions import GracefulExit
+from .ping_worker import PingSample
+from .survey import RegionLatency
+from .locations import FallGuysLocation
+
+logger = logging.getLogger(__name__)
+
+
+def sample_to_dict(sample: PingSample, location: FallGuysLocation, client: str = '') -> dict[str, Any]:
+    return {
+        'time': sample.timestamp,
+        'client': client,
+        'ip': sample.connection.ip,
+        'port': sample.connection.port,
+        'connected': sample.status == PingConnect.CONNECTED,
+        'ping_ms': sample.ping_time,
+        'region': location.region,
+        'location': location.location,
+    }
+
+
+def survey_to_dict(latencies: dict[str, RegionLatency]) -> dict[str, Any]:
+    return {
+        'time': time.time(),
+        'survey': {
+            region: {'ping_ms': latency.ping_time, 'replies': latency.replies, 'probes': latency.probes,
+                     'host': latency.host}
+            for region, latency in latencies.items()
+        },
+    }
+
+
+class JSONLinesWriter:
+    """
+    Sample listener writing one JSON object per line, flushed so a reader sees each sample as it arrives
+    """
+    def __init__(self, output: TextIO):
+        self.output = output
+
+    def __call__(self, sample: PingSample, location: FallGuysLocation, client: str = '') -> None:
+        self.write(sample_to_dict(sample, location, client))
+
+    def write_survey(self, latencies: dict[str, RegionLatency]) -> None:
+        self.write(survey_to_dict(latencies))
+
+    def write(self, line: dict[str, Any]) -> None:
+        self.output.write(json.dumps(line) + '\n')
+        self.output.flush()
+
+
+def wait_until_woken(woken: threading.Event, seconds: float) -> None:
+    woken.wait(seconds)
+    woken.clear()
+
+
+def run_headless_loop(events, max_updates: Optional[int] = None, sleep: Optional[Callable[[float], None]] = None) -> None:
+    """
+    Drive Events the way the overlay does, waiting the time each update asks for or until Events wakes the loop
+    """
+    if sleep is None:
+        woken = threading.Event()
+        events.wake_listeners.append(woken.set)
+        sleep = partial(wait_until_woken, woken)
+    updates = 0
+    try:
+        while max_updates is None or updates < max_updates:
+            wait_time, _ = events.update_text()
+            updates += 1
+            sleep(wait_time / 1_000)
+    except (GracefulExit, KeyboardInterrupt):
+        pass
+    finally:
+        events.shutdown()
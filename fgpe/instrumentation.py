@@ -0,0 +1,171 @@
+# Standard Library
+import time
+import logging
+import threading
+from pathlib import Path
+from contextlib import nullcontext
+from typing import ContextManager, Optional
+
+# Local Modules
+from .streaming_stats import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+NULL_PHASE = nullcontext()
+
+
+class PhaseStats:
+    """
+    Latency of one phase, kept in a quantile sketch of milliseconds so memory doesn't grow with ticks
+    """
+    __slots__ = ('count', 'total_ns', 'max_ns', 'sketch')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.sketch = QuantileSketch()
+
+    def add(self, elapsed_ns: int) -> None:
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self.max_ns = max(self.max_ns, elapsed_ns)
+        self.sketch.add(elapsed_ns / 1_000_000)
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ns / self.count / 1_000_000 if self.count else 0.0
+
+
+class Phase:
+    __slots__ = ('instrumentation', 'name', 'start')
+
+    def __init__(self, instrumentation: 'Instrumentation', name: str):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc_info) -> None:
+        self.instrumentation.record(self.name, time.perf_counter_ns() - self.start)
+
+
+class Tick(Phase):
+    """
+    Times a whole update, profiling it while profile ticks remain and dumping stats when they're due
+    """
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        instrumentation = self.instrumentation
+        if instrumentation.profile_ticks_remaining:
+            instrumentation.profiler.enable()
+        super().__enter__()
+
+    def __exit__(self, *exc_info) -> None:
+        super().__exit__(*exc_info)
+        instrumentation = self.instrumentation
+        if instrumentation.profile_ticks_remaining:
+            instrumentation.profiler.disable()
+            instrumentation.profile_ticks_remaining -= 1
+            if not instrumentation.profile_ticks_remaining:
+                instrumentation.write_profile()
+        if instrumentation.dump_path is not None and time.monotonic() >= instrumentation.next_dump:
+            instrumentation.dump()
+
+
+class Instrumentation:
+    """
+    Per phase latencies and counters for the update tick
+
+    When disabled phase() and tick() return a shared no op context manager
+    and count() returns immediately, so the instrumented code costs a method
+    call per phase.
+    """
+    def __init__(self,
+                 enabled: bool = False,
+                 dump_path: Optional[Path] = None,
+                 dump_interval: float = 60.0,
+                 profile_ticks: int = 0,
+                 profile_path: Optional[Path] = None):
+        self.enabled = enabled or profile_ticks > 0
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self.next_dump = time.monotonic() + dump_interval
+        self.profile_ticks_remaining = profile_ticks
+        self.profile_path = profile_path
+        self.profiler = None
+        if profile_ticks:
+            # Standard Library
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+        self.phases: dict[str, PhaseStats] = {}
+        self.counters: dict[str, int] = {}
+        # Phases may be recorded from ping threads as well as the GUI
+        self._lock = threading.Lock()
+
+    def phase(self, name: str) -> ContextManager[None]:
+        if not self.enabled:
+            return NULL_PHASE
+        return Phase(self, name)
+
+    def tick(self) -> ContextManager[None]:
+        if not self.enabled:
+            return NULL_PHASE
+        return Tick(self, 'tick')
+
+    def count(self, name: str, increment: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + increment
+
+    def record(self, name: str, elapsed_ns: int) -> None:
+        with self._lock:
+            phase_stats = self.phases.get(name)
+            if phase_stats is None:
+                phase_stats = self.phases[name] = PhaseStats()
+            phase_stats.add(elapsed_ns)
+
+    def summary_line(self) -> str:
+        """
+        One line of mean phase times for the overlay
+        """
+        with self._lock:
+            return ' '.join(f'{name}={phase_stats.mean_ms:.2f}ms' for name, phase_stats in self.phases.items())
+
+    def format(self) -> str:
+        with self._lock:
+            lines = [f'{"Phase":<12}{"Count":>10}{"Mean ms":>10}{"50th":>10}{"90th":>10}{"99th":>10}{"Max ms":>10}']
+            for name, phase_stats in sorted(self.phases.items()):
+                quantiles = (phase_stats.sketch.quantile(q) or 0.0 for q in (0.5, 0.9, 0.99))
+                lines.append(
+                    f'{name:<12}{phase_stats.count:>10,}{phase_stats.mean_ms:>10.3f}'
+                    + ''.join(f'{quantile:>10.3f}' for quantile in quantiles)
+                    + f'{phase_stats.max_ns / 1_000_000:>10.3f}'
+                )
+            if self.counters:
+                lines.append('')
+                lines.append(f'{"Counter":<24}{"Count":>10}')
+                for name, counter in sorted(self.counters.items()):
+                    lines.append(f'{name:<24}{counter:>10,}')
+        return '\n'.join(lines) + '\n'
+
+    def dump(self) -> None:
+        self.next_dump = time.monotonic() + self.dump_interval
+        if self.dump_path is None:
+            return
+        try:
+            self.dump_path.write_text(self.format())
+        except OSError:
+            logger.exception('Unable to write timings to %s', self.dump_path)
+
+    def write_profile(self) -> None:
+        if self.profiler is None or self.profile_path is None:
+            return
+        try:
+            self.profiler.dump_stats(str(self.profile_path))
+        except OSError:
+            logger.exception('Unable to write profile to %s', self.profile_path)
@@ -0,0 +1,175 @@
+# Standard Library
+import os
+import sys
+import struct
+from pathlib import Path
+from ipaddress import ip_address, _BaseAddress, _BaseNetwork
+from typing import Callable, Generic, Iterator, Optional, TypeVar, Union
+
+ValueT = TypeVar('ValueT')
+
+MAX_PREFIX_LENGTH = {4: 32, 6: 128}
+
+# Binary cache layout: header, key, string table, value table, then fixed width network records
+CACHE_MAGIC = b'FGIX'
+CACHE_FORMAT_VERSION = 1
+CACHE_HEADER = struct.Struct('<4sHI')
+COUNT = struct.Struct('<I')
+STRING_LENGTH = struct.Struct('<H')
+NETWORK_RECORD = struct.Struct('<BBQQH')  # version, prefix length, high and low 64 bits, value index
+
+
+class IPNetworkIndex(Generic[ValueT]):
+    """
+    Longest prefix match index of IP networks
+
+    Networks are stored in one hash table per prefix length, keyed on the
+    network bits. A lookup masks the address for each prefix length in use,
+    longest first, so the most specific network always wins no matter what
+    order the networks were added in.
+    """
+    def __init__(self):
+        self._tables: dict[int, dict[int, dict[int, ValueT]]] = {4: {}, 6: {}}
+        self._prefix_lengths: dict[int, list[int]] = {4: [], 6: []}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add_network(self, network: _BaseNetwork, value: ValueT) -> None:
+        self.add(network.version, int(network.network_address), network.prefixlen, value)
+
+    def add(self, version: int, network_int: int, prefix_length: int, value: ValueT) -> None:
+        tables = self._tables[version]
+        if prefix_length not in tables:
+            tables[prefix_length] = {}
+            self._prefix_lengths[version] = sorted(tables, reverse=True)
+
+        key = network_int >> (MAX_PREFIX_LENGTH[version] - prefix_length)
+        table = tables[prefix_length]
+        if key not in table:
+            self._size += 1
+        table[key] = value
+
+    def lookup(self, ip: Union[str, _BaseAddress]) -> Optional[ValueT]:
+        if isinstance(ip, str):
+            ip = ip_address(ip)
+
+        version = ip.version
+        ip_int = int(ip)
+        max_length = MAX_PREFIX_LENGTH[version]
+        tables = self._tables[version]
+        for prefix_length in self._prefix_lengths[version]:
+            value = tables[prefix_length].get(ip_int >> (max_length - prefix_length))
+            if value is not None:
+                return value
+        return None
+
+    def added_since(self, other: 'IPNetworkIndex') -> 'IPNetworkIndex[ValueT]':
+        """
+        Index of the networks in this index that are not in other
+        """
+        added: IPNetworkIndex[ValueT] = IPNetworkIndex()
+        for version, tables in self._tables.items():
+            max_length = MAX_PREFIX_LENGTH[version]
+            for prefix_length, table in tables.items():
+                other_table = other._tables[version].get(prefix_length, {})
+                for key, value in table.items():
+                    if key not in other_table:
+                        added.add(version, key << (max_length - prefix_length), prefix_length, value)
+        return added
+
+    def entries(self) -> Iterator[tuple[int, int, int, ValueT]]:
+        """
+        Yield (version, network as int, prefix length, value) for every network
+        """
+        for version, tables in self._tables.items():
+            max_length = MAX_PREFIX_LENGTH[version]
+            for prefix_length, table in tables.items():
+                for key, value in table.items():
+                    yield version, key << (max_length - prefix_length), prefix_length, value
+
+
+def write_index_cache(path: Path, key: str, index: IPNetworkIndex[tuple[str, ...]]) -> None:
+    """
+    Compile the index to a binary file, values must be tuples of strings of the same length
+    """
+    strings: dict[str, int] = {}
+    values: dict[tuple[str, ...], int] = {}
+    records = bytearray()
+    for version, network_int, prefix_length, value in index.entries():
+        if value not in values:
+            for string in value:
+                strings.setdefault(string, len(strings))
+            values[value] = len(values)
+        records += NETWORK_RECORD.pack(version, prefix_length, network_int >> 64, network_int & (2**64 - 1), values[value])
+
+    fields = len(next(iter(values), ()))
+    value_record = struct.Struct(f'<{fields}H')
+    data = bytearray()
+    encoded_key = key.encode('utf-8')
+    data += CACHE_HEADER.pack(CACHE_MAGIC, CACHE_FORMAT_VERSION, len(encoded_key))
+    data += encoded_key
+    data += COUNT.pack(len(strings))
+    for string in strings:
+        encoded = string.encode('utf-8')
+        data += STRING_LENGTH.pack(len(encoded)) + encoded
+    data += COUNT.pack(len(values)) + bytes([fields])
+    for value in values:
+        data += value_record.pack(*(strings[string] for string in value))
+    data += COUNT.pack(len(records) // NETWORK_RECORD.size)
+    data += records
+
+    # Write then rename so a reader never sees a partial file
+    temp_path = path.with_name(path.name + '.tmp')
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+
+
+def read_index_cache(path: Path,
+                     key: str,
+                     value_type: Callable[[tuple[str, ...]], ValueT]) -> Optional[IPNetworkIndex[ValueT]]:
+    """
+    Load an index compiled by write_index_cache, returns None if missing, stale or unreadable
+    """
+    try:
+        data = memoryview(path.read_bytes())
+        magic, format_version, key_length = CACHE_HEADER.unpack_from(data)
+        offset = CACHE_HEADER.size
+        if magic != CACHE_MAGIC or format_version != CACHE_FORMAT_VERSION:
+            return None
+        if bytes(data[offset:offset + key_length]).decode('utf-8') != key:
+            return None
+        offset += key_length
+
+        (n_strings,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        strings = []
+        for _ in range(n_strings):
+            (length,) = STRING_LENGTH.unpack_from(data, offset)
+            offset += STRING_LENGTH.size
+            strings.append(sys.intern(bytes(data[offset:offset + length]).decode('utf-8')))
+            offset += length
+
+        (n_values,) = COUNT.unpack_from(data, offset)
+        fields = data[offset + COUNT.size]
+        offset += COUNT.size + 1
+        value_record = struct.Struct(f'<{fields}H')
+        values = [
+            value_type(tuple(strings[i] for i in indexes))
+            for indexes in value_record.iter_unpack(data[offset:offset + n_values * value_record.size])
+        ]
+        offset += n_values * value_record.size
+
+        (n_records,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        records = data[offset:offset + n_records * NETWORK_RECORD.size]
+        if len(records) != n_records * NETWORK_RECORD.size:
+            return None
+    except (OSError, struct.error, UnicodeDecodeError, IndexError):
+        return None
+
+    index: IPNetworkIndex[ValueT] = IPNetworkIndex()
+    for version, prefix_length, high, low, value_index in NETWORK_RECORD.iter_unpack(records):
+        index.add(version, (high << 64) | low, prefix_length, values[value_index])
+    return index
@@ -0,0 +1,132 @@
+# Standard Library
+import os
+import json
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+from email.utils import formatdate
+
+# Local Modules
+from .locations import LocationLookup, read_ip_network_csv
+
+logger = logging.getLogger(__name__)
+
+IP_URL = 'https://raw.githubusercontent.com/notatallshaw/fall_guys_ping_estimate/main/fgpe/data/Fall_Guys_IP_Networks.csv'
+
+
+class IPNetworkUpdater:
+    """
+    Keeps the downloaded IP networks CSV up to date from a background thread
+
+    Each check is a conditional GET using the ETag and Last-Modified from
+    the previous download, so an unchanged file costs one small 304
+    response. A changed file must parse before it is moved in to place with
+    an atomic replace and swapped in to LocationLookup, then on_update is
+    called. Checks repeat every interval seconds.
+    """
+    def __init__(self,
+                 locations: LocationLookup,
+                 url: str = IP_URL,
+                 interval: float = 60 * 60,
+                 timeout: float = 10,
+                 on_update: Optional[Callable[[], None]] = None):
+        self.locations = locations
+        self.url = url
+        self.interval = interval
+        self.timeout = timeout
+        self.on_update = on_update
+        self.validators_path = locations.download_csv_file_path.with_suffix('.http.json')
+        self.status = 'Checking for IP address updates'
+        self.updates = 0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop_event,), name='ip-updater', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Signal the thread to stop without waiting for a request in flight
+        """
+        self._stop_event.set()
+        self._thread = None
+
+    def _run(self, stop_event: threading.Event) -> None:
+        while not stop_event.is_set():
+            try:
+                self.check()
+            except Exception:
+                logger.exception('Unexpected exception checking for IPs')
+                self.status = 'Error checking for new IP Addresses'
+            stop_event.wait(self.interval)
+
+    def _request_headers(self) -> dict[str, str]:
+        csv_path = self.locations.download_csv_file_path
+        if not csv_path.exists():
+            return {}
+
+        try:
+            validators = json.loads(self.validators_path.read_text())
+        except (OSError, ValueError):
+            # Downloaded by an older version, which set the mtime to the last commit time
+            return {'If-Modified-Since': formatdate(csv_path.stat().st_mtime, usegmt=True)}
+
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def check(self) -> bool:
+        """
+        Make one conditional request, returns if new IP networks were swapped in
+        """
+        # Third Party Modules
+        import requests
+        from requests.adapters import HTTPAdapter
+        from requests.packages.urllib3.util.retry import Retry  # type: ignore
+
+        with requests.Session() as session:
+            retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
+            session.mount('https://', HTTPAdapter(max_retries=retries))
+            session.mount('http://', HTTPAdapter(max_retries=retries))
+            response = session.get(self.url, headers=self._request_headers(), timeout=self.timeout)
+
+        if response.status_code == 304:
+            self.status = 'IP Addresses are already up to date'
+            return False
+        response.raise_for_status()
+
+        self._replace_csv(response.content)
+        self.validators_path.write_text(json.dumps({
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }))
+        self.locations.reload_ip_networks()
+        self.updates += 1
+        self.status = 'Downloaded new IP addresses'
+        if self.on_update is not None:
+            self.on_update()
+        return True
+
+    def _replace_csv(self, content: bytes) -> None:
+        csv_path = self.locations.download_csv_file_path
+        csv_path.parent.mkdir(parents=True, exist_ok=True)
+        # Same directory so the replace is atomic
+        fd, temp_name = tempfile.mkstemp(dir=csv_path.parent, prefix=csv_path.stem, suffix='.tmp')
+        temp_path = Path(temp_name)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            # Raises on a truncated or malformed download, leaving the current file in place
+            if not len(read_ip_network_csv(temp_path)):
+                raise ValueError(f'No IP networks downloaded from {self.url}')
+            os.replace(temp_path, csv_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
@@ -1,13 +1,25 @@
 # Standaard Libraries
 import csv
+import time
+import logging
+import threading
 from pathlib import Path
 import importlib.resources
-from functools import cache
-from typing import NamedTuple
-from datetime import datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING, NamedTuple, Optional
 from os.path import expandvars, exists
-from ipaddress import ip_address, ip_network, _BaseNetwork
-import geoip2.database
+from ipaddress import ip_address, ip_network
+
+# geoip2 is only imported once a GeoIP database is found
+if TYPE_CHECKING:
+    import geoip2.database
+
+# Local Modules
+from .unknown_ips import UnknownIPStore
+from .ip_index import IPNetworkIndex, read_index_cache, write_index_cache
+
+logger = logging.getLogger(__name__)
+
 
 class FallGuysLocation(NamedTuple):
     region: str
@@ -18,27 +30,54 @@ class FallGuysLocation(NamedTuple):
 UNKNOWN_LOCATION = FallGuysLocation('Unknown', 'Unknown', 'Unknown')
 
 
+def read_ip_network_csv(csv_path: Path) -> IPNetworkIndex[FallGuysLocation]:
+    ip_network_index: IPNetworkIndex[FallGuysLocation] = IPNetworkIndex()
+    with open(csv_path, encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            ip_network_index.add_network(
+                ip_network(row['IP Network']),
+                FallGuysLocation(row['Fall Guys Region'], row['Location'], row['Provider'])
+            )
+    return ip_network_index
+
+
 class LocationLookup:
     """
     Based on manually derived data look up the location of the Fall Guys server
     """
-    def __init__(self):
+    def __init__(self, cache_size: int = 1024):
         """
         Prepopulate the IP Network Lookups
         """
         # importlib.resources.files returns a file type
         self._backup_csv_file: Path = importlib.resources.files('fgpe') / 'data' / 'Fall_Guys_IP_Networks.csv'
         self.download_csv_file_path = Path(expandvars(r'%APPDATA%\fgpe\Fall_Guys_IP_Networks.csv'))
-        self._ip_network_lookup = None
+        self._ip_network_index = None
+        # Loaded lazily from whichever thread looks up first, the survey thread included,
+        # so only one thread at a time reads or writes the compiled index cache
+        self._index_lock = threading.RLock()
 
-        self.geoip_path = Path(expandvars(r'%APPDATA%\fgpe\GeoLite2-City.mmdb'))
-        self._use_geoip = self.geoip_path.exists()
+        # Compiled copy of the CSV, rebuilt whenever the source CSV changes
+        self.index_cache_path = Path(expandvars(r'%APPDATA%\fgpe\Fall_Guys_IP_Networks.idx'))
 
-        # Check unknown IP address CSV exists
+        # GeoIP reader is opened on first lookup and kept open until close
+        self.geoip_path = Path(expandvars(r'%APPDATA%\fgpe\GeoLite2-City.mmdb'))
+        self._geoip_reader: Optional['geoip2.database.Reader'] = None
+        self._geoip_mtime: Optional[float] = None
+        # Looked up on every update of every client, so the database is checked for changes at most once a second
+        self.geoip_check_interval = 1.0
+        self._geoip_next_check = 0.0
+
+        # One bounded cache per instance, unlike lru_cache on the method which would be shared and keep
+        # every instance alive. Caching the bound method is a reference cycle, freed with the instance
+        # by the garbage collector
+        self._cached_lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+        # Unknown IP addresses are kept once each and written out in batches
         self.unknown_ip_path = Path(expandvars(r'%APPDATA%\fgpe\unknown_ip_addresses.csv'))
         self.unknown_ip_path.parent.mkdir(parents=True, exist_ok=True)
-        if not self.unknown_ip_path.exists():
-            self.unknown_ip_path.write_text('Time,IP Address\n')
+        self.unknown_ips = UnknownIPStore(self.unknown_ip_path)
 
     @property
     def csv_file_path(self) -> Path:
@@ -47,47 +86,127 @@ class LocationLookup:
         return self._backup_csv_file
 
     @property
-    def ip_network_lookup(self) -> dict[_BaseNetwork, FallGuysLocation]:
-        if self._ip_network_lookup is not None:
-            return self._ip_network_lookup
-
-        ip_network_lookup = {}
-        with open(self.csv_file_path, encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                ip_network_lookup[ip_network(row['IP Network'])] = \
-                    FallGuysLocation(row['Fall Guys Region'], row['Location'], row['Provider'])
+    def ip_network_index(self) -> IPNetworkIndex[FallGuysLocation]:
+        ip_network_index = self._ip_network_index
+        if ip_network_index is not None:
+            return ip_network_index
+
+        with self._index_lock:
+            if self._ip_network_index is not None:
+                return self._ip_network_index
+            csv_file_path = self.csv_file_path
+            ip_network_index = read_index_cache(
+                self.index_cache_path, self._index_cache_key(csv_file_path), FallGuysLocation._make)
+            if ip_network_index is None:
+                return self.compile_ip_network_index()
+
+            self._ip_network_index = ip_network_index
+            return self._ip_network_index
+
+    @staticmethod
+    def _index_cache_key(csv_file_path: Path) -> str:
+        stat = csv_file_path.stat()
+        return f'{csv_file_path}|{stat.st_size}|{stat.st_mtime_ns}'
+
+    def compile_ip_network_index(self) -> IPNetworkIndex[FallGuysLocation]:
+        """
+        Parse the CSV and write the compiled index next to the downloaded CSV
+        """
+        with self._index_lock:
+            csv_file_path = self.csv_file_path
+            cache_key = self._index_cache_key(csv_file_path)
+            ip_network_index = read_ip_network_csv(csv_file_path)
+            try:
+                write_index_cache(self.index_cache_path, cache_key, ip_network_index)
+            except OSError:
+                logger.exception('Unable to write compiled IP network index')
+
+            self._ip_network_index = ip_network_index
+            return ip_network_index
+
+    def reload_ip_networks(self) -> None:
+        """
+        Compile the current CSV and swap it in, lookups on other threads use the old index until the swap
 
-        self._ip_network_lookup = ip_network_lookup
-        return self._ip_network_lookup
+        Unknown IP addresses are only checked against the networks that were added.
+        """
+        with self._index_lock:
+            old_index = self._ip_network_index
+            new_index = self.compile_ip_network_index()
+        self._cached_lookup.cache_clear()
+        self.unknown_ips.reclassify(new_index if old_index is None else new_index.added_since(old_index))
 
     def clear_ip_network_lookup_cache(self) -> None:
-        self._ip_network_lookup = None
+        self._ip_network_index = None
+        self._cached_lookup.cache_clear()
+
+    def _check_geoip_database(self) -> None:
+        """
+        Open the GeoIP database when it appears and reopen it when it's replaced
+        """
+        now = time.monotonic()
+        if now < self._geoip_next_check:
+            return
+        self._geoip_next_check = now + self.geoip_check_interval
+        try:
+            geoip_mtime: Optional[float] = self.geoip_path.stat().st_mtime
+        except OSError:
+            geoip_mtime = None
+
+        if geoip_mtime == self._geoip_mtime:
+            return
+
+        self._close_geoip_reader()
+        if geoip_mtime is not None:
+            # Third Party Modules
+            import geoip2.database
+
+            self._geoip_reader = geoip2.database.Reader(str(self.geoip_path), mode=geoip2.database.MODE_MMAP)
+        self._geoip_mtime = geoip_mtime
+        self._cached_lookup.cache_clear()
+
+    def _close_geoip_reader(self) -> None:
+        if self._geoip_reader is not None:
+            self._geoip_reader.close()
+            self._geoip_reader = None
+
+    def close(self) -> None:
+        self.unknown_ips.close()
+        self._close_geoip_reader()
+        self._geoip_mtime = None
+        self._geoip_next_check = 0.0
+        self._cached_lookup.cache_clear()
+
+    def cache_info(self):
+        """
+        Hits, misses, max size and current size of the lookup cache
+        """
+        return self._cached_lookup.cache_info()
 
-    @cache
     def lookup(self, ip_str: str, record_unknown: bool = True) -> FallGuysLocation:
+        self._check_geoip_database()
+        location, unlisted = self._cached_lookup(ip_str)
+        # Recorded outside the cache so every lookup of an unknown IP updates its count and last seen time
+        if unlisted and record_unknown:
+            self.unknown_ips.record(ip_str)
+        return location
+
+    def _lookup(self, ip_str: str) -> tuple[FallGuysLocation, bool]:
+        """
+        The location, and whether the IP is in none of the IP networks
+        """
         ip_addr = ip_address(ip_str)
-        if self._use_geoip:
-            with geoip2.database.Reader(self.geoip_path) as reader:
-                try:
-                    geoip_response = reader.city(ip_addr)
-                    return FallGuysLocation(geoip_response.country.name, geoip_response.city.name, 'Unknown')
-                except geoip2.errors.AddressNotFoundError:
-                    return UNKNOWN_LOCATION
-
-        for network, location in self.ip_network_lookup.items():
-            if ip_addr in network:
-                return location
-
-        if not record_unknown:
-            return UNKNOWN_LOCATION
-
-        with open(self.unknown_ip_path, 'a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                ip_str,
-            ])
-
-        return UNKNOWN_LOCATION
-        
+        if self._geoip_reader is not None:
+            # Third Party Modules
+            import geoip2.errors
+
+            try:
+                geoip_response = self._geoip_reader.city(ip_addr)
+                return FallGuysLocation(geoip_response.country.name, geoip_response.city.name, 'Unknown'), False
+            except geoip2.errors.AddressNotFoundError:
+                return UNKNOWN_LOCATION, False
+
+        location = self.ip_network_index.lookup(ip_addr)
+        if location is not None:
+            return location, False
+        return UNKNOWN_LOCATION, True
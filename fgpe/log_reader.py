@@ -1,6 +1,15 @@
 import os
+import time
+import threading
 from enum import Enum
 from dataclasses import dataclass
+from typing import BinaryIO, Callable, Optional
+
+from .file_watch import FileEvent, FileWatcher, watch_file
+
+CONNECTED_MARKER = b"[StateConnectToGame] We're connected to the server!"
+SHUTDOWN_MARKER = b'[FG_UnityInternetNetworkManager] FG_NetworkManager shutdown completed!'
+MARKER_OVERLAP = max(len(CONNECTED_MARKER), len(SHUTDOWN_MARKER))
 
 
 class ServerState(Enum):
@@ -17,65 +26,172 @@ class ConnectionDetails:
 class LogReader:
     """
     Reads Fall Guys Logs to get current connected IP address
+
+    The log is read as bytes and only the bytes appended since the last read
+    are searched. When the log is new, rotated or truncated the most recent
+    connect or shutdown line is found by scanning backwards from the end.
+
+    After watch() the log is read when a file watcher reports a change
+    rather than on every call, and listeners are called from the watcher
+    thread as soon as the connection changes.
     """
-    def __init__(self):
+    def __init__(self, log_location: Optional[str] = None, block_size: int = 1024 * 1024):
         self.position = 0
         self.current_ip = '0.0.0.0'
         self.current_port = '0'
         self.current_server_state = ServerState.NOT_CONNECTED
-        self.prev_log_mtime = None
-        self.prev_log_location = os.path.expandvars(r'%USERPROFILE%\AppData\LocalLow\Mediatonic\FallGuys_client\Player-prev.log')
-        self.log_mtime = None
-        self.log_location = os.path.expandvars(r'%USERPROFILE%\AppData\LocalLow\Mediatonic\FallGuys_client\Player.log')
-
-    def log_updated(self) -> bool:
-        if not os.path.exists(self.log_location):
-            return False
-
-        new_log_mtime = os.path.getmtime(self.log_location)
-        updated = not (self.log_mtime == new_log_mtime)
-        self.log_mtime = new_log_mtime
-        return updated
+        self.block_size = block_size
+        self.file_id: Optional[tuple[int, int]] = None
+        self.modified_time: Optional[float] = None
+        self._lock = threading.Lock()
+        self._watcher: Optional[FileWatcher] = None
+        self._listeners: list[Callable[[ServerState, ConnectionDetails], None]] = []
+        if log_location is None:
+            log_location = os.path.expandvars(r'%USERPROFILE%\AppData\LocalLow\Mediatonic\FallGuys_client\Player.log')
+        self.log_location = log_location
+
+    def _set_connection_from_line(self, line: bytes) -> None:
+        ip_address, _, port = line.split()[-1].decode('ascii', errors='ignore').rpartition(':')
+        if not ip_address:
+            return
+        self.current_ip = ip_address
+        self.current_port = port
 
-    def log_changed(self) -> bool:
-        if not os.path.exists(self.prev_log_location):
-            return False
+    def _set_disconnected(self) -> None:
+        self.current_ip = '0.0.0.0'
+        self.current_port = '0'
 
-        new_prev_log_mtime = os.path.getmtime(self.prev_log_location)        
-        changed = self.prev_log_mtime == new_prev_log_mtime
-        self.prev_log_mtime = new_prev_log_mtime
-        return changed
+    def process_bytes(self, data: bytes) -> int:
+        """
+        Update the connection from complete lines in data, returns how many bytes were consumed
+        """
+        end = data.rfind(b'\n') + 1
+        connected = data.rfind(CONNECTED_MARKER, 0, end)
+        shutdown = data.rfind(SHUTDOWN_MARKER, 0, end)
+        if connected > shutdown:
+            self._set_connection_from_line(data[connected:data.find(b'\n', connected)])
+        elif shutdown > connected:
+            self._set_disconnected()
+        return end
+
+    def _read_forward(self, f: BinaryIO, size: int) -> None:
+        while self.position < size:
+            f.seek(self.position)
+            data = f.read(min(self.block_size, size - self.position))
+            if b'\n' not in data:
+                # Line longer than a block, or a partial line still being written
+                data += f.readline()
+            consumed = self.process_bytes(data)
+            if consumed == 0:
+                return
+            self.position += consumed
+
+    def _read_backward(self, f: BinaryIO, size: int) -> None:
+        # Only complete lines count, a partial last line is read once it's finished
+        end = size
+        while end > 0:
+            start = max(0, end - self.block_size)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        self.position = end
+
+        # Blocks overlap by a marker length so markers spanning two blocks are found
+        self._set_disconnected()
+        high = end
+        while high > 0:
+            low = max(0, high - self.block_size)
+            f.seek(low)
+            data = f.read(min(high + MARKER_OVERLAP, end) - low)
+            connected = data.rfind(CONNECTED_MARKER)
+            shutdown = data.rfind(SHUTDOWN_MARKER)
+            if connected > shutdown:
+                f.seek(low + connected)
+                self._set_connection_from_line(f.readline().rstrip(b'\r\n'))
+                return
+            if shutdown > connected:
+                return
+            high = low
 
     def _update_ip_from_log_file(self) -> None:
-        if not os.path.exists(self.log_location):
+        # A stat is enough to tell nothing has been appended
+        try:
+            stat = os.stat(self.log_location)
+        except OSError:
+            self.modified_time = None
+            return
+        self.modified_time = stat.st_mtime
+        if (stat.st_dev, stat.st_ino) == self.file_id and stat.st_size == self.position:
             return
 
-        ip_address = self.current_ip
-        port = self.current_port
-
-        with open(self.log_location, errors='ignore') as f:
-            f.seek(self.position)
-            for line in f:
-                if '[FG_UnityInternetNetworkManager] FG_NetworkManager shutdown completed!' in line:
-                    ip_address = '0.0.0.0'
-                    port = '0'
-                elif "[StateConnectToGame] We're connected to the server!" in line:
-                    ip_address, port = line.split()[-1].split(':')
-
-            # Record last position and IP address so we don't read file too many times
-            self.position = f.tell()
-            self.current_ip = ip_address
-            self.current_port = port
-
-    def get_connection_details(self) -> tuple[ServerState, ConnectionDetails]:
-        if self.log_updated():
-            if self.log_changed():
-                self.position = 0
-            self._update_ip_from_log_file()
+        try:
+            f = open(self.log_location, 'rb')
+        except OSError:
+            return
 
+        with f:
+            stat = os.fstat(f.fileno())
+            file_id = (stat.st_dev, stat.st_ino)
+            if file_id != self.file_id or stat.st_size < self.position:
+                # New, rotated or truncated log
+                self.file_id = file_id
+                self._read_backward(f, stat.st_size)
+            elif stat.st_size > self.position:
+                self._read_forward(f, stat.st_size)
+
+    def _connection_details(self) -> tuple[ServerState, ConnectionDetails]:
         if self.current_ip == '0.0.0.0':
             self.current_server_state = ServerState.NOT_CONNECTED
         else:
             self.current_server_state = ServerState.CONNECTED
 
         return self.current_server_state, ConnectionDetails(self.current_ip, self.current_port)
+
+    def get_connection_details(self) -> tuple[ServerState, ConnectionDetails]:
+        with self._lock:
+            if self._watcher is None:
+                self._update_ip_from_log_file()
+            return self._connection_details()
+
+    def log_age(self) -> Optional[float]:
+        """
+        Seconds since the log was last written, None if there is no log
+        """
+        with self._lock:
+            if self._watcher is None:
+                self._update_ip_from_log_file()
+            if self.modified_time is None:
+                return None
+            return time.time() - self.modified_time
+
+    def add_listener(self, listener: Callable[[ServerState, ConnectionDetails], None]) -> None:
+        self._listeners.append(listener)
+
+    def watch(self, watcher_factory: Callable[[str, Callable[[FileEvent], None]], FileWatcher] = watch_file) -> None:
+        # Start watching before the first read so no write in between is missed
+        watcher = watcher_factory(self.log_location, self.handle_file_event)
+        watcher.start()
+        with self._lock:
+            self._update_ip_from_log_file()
+            self._watcher = watcher
+
+    def stop_watching(self) -> None:
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.stop()
+
+    def handle_file_event(self, event: FileEvent) -> None:
+        with self._lock:
+            previous = (self.current_ip, self.current_port)
+            if event is FileEvent.ROTATED:
+                self.file_id = None
+            self._update_ip_from_log_file()
+            changed = previous != (self.current_ip, self.current_port)
+            details = self._connection_details()
+
+        if changed:
+            for listener in self._listeners:
+                listener(*details)
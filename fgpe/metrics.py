@@ -0,0 +1,141 @@
+# Standard Library
+import logging
+import threading
+from typing import Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local Modules
+from .pinger import PingConnect
+from .ping_worker import PingSample
+from .locations import FallGuysLocation
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in milliseconds, a final +Inf bucket is implied
+PING_BUCKETS = (10, 20, 30, 40, 50, 75, 100, 150, 200, 300, 500, 1000)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RegionHistogram:
+    __slots__ = ('bucket_counts', 'count', 'sum', 'lost')
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(PING_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.lost = 0
+
+
+class PingMetrics:
+    """
+    Ping histograms per client and region in the Prometheus text format
+
+    Samples from a named client (--log NAME=PATH) carry a client label,
+    so two accounts in the same lobby are kept apart. The text is only
+    rendered again after a new sample, so a scrape with nothing new is
+    the cost of copying cached bytes.
+    """
+    def __init__(self):
+        self.regions: dict[tuple[str, str], RegionHistogram] = {}
+        self._lock = threading.Lock()
+        self._rendered: Optional[bytes] = None
+
+    def observe(self, sample: PingSample, location: FallGuysLocation, client: str = '') -> None:
+        with self._lock:
+            histogram = self.regions.get((client, location.region))
+            if histogram is None:
+                histogram = self.regions[client, location.region] = RegionHistogram()
+
+            if sample.status == PingConnect.CONNECTED and sample.ping_time is not None:
+                index = len(PING_BUCKETS)
+                for i, bound in enumerate(PING_BUCKETS):
+                    if sample.ping_time <= bound:
+                        index = i
+                        break
+                histogram.bucket_counts[index] += 1
+                histogram.count += 1
+                histogram.sum += sample.ping_time
+            else:
+                histogram.lost += 1
+            self._rendered = None
+
+    def render(self) -> bytes:
+        with self._lock:
+            if self._rendered is None:
+                self._rendered = self._render().encode()
+            return self._rendered
+
+    def _render(self) -> str:
+        lines = [
+            '# HELP fgpe_ping_ms Round trip time to the connected Fall Guys server in milliseconds',
+            '# TYPE fgpe_ping_ms histogram',
+        ]
+        for key in sorted(self.regions):
+            histogram = self.regions[key]
+            labels = format_labels(*key)
+            cumulative = 0
+            for bound, bucket_count in zip((*PING_BUCKETS, '+Inf'), histogram.bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'fgpe_ping_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'fgpe_ping_ms_sum{{{labels}}} {histogram.sum}')
+            lines.append(f'fgpe_ping_ms_count{{{labels}}} {histogram.count}')
+
+        lines.append('# HELP fgpe_ping_lost_total Probes to the connected Fall Guys server without a reply')
+        lines.append('# TYPE fgpe_ping_lost_total counter')
+        for key in sorted(self.regions):
+            lines.append(f'fgpe_ping_lost_total{{{format_labels(*key)}}} {self.regions[key].lost}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(client: str, region: str) -> str:
+    """
+    The client label is left out for the unnamed client of a single --log, an empty label is the same as none
+    """
+    labels = f'region="{escape_label(region)}"'
+    return f'client="{escape_label(client)}",{labels}' if client else labels
+
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class MetricsServer:
+    """
+    Serves PingMetrics at /metrics from a background thread
+    """
+    def __init__(self, metrics: PingMetrics, host: str = '127.0.0.1', port: int = 9464):
+        self.metrics = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split('?')[0] not in ('/', '/metrics'):
+                    handler.send_error(404)
+                    return
+                body = metrics.render()
+                handler.send_response(200)
+                handler.send_header('Content-Type', CONTENT_TYPE)
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, format, *args):
+                logger.debug(format, *args)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.server.serve_forever, name='metrics', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -1,8 +1,13 @@
 # Standard Library
 import sys
 import logging
+import threading
 import tkinter as tk
-from typing import Callable, Any
+from collections import deque
+from typing import Callable, Any, Optional, Sequence
+
+# Local Modules
+from .exceptions import GracefulExit
 
 logger = logging.getLogger(__name__)
 
@@ -15,8 +20,137 @@ def report_callback_exception(exc_type, val, tb):
     sys.exit(1)
 
 
-class GracefulExit(Exception):
-    "Allows callbacks to gracefully exit without logging error"
+class Sparkline:
+    """
+    Graph of the last max_samples pings drawn on a Tk Canvas, with the rolling average and lost pings marked
+
+    A line segment and a loss marker are created once for each sample slot.
+    Each new sample moves every item left with one call and reuses the
+    items that just scrolled off the left edge for the new sample, so the
+    Tk calls per sample are constant however many samples are shown. The
+    scale only changes, redrawing every item, when a ping is above it or
+    when the pings that raised it have scrolled off.
+    """
+    def __init__(self, canvas, width: int = 300, height: int = 40, max_samples: int = 60, avg_size: int = 10,
+                 initial_max_ms: float = 100.0, color: str = 'green3', avg_color: str = 'grey60',
+                 loss_color: str = 'red3'):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        self.max_samples = max_samples
+        self.avg_size = avg_size
+        self.initial_max_ms = initial_max_ms
+        self.max_ms = initial_max_ms
+        self.step = width / (max_samples - 1)
+        self.samples: deque[Optional[float]] = deque(maxlen=max_samples)
+        self.recent: deque[float] = deque(maxlen=avg_size)
+        self.recent_total = 0.0
+        self.rescales = 0
+
+        # One segment and one loss marker per sample, reused round robin
+        self.segments = [
+            canvas.create_line(0, 0, 0, 0, fill=color, width=2, state='hidden', tags=('sample',))
+            for _ in range(max_samples)
+        ]
+        self.loss_markers = [
+            canvas.create_line(0, 0, 0, height, fill=loss_color, width=2, state='hidden', tags=('sample',))
+            for _ in range(max_samples)
+        ]
+        self.average = canvas.create_line(0, 0, width, 0, fill=avg_color, dash=(2, 2), state='hidden')
+        self.next_slot = 0
+
+    def _scale(self, highest: float) -> float:
+        """
+        The initial scale doubled until highest fits
+        """
+        max_ms = self.initial_max_ms
+        while highest > max_ms:
+            max_ms *= 2
+        return max_ms
+
+    def _y(self, ping_time: float) -> float:
+        return self.height - min(ping_time, self.max_ms) / self.max_ms * (self.height - 2) - 1
+
+    def clear(self) -> None:
+        if not self.samples:
+            return
+        for item in self.segments + self.loss_markers:
+            self.canvas.itemconfigure(item, state='hidden')
+        self.canvas.itemconfigure(self.average, state='hidden')
+        self.samples.clear()
+        self.recent.clear()
+        self.recent_total = 0.0
+        self.max_ms = self.initial_max_ms
+        self.next_slot = 0
+
+    def extend(self, ping_times: Sequence[Optional[float]]) -> None:
+        """
+        Add samples in order, None for a lost ping
+        """
+        if not ping_times:
+            return
+        replies = [ping_time for ping_time in ping_times if ping_time is not None]
+        highest = max(replies, default=0.0)
+        if highest > self.max_ms:
+            self.max_ms = self._scale(highest)
+            self.samples.extend(ping_times)
+            self._redraw()
+        else:
+            for ping_time in ping_times:
+                self._add(ping_time)
+            # A spike sets the scale only while it is on the graph
+            if self.max_ms > self.initial_max_ms:
+                max_ms = self._scale(max((ping_time for ping_time in self.samples if ping_time is not None),
+                                         default=0.0))
+                if max_ms < self.max_ms:
+                    self.max_ms = max_ms
+                    self._redraw()
+        for ping_time in replies:
+            if len(self.recent) == self.avg_size:
+                self.recent_total -= self.recent[0]
+            self.recent.append(ping_time)
+            self.recent_total += ping_time
+        if self.recent:
+            y = self._y(self.recent_total / len(self.recent))
+            self.canvas.coords(self.average, 0, y, self.width, y)
+            self.canvas.itemconfigure(self.average, state='normal')
+
+    def _add(self, ping_time: Optional[float]) -> None:
+        previous = self.samples[-1] if self.samples else None
+        self.samples.append(ping_time)
+        self.canvas.move('sample', -self.step, 0)
+        self._draw_slot(self.next_slot, previous, ping_time, self.width)
+        self.next_slot = (self.next_slot + 1) % self.max_samples
+
+    def _draw_slot(self, slot: int, previous: Optional[float], ping_time: Optional[float], x: float) -> None:
+        segment = self.segments[slot]
+        loss_marker = self.loss_markers[slot]
+        if ping_time is None:
+            self.canvas.itemconfigure(segment, state='hidden')
+            self.canvas.coords(loss_marker, x, 0, x, self.height)
+            self.canvas.itemconfigure(loss_marker, state='normal')
+            return
+
+        self.canvas.itemconfigure(loss_marker, state='hidden')
+        y = self._y(ping_time)
+        if previous is None:
+            # A dot, until the next sample joins it up
+            self.canvas.coords(segment, x, y, x + 1, y)
+        else:
+            self.canvas.coords(segment, x - self.step, self._y(previous), x, y)
+        self.canvas.itemconfigure(segment, state='normal')
+
+    def _redraw(self) -> None:
+        self.rescales += 1
+        for item in self.segments + self.loss_markers:
+            self.canvas.itemconfigure(item, state='hidden')
+        self.next_slot = 0
+        previous = None
+        first_x = self.width - (len(self.samples) - 1) * self.step
+        for index, ping_time in enumerate(self.samples):
+            self._draw_slot(self.next_slot, previous, ping_time, first_x + index * self.step)
+            self.next_slot = (self.next_slot + 1) % self.max_samples
+            previous = ping_time
 
 
 class Overlay:
@@ -28,11 +162,16 @@ class Overlay:
                  close_callback: Callable[[Any], None],
                  initial_text: str,
                  initial_delay: int,
-                 get_new_text_callback: Callable[[], tuple[int, str]]):
+                 get_new_text_callback: Callable[[], tuple[int, str]],
+                 get_graph_samples_callback: Optional[Callable[[], tuple[Any, list[Optional[float]]]]] = None):
         self.close_callback = close_callback
         self.initial_text = initial_text
         self.initial_delay = initial_delay
         self.get_new_text_callback = get_new_text_callback
+        self.get_graph_samples_callback = get_graph_samples_callback
+        self.last_text: Optional[str] = None
+        self.graph_key: Any = None
+        self._after_id: Optional[str] = None
         self.root = tk.Tk()
         self.root.report_callback_exception = report_callback_exception
 
@@ -58,6 +197,13 @@ class Overlay:
         )
         self.ping_label.grid(row=0, column=1)
 
+        # Set up the optional graph of recent pings
+        self.sparkline: Optional[Sparkline] = None
+        if get_graph_samples_callback is not None:
+            self.graph_canvas = tk.Canvas(self.root, width=300, height=40, bg='grey19', highlightthickness=0)
+            self.graph_canvas.grid(row=1, column=0, columnspan=2, sticky='w')
+            self.sparkline = Sparkline(self.graph_canvas, width=300, height=40)
+
         # Define Window Geometry
         self.root.overrideredirect(True)
         self.root.geometry("+5+5")
@@ -66,10 +212,39 @@ class Overlay:
 
     def update_label(self) -> None:
         wait_time, update_text = self.get_new_text_callback()
-        self.ping_text.set(update_text)
-        self.root.after(wait_time, self.update_label)
+        # Tk redraws whatever is set, so nothing is set when nothing has changed
+        if update_text != self.last_text:
+            self.ping_text.set(update_text)
+            self.last_text = update_text
+        if self.sparkline is not None and self.get_graph_samples_callback is not None:
+            graph_key, ping_times = self.get_graph_samples_callback()
+            if graph_key != self.graph_key:
+                self.sparkline.clear()
+                self.graph_key = graph_key
+            self.sparkline.extend(ping_times)
+        self._after_id = self.root.after(wait_time, self.update_label)
+
+    def wake(self) -> None:
+        """
+        Update now rather than at the next scheduled update, may be called from any thread
+        """
+        # Tk runs calls from other threads on the main loop and waits for them, so this thread waits
+        # instead of the caller, which may be a thread the main loop is waiting on to stop
+        threading.Thread(target=self._schedule_wake, name='overlay-wake', daemon=True).start()
+
+    def _schedule_wake(self) -> None:
+        try:
+            self.root.after(0, self._wake)
+        except (RuntimeError, tk.TclError):
+            # Not running the main loop, or Tk isn't built with threads, the next scheduled update comes soon enough
+            pass
+
+    def _wake(self) -> None:
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self.update_label()
 
     def run(self) -> None:
         self.ping_text.set(self.initial_text)
-        self.root.after(self.initial_delay, self.update_label)
+        self._after_id = self.root.after(self.initial_delay, self.update_label)
         self.root.mainloop()
@@ -0,0 +1,319 @@
+# Standard Library
+import time
+import queue
+import logging
+import threading
+import subprocess
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, NamedTuple, Optional
+
+# Local Modules
+from .pinger import Pinger, PingConnect, CREATE_NO_WINDOW, format_host, parse_ping_line, streaming_ping_command
+from .log_reader import ConnectionDetails
+from .instrumentation import Instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+class PingSample(NamedTuple):
+    timestamp: float
+    connection: ConnectionDetails
+    status: PingConnect
+    ping_time: Optional[float]
+
+
+class PingWorker:
+    """
+    Pings the current connection on a background thread so the GUI never waits on a ping
+
+    Samples are published to a thread safe queue which the GUI drains on each update,
+    with a burst size above 1 that many pings are sent concurrently each interval
+    """
+    def __init__(self,
+                 interval: float = 5.0,
+                 pinger_factory: Callable[[str], Pinger] = Pinger,
+                 burst_size: int = 1,
+                 instrumentation: Optional[Instrumentation] = None):
+        self.interval = interval
+        self.pinger_factory = pinger_factory
+        self.burst_size = burst_size
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self.samples: queue.SimpleQueue[PingSample] = queue.SimpleQueue()
+        self.connection: Optional[ConnectionDetails] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Start may be called from a log watcher thread as well as the GUI
+        self._lock = threading.RLock()
+
+    def start(self, connection: ConnectionDetails) -> None:
+        with self._lock:
+            if connection == self.connection and self._thread is not None and self._thread.is_alive():
+                return
+
+            self.stop()
+            self.connection = connection
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(connection, self._stop_event),
+                name=f'ping-{connection.ip}',
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Signal the thread to stop without waiting for an in flight ping to finish
+        """
+        with self._lock:
+            self._stop_event.set()
+            self._thread = None
+            self.connection = None
+
+    def drain(self) -> list[PingSample]:
+        samples = []
+        while True:
+            try:
+                samples.append(self.samples.get_nowait())
+            except queue.Empty:
+                return samples
+
+    def _run(self, connection: ConnectionDetails, stop_event: threading.Event) -> None:
+        pinger = self.pinger_factory(format_host(connection.ip, connection.port))
+        with ThreadPoolExecutor(max_workers=self.burst_size, thread_name_prefix=f'ping-{connection.ip}') as executor:
+            while not stop_event.is_set():
+                if self.burst_size == 1:
+                    results = [self._ping(pinger)]
+                else:
+                    results = list(executor.map(self._ping, repeat(pinger, self.burst_size)))
+
+                # Connection may have changed while waiting on the ping
+                if stop_event.is_set():
+                    return
+
+                timestamp = time.time()
+                for status, ping_time in results:
+                    self.samples.put(PingSample(timestamp, connection, status, ping_time))
+                stop_event.wait(self.interval)
+
+    def _ping(self, pinger: Pinger) -> tuple[PingConnect, Optional[float]]:
+        try:
+            with self.instrumentation.phase('probe'):
+                return pinger.get_ping_time()
+        except Exception:
+            logger.exception('Unexpected exception pinging %s', pinger.ip_address)
+            return PingConnect.NOT_CONNECTED, None
+
+
+class StreamingPingWorker(PingWorker):
+    """
+    Keeps one long running ping process for the current connection and parses its output as it arrives
+
+    The process is restarted with an exponential back off if it exits
+    """
+    def __init__(self,
+                 interval: float = 1.0,
+                 command_factory: Callable[[str, float], list[str]] = streaming_ping_command,
+                 min_restart_delay: float = 1.0,
+                 max_restart_delay: float = 30.0):
+        super().__init__(interval)
+        self.command_factory = command_factory
+        self.min_restart_delay = min_restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.restarts = 0
+        self._processes: dict[threading.Event, subprocess.Popen] = {}
+        self._processes_lock = threading.Lock()
+
+    def stop(self) -> None:
+        with self._lock:
+            stop_event = self._stop_event
+            super().stop()
+        with self._processes_lock:
+            process = self._processes.pop(stop_event, None)
+        if process is not None:
+            process.kill()
+
+    def _run(self, connection: ConnectionDetails, stop_event: threading.Event) -> None:
+        restart_delay = self.min_restart_delay
+        while not stop_event.is_set():
+            try:
+                process = subprocess.Popen(
+                    self.command_factory(connection.ip, self.interval),
+                    stdin=subprocess.PIPE,  # Required for PyInstaller --noconsole
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    encoding='ascii',
+                    errors='ignore',
+                    creationflags=CREATE_NO_WINDOW  # Required for noflickering in exe
+                )
+            except OSError:
+                logger.exception('Unable to start ping process for %s', connection.ip)
+            else:
+                with self._processes_lock:
+                    self._processes[stop_event] = process
+                if not stop_event.is_set() and self._read_samples(process, connection, stop_event):
+                    restart_delay = self.min_restart_delay
+                with self._processes_lock:
+                    self._processes.pop(stop_event, None)
+                process.kill()
+                process.wait()
+
+            if stop_event.wait(restart_delay):
+                return
+            restart_delay = min(restart_delay * 2, self.max_restart_delay)
+            self.restarts += 1
+
+    def _read_samples(self, process: subprocess.Popen, connection: ConnectionDetails, stop_event: threading.Event) -> bool:
+        """
+        Publish a sample per result line until the process exits, returns if any replies were seen
+        """
+        replied = False
+        assert process.stdout is not None
+        for line in process.stdout:
+            if stop_event.is_set():
+                break
+
+            result = parse_ping_line(line)
+            if result is None:
+                continue
+
+            status, ping_time = result
+            replied = replied or status == PingConnect.CONNECTED
+            self.samples.put(PingSample(time.time(), connection, status, ping_time))
+        return replied
+
+
+class PingPool:
+    """
+    Probes the connections of many clients from one scheduler thread and a bounded thread pool
+
+    Each client gets a worker from worker() that is used like a PingWorker.
+    Rather than a thread and pool per client, the scheduler submits each
+    connection's burst when it is due, and the connection is due again
+    interval seconds after its burst completes, so idle clients cost nothing
+    and the threads in use are bounded by max_workers however many clients
+    there are. Each worker's interval may be changed while it runs.
+    """
+    def __init__(self,
+                 interval: float = 5.0,
+                 pinger_factory: Callable[[str], Pinger] = Pinger,
+                 burst_size: int = 1,
+                 max_workers: int = 8,
+                 instrumentation: Optional[Instrumentation] = None):
+        self.interval = interval
+        self.pinger_factory = pinger_factory
+        self.burst_size = burst_size
+        self.max_workers = max_workers
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self._scheduled: dict[threading.Event, ScheduledConnection] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def worker(self) -> 'PooledPingWorker':
+        return PooledPingWorker(self)
+
+    def schedule(self, worker: 'PooledPingWorker', connection: ConnectionDetails, stop_event: threading.Event) -> None:
+        pinger = self.pinger_factory(format_host(connection.ip, connection.port))
+        with self._lock:
+            self._scheduled[stop_event] = ScheduledConnection(worker, connection, pinger)
+            if self._thread is None:
+                self._stop_event = threading.Event()
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ping-pool')
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._executor, self._stop_event), name='ping-pool', daemon=True,
+                )
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self) -> None:
+        """
+        Stop scheduling without waiting for in flight pings to finish
+        """
+        with self._lock:
+            self._scheduled.clear()
+            self._stop_event.set()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._thread = None
+        self._wake.set()
+
+    def _run(self, executor: ThreadPoolExecutor, stop_event: threading.Event) -> None:
+        while not stop_event.is_set():
+            timeout = None
+            with self._lock:
+                if stop_event.is_set():
+                    return
+                now = time.monotonic()
+                for connection_stop_event, scheduled in list(self._scheduled.items()):
+                    if connection_stop_event.is_set():
+                        del self._scheduled[connection_stop_event]
+                    elif scheduled.in_flight:
+                        continue
+                    elif scheduled.next_due <= now:
+                        scheduled.in_flight = self.burst_size
+                        scheduled.results = []
+                        for _ in range(self.burst_size):
+                            executor.submit(self._ping, scheduled, connection_stop_event)
+                    elif timeout is None or scheduled.next_due - now < timeout:
+                        timeout = scheduled.next_due - now
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _ping(self, scheduled: 'ScheduledConnection', stop_event: threading.Event) -> None:
+        try:
+            with self.instrumentation.phase('probe'):
+                result = scheduled.pinger.get_ping_time()
+        except Exception:
+            logger.exception('Unexpected exception pinging %s', scheduled.connection.ip)
+            result = PingConnect.NOT_CONNECTED, None
+
+        with self._lock:
+            scheduled.results.append(result)
+            scheduled.in_flight -= 1
+            if scheduled.in_flight:
+                return
+            results = scheduled.results
+            scheduled.next_due = time.monotonic() + scheduled.worker.interval
+
+        # Connection may have changed while waiting on the ping
+        if not stop_event.is_set():
+            timestamp = time.time()
+            for status, ping_time in results:
+                scheduled.worker.samples.put(PingSample(timestamp, scheduled.connection, status, ping_time))
+        self._wake.set()
+
+
+class ScheduledConnection:
+    __slots__ = ('worker', 'connection', 'pinger', 'next_due', 'in_flight', 'results')
+
+    def __init__(self, worker: 'PooledPingWorker', connection: ConnectionDetails, pinger: Pinger):
+        self.worker = worker
+        self.connection = connection
+        self.pinger = pinger
+        self.next_due = 0.0
+        self.in_flight = 0
+        self.results: list[tuple[PingConnect, Optional[float]]] = []
+
+
+class PooledPingWorker(PingWorker):
+    """
+    One client's pings, probed on a PingPool shared with the other clients
+    """
+    def __init__(self, pool: PingPool):
+        super().__init__(pool.interval, pool.pinger_factory, pool.burst_size, pool.instrumentation)
+        self.pool = pool
+
+    def start(self, connection: ConnectionDetails) -> None:
+        with self._lock:
+            if connection == self.connection:
+                return
+
+            self.stop()
+            self.connection = connection
+            self._stop_event = threading.Event()
+            self.pool.schedule(self, connection, self._stop_event)
@@ -1,7 +1,20 @@
 # Standard Library
+import re
+import sys
+import socket
 import subprocess
 from enum import Enum
-from typing import Optional
+from abc import ABC, abstractmethod
+from time import perf_counter_ns
+from typing import Optional, Union
+
+# Required for no flickering in exe, only exists on Windows
+CREATE_NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+# Windows: "Reply from 1.2.3.4: bytes=32 time=12ms TTL=57" or "time<1ms"
+# Linux iputils: "64 bytes from 1.2.3.4: icmp_seq=1 ttl=57 time=12.3 ms"
+REPLY_TIME = re.compile(r'(?:Reply from|bytes from) .*?time[=<]([\d.]+) ?ms')
+NO_REPLY_MARKERS = ('Request timed out', 'no answer yet', 'unreachable', 'Unreachable', 'General failure', 'TTL expired')
 
 
 class PingConnect(Enum):
@@ -9,38 +22,167 @@ class PingConnect(Enum):
     NOT_CONNECTED = 2
 
 
-class Pinger:
+def parse_ping_line(line: str) -> Optional[tuple[PingConnect, Optional[int]]]:
+    """
+    Parse one line of Windows or Linux ping output, returns None if the line isn't a ping result
+    """
+    for marker in NO_REPLY_MARKERS:
+        if marker in line:
+            return PingConnect.NOT_CONNECTED, None
+
+    match = REPLY_TIME.search(line)
+    if match is None:
+        return None
+    return PingConnect.CONNECTED, round(float(match.group(1)))
+
+
+def streaming_ping_command(ip_address: str, interval: float = 1.0) -> list[str]:
+    """
+    Ping command that runs until killed, printing one line per reply or missed reply
+    """
+    if sys.platform == 'win32':
+        # Windows ping always sends once a second
+        return ['ping', '-t', '-w', '1000', ip_address]
+    return ['ping', '-O', '-i', str(interval), ip_address]
+
+
+def format_host(ip_address: str, port: Union[int, str]) -> str:
+    """
+    An address and port as one host string, IPv6 addresses are bracketed so the port can't be read as part of them
+    """
+    if ':' in ip_address:
+        return f'[{ip_address}]:{port}'
+    return f'{ip_address}:{port}'
+
+
+def split_host(host: str) -> tuple[str, Optional[str]]:
+    """
+    The address and port, if any, of 'ip', 'ip:port', 'ipv6' or '[ipv6]:port'
+    """
+    if host.startswith('['):
+        ip_address, _, port = host[1:].partition(']')
+        return ip_address, port.lstrip(':') or None
+    if host.count(':') == 1:
+        ip_address, port = host.split(':')
+        return ip_address, port
+    # An unbracketed IPv6 address has no port, its last group could be mistaken for one
+    return host, None
+
+
+class ProbeBackend(ABC):
+    """
+    Measures a single round trip time in milliseconds to a server
+    """
+    @abstractmethod
+    def probe(self, ip_address: str, port: Optional[int]) -> tuple[PingConnect, Optional[float]]:
+        ...
+
+
+class SubprocessPingBackend(ProbeBackend):
     """
     Calls a subprocess to run the ping command and then parses the results
 
     Unforutnatly this can't in pure Python without admin privilages
-    As a normal process requires admin for an ICMP request (ping) 
+    As a normal process requires admin for an ICMP request (ping)
     """
-    def __init__(self, ip_address: str):
-        if ':' in ip_address:
-            self.ip_address, self.port = ip_address.split(':')
+    def probe(self, ip_address: str, port: Optional[int]) -> tuple[PingConnect, Optional[float]]:
+        if sys.platform == 'win32':
+            command = ['ping', '-n', '1', '-w', '1000', ip_address]
         else:
-            self.ip_address = ip_address
-            self.port = None
+            command = ['ping', '-c', '1', '-W', '1', ip_address]
 
-    def get_ping_time(self) -> tuple[PingConnect, Optional[int]]:
         response = subprocess.run(
-            ['ping', '-n', '1', '-w', '1000', self.ip_address],
+            command,
             stdin=subprocess.PIPE,  # Required for PyInstaller --noconsole
             capture_output=True,
             encoding='ascii',
-            creationflags=subprocess.CREATE_NO_WINDOW  # Required for noflickering in exe
+            creationflags=CREATE_NO_WINDOW  # Required for noflickering in exe
             )
         if response.returncode != 0:
             return PingConnect.NOT_CONNECTED, None
 
         for line in response.stdout.splitlines():
-            if 'Reply from' in line:
-                time_equals = line.strip().split()[4]
-                time_ms = time_equals.split('=')[1]
-                time = int(time_ms[:-2])
-                break
-        else:
+            result = parse_ping_line(line)
+            if result is not None:
+                return result
+
+        return PingConnect.NOT_CONNECTED, None
+
+
+class TCPConnectBackend(ProbeBackend):
+    """
+    Times a TCP handshake to the server, no subprocess or admin privilages needed
+
+    A refused connection still means the server answered so it counts as a reply
+    """
+    def __init__(self, timeout: float = 1.0):
+        self.timeout = timeout
+
+    def probe(self, ip_address: str, port: Optional[int]) -> tuple[PingConnect, Optional[float]]:
+        if port is None:
             return PingConnect.NOT_CONNECTED, None
 
-        return PingConnect.CONNECTED, time
+        family = socket.AF_INET6 if ':' in ip_address else socket.AF_INET
+        with socket.socket(family, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            start = perf_counter_ns()
+            try:
+                sock.connect((ip_address, port))
+            except ConnectionRefusedError:
+                pass
+            except OSError:
+                return PingConnect.NOT_CONNECTED, None
+            return PingConnect.CONNECTED, (perf_counter_ns() - start) / 1_000_000
+
+
+class UDPProbeBackend(ProbeBackend):
+    """
+    Times a UDP datagram round trip to the server's game port, no subprocess or admin privilages needed
+
+    Any reply counts, including the ICMP port unreachable the OS reports as a refused connection
+    """
+    def __init__(self, timeout: float = 1.0, payload: bytes = b'fgpe'):
+        self.timeout = timeout
+        self.payload = payload
+
+    def probe(self, ip_address: str, port: Optional[int]) -> tuple[PingConnect, Optional[float]]:
+        if port is None:
+            return PingConnect.NOT_CONNECTED, None
+
+        family = socket.AF_INET6 if ':' in ip_address else socket.AF_INET
+        with socket.socket(family, socket.SOCK_DGRAM) as sock:
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect((ip_address, port))
+            except OSError:
+                return PingConnect.NOT_CONNECTED, None
+
+            start = perf_counter_ns()
+            try:
+                sock.send(self.payload)
+                sock.recv(2048)
+            except ConnectionRefusedError:
+                pass
+            except OSError:
+                return PingConnect.NOT_CONNECTED, None
+            return PingConnect.CONNECTED, (perf_counter_ns() - start) / 1_000_000
+
+
+PROBE_BACKENDS: dict[str, type[ProbeBackend]] = {
+    'ping': SubprocessPingBackend,
+    'tcp': TCPConnectBackend,
+    'udp': UDPProbeBackend,
+}
+
+
+class Pinger:
+    """
+    Gets the round trip time to an IP address using a probe backend, by default the ping command
+    """
+    def __init__(self, ip_address: str, backend: Optional[ProbeBackend] = None):
+        self.ip_address, self.port = split_host(ip_address)
+        self.backend = backend if backend is not None else SubprocessPingBackend()
+
+    def get_ping_time(self) -> tuple[PingConnect, Optional[float]]:
+        port = int(self.port) if self.port else None
+        return self.backend.probe(self.ip_address, port)
@@ -0,0 +1,45 @@
+# Standard Library
+from typing import Optional
+
+GAME_PROCESS_NAME = 'FallGuys_client_game.exe'
+
+
+class ProcessTracker:
+    """
+    Tracks whether a process with the given name is running
+
+    Once found only that PID is checked, with its create time guarding
+    against the PID being reused, and every process is only scanned again
+    once it has exited.
+    """
+    def __init__(self, name: str = GAME_PROCESS_NAME):
+        self.name = name
+        self.pid: Optional[int] = None
+        self.create_time: Optional[float] = None
+        self.scans = 0
+
+    def is_running(self) -> bool:
+        # Third Party Modules, imported here as only needed once the log is idle
+        import psutil
+
+        if self.pid is not None:
+            try:
+                if psutil.Process(self.pid).create_time() == self.create_time:
+                    return True
+            except psutil.Error:
+                pass
+            self.pid = None
+            self.create_time = None
+        return self._scan()
+
+    def _scan(self) -> bool:
+        # Third Party Modules
+        import psutil
+
+        self.scans += 1
+        for process in psutil.process_iter(attrs=['name', 'create_time']):
+            if process.info['name'] == self.name:
+                self.pid = process.pid
+                self.create_time = process.info['create_time']
+                return True
+        return False
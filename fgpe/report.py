@@ -0,0 +1,249 @@
+"""
+Summarise stats.csv by region and location
+
+Run with: python -m fgpe.report
+"""
+# Standard Library
+import csv
+import argparse
+from pathlib import Path
+from datetime import date
+from os.path import expandvars
+from collections import defaultdict
+from typing import Callable, Optional
+
+# Local Modules
+from .streaming_stats import QuantileSketch
+from .locations import LocationLookup, FallGuysLocation
+from .stats_store import add_row_quantiles, row_quantile_indexes
+
+WINDOWS = ('day', 'week', 'month')
+# Every version of stats.csv has these, the quantile columns came later
+REQUIRED_COLUMNS = ('Start Time', 'IP Address', 'Count', 'Mean')
+
+
+class Aggregate:
+    """
+    Session count, ping weighted mean and quantile sketch of pings, rebuilt from each row's quantile columns
+    """
+    __slots__ = ('sessions', 'pings', 'weighted_sum', 'sketch')
+
+    def __init__(self):
+        self.sessions = 0
+        self.pings = 0
+        self.weighted_sum = 0.0
+        self.sketch = QuantileSketch()
+
+    def merge(self, other: 'Aggregate') -> None:
+        self.sessions += other.sessions
+        self.pings += other.pings
+        self.weighted_sum += other.weighted_sum
+        self.sketch.merge(other.sketch)
+
+    @property
+    def weighted_mean(self) -> float:
+        return self.weighted_sum / self.pings if self.pings else 0.0
+
+
+def window_function(window: str) -> Callable[[str], str]:
+    """
+    Map a 'YYYY-MM-DD' day to its time window
+    """
+    def day_to_window(day: str) -> str:
+        if window == 'day':
+            return day
+        if window == 'month':
+            return day[:7]
+        try:
+            year, week, _ = date.fromisoformat(day).isocalendar()
+        except ValueError:
+            return day
+        return f'{year}-W{week:02}'
+
+    return day_to_window
+
+
+class Group:
+    """
+    Running totals for one (location, window) while scanning
+    """
+    __slots__ = ('sessions', 'pings', 'weighted_sum', 'sketch')
+
+    def __init__(self):
+        self.sessions = 0
+        self.pings = 0
+        self.weighted_sum = 0.0
+        self.sketch = QuantileSketch()
+
+    def aggregate(self) -> Aggregate:
+        aggregate = Aggregate()
+        aggregate.sessions = self.sessions
+        aggregate.pings = self.pings
+        aggregate.weighted_sum = self.weighted_sum
+        aggregate.sketch.merge(self.sketch)
+        return aggregate
+
+
+class Report:
+    """
+    Aggregates stats.csv in a single streaming pass, locations are looked up once per distinct IP
+
+    The per row cost is a handful of dict lookups: locations are cached per
+    IP, windows per day and sketch buckets per distinct value. Quantiles
+    come from each row's quantile columns the same way as the rollups, so
+    both give the same percentiles for a region.
+    """
+    def __init__(self, locations: LocationLookup, window: str = 'month'):
+        self.locations = locations
+        self.to_window = window_function(window)
+        self.ip_locations: dict[str, FallGuysLocation] = {}
+        self.day_windows: dict[str, str] = {}
+        self.mean_buckets: dict[str, tuple[float, int]] = {}
+        self.parsed_values: dict[str, Optional[tuple[float, int]]] = {}
+        self.groups: dict[tuple[FallGuysLocation, str], Group] = {}
+        self.rows = 0
+        self.skipped = 0
+
+    def add_file(self, csv_path: Path, chunk_size: int = 4 * 1024 * 1024) -> None:
+        """
+        Read the file chunk_size bytes at a time, raises ValueError if it isn't a stats.csv
+        """
+        with open(csv_path, newline='') as f:
+            header = next(csv.reader([f.readline()]), [])
+            missing = [name for name in REQUIRED_COLUMNS if name not in header]
+            if missing:
+                raise ValueError(f'{csv_path} is not a stats.csv, it has no {", ".join(missing)} '
+                                 f'column{"s" if len(missing) > 1 else ""}')
+            indexes = [header.index(name) for name in REQUIRED_COLUMNS]
+            quantile_indexes = row_quantile_indexes(header)
+            while True:
+                lines = f.readlines(chunk_size)
+                if not lines:
+                    return
+                self._add_lines(lines, *indexes, quantile_indexes)
+
+    def _add_lines(self, lines: list[str], start_index: int, ip_index: int, count_index: int, mean_index: int,
+                   quantile_indexes: list[Optional[int]]) -> None:
+        # Local names for speed, this loop runs once per row
+        groups = self.groups
+        ip_locations = self.ip_locations
+        day_windows = self.day_windows
+        mean_buckets = self.mean_buckets
+        parsed_values = self.parsed_values
+        max_split = max(start_index, ip_index, count_index, mean_index,
+                        *(index for index in quantile_indexes if index is not None)) + 1
+        skipped = 0
+        for line in lines:
+            # Rows written by Stats never need quoting, fall back to the csv module if they do
+            fields = line.split(',', max_split) if '"' not in line else next(csv.reader([line]))
+            try:
+                count = int(fields[count_index])
+                mean_text = fields[mean_index]
+                ip = fields[ip_index]
+                day = fields[start_index][:10]
+            except (IndexError, ValueError):
+                skipped += 1
+                continue
+
+            mean_bucket = mean_buckets.get(mean_text)
+            if mean_bucket is None:
+                mean_bucket = self._mean_bucket(mean_text)
+            if count <= 0 or mean_bucket[0] <= 0:
+                skipped += 1
+                continue
+
+            location = ip_locations.get(ip)
+            if location is None:
+                try:
+                    location = ip_locations[ip] = self.locations.lookup(ip, record_unknown=False)
+                except ValueError:
+                    # Not an IP address
+                    skipped += 1
+                    continue
+            window_key = day_windows.get(day)
+            if window_key is None:
+                window_key = day_windows[day] = self.to_window(day)
+
+            group = groups.get((location, window_key))
+            if group is None:
+                group = groups[location, window_key] = Group()
+            mean = mean_bucket[0]
+            group.sessions += 1
+            group.pings += count
+            group.weighted_sum += count * mean
+            add_row_quantiles(group.sketch, count, mean, fields, quantile_indexes, parsed_values)
+
+        self.rows += len(lines)
+        self.skipped += skipped
+
+    def _mean_bucket(self, mean_text: str) -> tuple[float, int]:
+        try:
+            mean = float(mean_text)
+        except ValueError:
+            mean = 0.0
+        mean_bucket = self.mean_buckets[mean_text] = (mean, QuantileSketch.key(mean) if mean > 0 else 0)
+        return mean_bucket
+
+    def aggregates(self) -> tuple[dict[str, Aggregate], dict[tuple[str, str], Aggregate], dict[tuple[str, str], Aggregate]]:
+        """
+        Returns aggregates by region, by (region, location) and by (region, window)
+        """
+        by_region: defaultdict[str, Aggregate] = defaultdict(Aggregate)
+        by_location: defaultdict[tuple[str, str], Aggregate] = defaultdict(Aggregate)
+        by_window: defaultdict[tuple[str, str], Aggregate] = defaultdict(Aggregate)
+        for (location, window_key), group in self.groups.items():
+            aggregate = group.aggregate()
+            by_region[location.region].merge(aggregate)
+            by_location[location.region, location.location].merge(aggregate)
+            by_window[location.region, window_key].merge(aggregate)
+        return by_region, by_location, by_window
+
+    def format(self) -> str:
+        by_region, by_location, by_window = self.aggregates()
+        lines = [f'{self.rows:,} sessions read, {self.skipped:,} skipped', '']
+
+        lines.append(f'{"Region":<20}{"Location":<24}{"Sessions":>10}{"Pings":>12}{"Mean":>10}')
+        for region in sorted(by_region):
+            aggregate = by_region[region]
+            lines.append(f'{region:<20}{"(all)":<24}{format_totals(aggregate)}')
+            for (location_region, location), aggregate in sorted(by_location.items()):
+                if location_region == region:
+                    lines.append(f'{"":<20}{location:<24}{format_totals(aggregate)}')
+
+        lines.append('')
+        lines.append(f'{"Region":<20}{"Window":<12}{"Sessions":>10}{"Mean":>10}{"75th":>10}{"90th":>10}')
+        for (region, window_key), aggregate in sorted(by_window.items()):
+            lines.append(
+                f'{region:<20}{window_key:<12}{aggregate.sessions:>10,}{aggregate.weighted_mean:>10.1f}'
+                f'{format_quantile(aggregate.sketch.quantile(0.75)):>10}{format_quantile(aggregate.sketch.quantile(0.9)):>10}'
+            )
+        return '\n'.join(lines)
+
+
+def format_totals(aggregate: Aggregate) -> str:
+    return f'{aggregate.sessions:>10,}{aggregate.pings:>12,}{aggregate.weighted_mean:>10.1f}'
+
+
+def format_quantile(value: Optional[float]) -> str:
+    return '' if value is None else f'{value:.1f}'
+
+
+def main(args=None) -> None:
+    parser = argparse.ArgumentParser(prog='fgpe.report', description='Summarise stats.csv by region and location')
+    parser.add_argument('csv', nargs='?', type=Path, default=Path(expandvars(r'%APPDATA%\fgpe\stats.csv')))
+    parser.add_argument('--window', choices=WINDOWS, default='month',
+                        help='Time window for the 75th and 90th percentile distribution')
+    parsed = parser.parse_args(args)
+
+    report = Report(LocationLookup(), parsed.window)
+    try:
+        report.add_file(parsed.csv)
+    except OSError as e:
+        parser.error(f'unable to read {parsed.csv}: {e.strerror or e}')
+    except ValueError as e:
+        parser.error(str(e))
+    print(report.format())
+
+
+if __name__ == '__main__':
+    main()
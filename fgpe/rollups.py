@@ -0,0 +1,288 @@
+"""
+Running ping totals and quantile sketches per region and location, kept up to date as each session ends
+
+Rebuild from stats.csv with: python -m fgpe.rollups
+"""
+# Standard Library
+import os
+import csv
+import json
+import math
+import logging
+import argparse
+import threading
+from pathlib import Path
+from os.path import expandvars
+from typing import Any, Optional
+
+# Local Modules
+from .streaming_stats import ConnectionStats, QuantileSketch
+from .locations import LocationLookup, FallGuysLocation, UNKNOWN_LOCATION
+from .stats_store import add_row_quantiles, row_quantile_indexes
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_FORMAT_VERSION = 1
+
+
+class Rollup:
+    """
+    Session count, ping count, sum, min, max and quantile sketch of every ping at one location
+    """
+    __slots__ = ('sessions', 'count', 'sum', 'min', 'max', 'sketch')
+
+    def __init__(self):
+        self.sessions = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = QuantileSketch()
+
+    def add_session(self, session: ConnectionStats) -> None:
+        self.sessions += 1
+        self.count += session.count
+        self.sum += session.sum
+        self.min = min(self.min, session.min)
+        self.max = max(self.max, session.max)
+        self.sketch.merge(session.sketch)
+
+    def merge(self, other: 'Rollup') -> None:
+        self.sessions += other.sessions
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'sessions': self.sessions,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'sketch': self.sketch.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'Rollup':
+        rollup = cls()
+        rollup.sessions = data['sessions']
+        rollup.count = data['count']
+        rollup.sum = data['sum']
+        rollup.min = data['min']
+        rollup.max = data['max']
+        rollup.sketch = QuantileSketch.from_dict(data['sketch'])
+        return rollup
+
+
+class RollupStore:
+    """
+    Rollups by (region, location) saved to a small JSON file
+
+    Each ended session is merged in to its location's rollup and its
+    region's total, which costs the size of the session's sketch however
+    many sessions have been played, so the typical ping of a region is
+    known as soon as a server is resolved without reading stats.csv. The
+    file is written from a timer thread flush_interval seconds after the
+    first change since the last write, and on close, so ending a session
+    never waits on disk. Sessions at an unknown location are left out.
+    """
+    def __init__(self, path: Path, locations: LocationLookup, flush_interval: float = 5.0):
+        self.path = path
+        self.locations = locations
+        self.flush_interval = flush_interval
+        self.rollups: dict[tuple[str, str], Rollup] = {}
+        self.regions: dict[str, Rollup] = {}
+        self._typical: dict[str, Optional[tuple[float, float]]] = {}
+        self._dirty = False
+        self._flush_timer: Optional[threading.Timer] = None
+        # Sessions are added on the GUI thread while the timer thread writes
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        self.rollups.clear()
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text())
+                if data.get('version') != ROLLUPS_FORMAT_VERSION:
+                    raise ValueError(f'Unsupported rollups version {data.get("version")}')
+                for entry in data['rollups']:
+                    self.rollups[entry['region'], entry['location']] = Rollup.from_dict(entry)
+            except (OSError, ValueError, KeyError, TypeError):
+                logger.exception('Unable to read rollups from %s, rebuild them with python -m fgpe.rollups', self.path)
+                self.rollups.clear()
+        self._sum_regions()
+
+    def _sum_regions(self) -> None:
+        self.regions.clear()
+        self._typical.clear()
+        for (region, _), rollup in self.rollups.items():
+            region_rollup = self.regions.get(region)
+            if region_rollup is None:
+                region_rollup = self.regions[region] = Rollup()
+            region_rollup.merge(rollup)
+
+    def save(self) -> None:
+        with self._lock:
+            if self._flush_timer is not None and self._flush_timer is not threading.current_thread():
+                self._flush_timer.cancel()
+            self._flush_timer = None
+            self._dirty = False
+            data = {
+                'version': ROLLUPS_FORMAT_VERSION,
+                'rollups': [
+                    {'region': region, 'location': location, **rollup.to_dict()}
+                    for (region, location), rollup in self.rollups.items()
+                ],
+            }
+
+        # Written to a temporary file first so a crash never leaves a half written store
+        temp_path = self.path.with_suffix('.tmp')
+        try:
+            with self._write_lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path.write_text(json.dumps(data))
+                os.replace(temp_path, self.path)
+        except OSError:
+            logger.exception('Unable to write rollups to %s', self.path)
+            with self._lock:
+                self._dirty = True
+
+    def flush(self) -> None:
+        """
+        Save if anything changed since the last save
+        """
+        if self._dirty:
+            self.save()
+
+    def close(self) -> None:
+        self.flush()
+
+    def _rollup(self, location: FallGuysLocation) -> Rollup:
+        rollup = self.rollups.get((location.region, location.location))
+        if rollup is None:
+            rollup = self.rollups[location.region, location.location] = Rollup()
+        return rollup
+
+    def add_session(self, ip: str, session: ConnectionStats) -> None:
+        if session.count == 0:
+            return
+        location = self.locations.lookup(ip, record_unknown=False)
+        if location == UNKNOWN_LOCATION:
+            return
+        with self._lock:
+            self._rollup(location).add_session(session)
+            region_rollup = self.regions.get(location.region)
+            if region_rollup is None:
+                region_rollup = self.regions[location.region] = Rollup()
+            region_rollup.add_session(session)
+            self._typical.pop(location.region, None)
+            self._dirty = True
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def typical(self, region: str) -> Optional[tuple[float, float]]:
+        """
+        The 50th and 90th percentile ping of every session in the region, None if there are none
+        """
+        if region not in self._typical:
+            rollup = self.regions.get(region)
+            if rollup is None or rollup.count == 0:
+                self._typical[region] = None
+            else:
+                self._typical[region] = (rollup.sketch.quantile(0.5), rollup.sketch.quantile(0.9))
+        return self._typical[region]
+
+    def rebuild(self, csv_path: Path) -> tuple[int, int]:
+        """
+        Replace every rollup with totals from stats.csv and save, returns the rows read and skipped
+
+        Counts, sums, mins and maxes are exact. Sketches are rebuilt from
+        each row's quantile columns by add_row_quantiles, an approximation
+        of the ones kept while playing.
+        """
+        self.rollups.clear()
+        ip_locations: dict[str, FallGuysLocation] = {}
+        parsed_values: dict[str, Optional[tuple[float, int]]] = {}
+        rows = skipped = 0
+        with open(csv_path, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            try:
+                ip_index, count_index, mean_index = (header.index(name) for name in ('IP Address', 'Count', 'Mean'))
+            except ValueError:
+                raise ValueError(f'{csv_path} is not a stats.csv') from None
+            quantile_indexes = row_quantile_indexes(header)
+            for row in reader:
+                if not row:
+                    continue
+                rows += 1
+                try:
+                    ip = row[ip_index]
+                    count = int(row[count_index])
+                    mean = float(row[mean_index])
+                except (IndexError, ValueError):
+                    skipped += 1
+                    continue
+                if count <= 0 or mean <= 0:
+                    skipped += 1
+                    continue
+
+                location = ip_locations.get(ip)
+                if location is None:
+                    try:
+                        location = self.locations.lookup(ip, record_unknown=False)
+                    except ValueError:
+                        location = UNKNOWN_LOCATION
+                    ip_locations[ip] = location
+                if location == UNKNOWN_LOCATION:
+                    continue
+
+                rollup = self._rollup(location)
+                quantiles = add_row_quantiles(rollup.sketch, count, mean, row, quantile_indexes, parsed_values)
+                rollup.sessions += 1
+                rollup.count += count
+                rollup.sum += mean * count
+                rollup.min = min(rollup.min, mean if quantiles[0] is None else quantiles[0][0])
+                rollup.max = max(rollup.max, mean if quantiles[-1] is None else quantiles[-1][0])
+        self._sum_regions()
+        self.save()
+        return rows, skipped
+
+
+def format_typical(typical: Optional[tuple[float, float]]) -> str:
+    if typical is None:
+        return ''
+    return f', Typical p50/p90={typical[0]:.0f}/{typical[1]:.0f}ms'
+
+
+def main(args=None) -> None:
+    parser = argparse.ArgumentParser(prog='fgpe.rollups', description='Rebuild the per region rollups from stats.csv')
+    parser.add_argument('--csv', type=Path, default=Path(expandvars(r'%APPDATA%\fgpe\stats.csv')))
+    parser.add_argument('--rollups', type=Path, default=Path(expandvars(r'%APPDATA%\fgpe\rollups.json')))
+    parsed = parser.parse_args(args)
+
+    locations = LocationLookup()
+    store = RollupStore(parsed.rollups, locations)
+    rows, skipped = store.rebuild(parsed.csv)
+    locations.close()
+    print(f'Rebuilt {len(store.rollups)} locations from {rows:,} sessions ({skipped:,} skipped) in to {parsed.rollups}')
+    for region in sorted(store.regions):
+        rollup = store.regions[region]
+        p50, p90 = store.typical(region) or (0.0, 0.0)
+        print(f'{region:<20}{rollup.sessions:>10,} sessions{rollup.count:>12,} pings  '
+              f'Mean={rollup.mean:.1f}ms p50={p50:.1f}ms p90={p90:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Standard Library
+import math
+import time
+import threading
+from typing import Callable, Optional
+
+
+class Timer:
+    __slots__ = ('name', 'min_interval', 'max_interval', 'backoff', 'wakes', 'interval', 'next_due')
+
+    def __init__(self, name: str, min_interval: float, max_interval: float, backoff: float, wakes: bool, now: float):
+        self.name = name
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.wakes = wakes
+        self.interval = min_interval
+        self.next_due = now
+
+
+class Scheduler:
+    """
+    Named timers that back off while idle and snap back to their shortest interval on activity
+
+    Each timer is due when it is added. After a timer's work runs, ran()
+    schedules it again: after its shortest interval if there was activity,
+    otherwise after its current interval multiplied by backoff, up to its
+    longest interval. Timers that are due within coalesce seconds of each
+    other run in the same wakeup. Timers added with wakes=False only hold an
+    interval for work done elsewhere, like probing on a ping thread, and
+    never cause a wakeup. Time comes from clock so tests can use a fake one.
+    Timers may be reset from other threads, like a log watcher.
+    """
+    def __init__(self, clock: Callable[[], float] = time.monotonic, coalesce: float = 0.1):
+        self.clock = clock
+        self.coalesce = coalesce
+        self.timers: dict[str, Timer] = {}
+        # Checked on every update, so kept apart from the timers that never wake
+        self._waking: list[Timer] = []
+        self.wakeups = 0
+        self._lock = threading.Lock()
+
+    def add(self, name: str, min_interval: float, max_interval: Optional[float] = None, backoff: float = 2.0,
+            wakes: bool = True) -> Timer:
+        timer = Timer(name, min_interval, max_interval or min_interval, backoff, wakes, self.clock())
+        with self._lock:
+            self.timers[name] = timer
+            self._waking = [timer for timer in self.timers.values() if timer.wakes]
+        return timer
+
+    def due(self, name: str) -> bool:
+        return self.timers[name].next_due <= self.clock() + self.coalesce
+
+    def interval(self, name: str) -> float:
+        return self.timers[name].interval
+
+    def ran(self, name: str, active: bool = True) -> None:
+        timer = self.timers[name]
+        with self._lock:
+            if active:
+                timer.interval = timer.min_interval
+            else:
+                timer.interval = min(timer.interval * timer.backoff, timer.max_interval)
+            timer.next_due = self.clock() + timer.interval
+
+    def reset(self, name: str) -> None:
+        """
+        Back to the shortest interval and due now
+        """
+        timer = self.timers[name]
+        with self._lock:
+            timer.interval = timer.min_interval
+            timer.next_due = self.clock()
+
+    def next_wakeup(self) -> float:
+        """
+        Seconds until the next timer that wakes is due
+        """
+        next_due = math.inf
+        for timer in self._waking:
+            if timer.next_due < next_due:
+                next_due = timer.next_due
+        return max(0.0, next_due - self.clock())
+
+    def wait_ms(self) -> int:
+        """
+        Milliseconds to wait before the next wakeup, counted as a wakeup
+        """
+        self.wakeups += 1
+        next_wakeup = self.next_wakeup()
+        if next_wakeup == math.inf:
+            raise ValueError('No timers that wake are scheduled')
+        return math.ceil(next_wakeup * 1_000)
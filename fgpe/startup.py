@@ -0,0 +1,97 @@
+"""
+Report what is imported before the overlay can appear and how long it takes
+
+Run with: python -m fgpe.startup
+"""
+# Standard Library
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+from time import perf_counter
+from typing import NamedTuple
+
+# Everything that runs before the overlay window is created
+FIRST_FRAME_CODE = 'import fgpe.__main__ as main; main.parse_args([])'
+FIRST_FRAME_BUDGET_MS = 1_000
+
+# Only needed after the window is shown, or only by some options
+DEFERRED_MODULES = ('requests', 'urllib3', 'psutil', 'geoip2', 'maxminddb', 'http.server', 'cProfile', 'fgpe.metrics')
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(text: str) -> list[ImportTime]:
+    """
+    Parse the stderr of python -X importtime
+    """
+    imports = []
+    for line in text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # Header line
+        imports.append(ImportTime(module.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def measure_startup(code: str = FIRST_FRAME_CODE) -> tuple[float, list[ImportTime]]:
+    """
+    Run code in a new interpreter, returns the wall time in milliseconds including interpreter start up and the imports
+    """
+    start = perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=Path(__file__).parent.parent,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    elapsed_ms = (perf_counter() - start) * 1_000
+    return elapsed_ms, parse_importtime(result.stderr)
+
+
+def deferred_imports(imports: list[ImportTime]) -> list[str]:
+    """
+    Modules that should have been deferred until after the first frame
+    """
+    return [
+        item.module for item in imports
+        if any(item.module == name or item.module.startswith(name + '.') for name in DEFERRED_MODULES)
+    ]
+
+
+def format_report(elapsed_ms: float, imports: list[ImportTime], top: int = 15) -> str:
+    lines = [f'Time to first frame: {elapsed_ms:.0f}ms (budget {FIRST_FRAME_BUDGET_MS:,}ms)']
+    lines.append(f'{len(imports)} modules imported, {sum(item.self_us for item in imports) / 1_000:.1f}ms importing')
+    lines.append('')
+    lines.append(f'{"Module":<40}{"Self ms":>10}{"Cumulative ms":>15}')
+    for item in sorted(imports, key=lambda item: item.cumulative_us, reverse=True)[:top]:
+        lines.append(f'{item.module:<40}{item.self_us / 1_000:>10.1f}{item.cumulative_us / 1_000:>15.1f}')
+
+    deferred = deferred_imports(imports)
+    if deferred:
+        lines.append('')
+        lines.append(f'Imported before the first frame but should be deferred: {", ".join(deferred)}')
+    return '\n'.join(lines)
+
+
+def main(args=None) -> None:
+    parser = argparse.ArgumentParser(prog='fgpe.startup', description='Report imports before the overlay appears')
+    parser.add_argument('--top', type=int, default=15, help='How many of the slowest imports to list')
+    parsed = parser.parse_args(args)
+
+    elapsed_ms, imports = measure_startup()
+    print(format_report(elapsed_ms, imports, parsed.top))
+    if elapsed_ms > FIRST_FRAME_BUDGET_MS or deferred_imports(imports):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
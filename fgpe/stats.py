@@ -1,86 +1,102 @@
 # Standard Library
-import csv
+import time as time_module
 from pathlib import Path
 from datetime import datetime
 from os.path import expandvars
-from collections import defaultdict
-from statistics import mean, median, quantiles, StatisticsError
-from typing import DefaultDict, Optional
+from typing import Optional, Union
 
 # Local Libraries
+from .rollups import RollupStore
 from .log_reader import ConnectionDetails
+from .streaming_stats import ConnectionStats
+from .stats_store import StatsStore, CSVStatsStore, SessionSummary
+
+
+def format_ms(time: float) -> str:
+    """
+    Ping command times are whole milliseconds, socket probe times are shown to a tenth
+    """
+    if isinstance(time, int):
+        return str(time)
+    return f'{time:.1f}'
 
 
 class Stats:
     """
     Keep Stats of connection details and then write to file
     """
-    def __init__(self, avg_size: int = 10):
+    def __init__(self, avg_size: int = 10, store: Optional[StatsStore] = None, rollups: Optional[RollupStore] = None):
         self.avg_size = avg_size
-        self.recent_pings: DefaultDict[ConnectionDetails, list[int]] = defaultdict(list)
-        self.ping_count: DefaultDict[ConnectionDetails, int] = defaultdict(int)
-        self.ping_start_time: dict[ConnectionDetails, datetime] = {}
+        self.sessions: dict[ConnectionDetails, ConnectionStats] = {}
         self.current_connection_details: Optional[ConnectionDetails] = None
 
-        # Define stats file, check file and directory exists
-        self.stats_csv_path = Path(expandvars(r'%APPDATA%\fgpe\stats.csv'))
-        self.stats_csv_path.parent.mkdir(parents=True, exist_ok=True)
-        if not self.stats_csv_path.exists():
-            self.stats_csv_path.write_text('Start Time,End Time,IP Address,Port,Count,Min,Max,Median,Mean,75th,90th\n')
+        # Sessions are appended to stats.csv unless another store is given
+        if store is None:
+            store = CSVStatsStore(Path(expandvars(r'%APPDATA%\fgpe\stats.csv')))
+        self.store = store
+        # Each ended session is also merged in to its region's rollup when there is one
+        self.rollups = rollups
 
-
-    def add(self, connection_details: ConnectionDetails, time: int) -> None:
+    def _session(self, connection_details: ConnectionDetails) -> ConnectionStats:
         self.current_connection_details = connection_details
-        self.ping_count[connection_details] += 1
-        self.recent_pings[connection_details].append(time)
-        if connection_details not in self.ping_start_time:
-            self.ping_start_time[connection_details] = datetime.now()
+        session = self.sessions.get(connection_details)
+        if session is None:
+            session = self.sessions[connection_details] = ConnectionStats(self.avg_size)
+        return session
+
+    def add(self, connection_details: ConnectionDetails, time: float, timestamp: Optional[float] = None) -> None:
+        self._session(connection_details).add(time)
+        self.store.add_ping(timestamp or time_module.time(), connection_details, time)
+
+    def add_loss(self, connection_details: ConnectionDetails, timestamp: Optional[float] = None) -> None:
+        self._session(connection_details).add_loss()
+        self.store.add_ping(timestamp or time_module.time(), connection_details, None)
+
+    def close(self) -> None:
+        self.store.close()
+        if self.rollups is not None:
+            self.rollups.close()
 
     def stats_string(self, connection_details: ConnectionDetails) -> str:
-        current_ping = self.recent_pings[connection_details][-1]
-        max_ping = max(self.recent_pings[connection_details])
-        min_ping = min(self.recent_pings[connection_details])
-        rolling_average_ping = float(mean(self.recent_pings[connection_details][-self.avg_size:]))
-        return (f'Ping={current_ping}ms, '
-                f'Min={min_ping}ms, '
-                f'Max={max_ping}ms, '
-                f'Avg({min([len(self.recent_pings[connection_details]), self.avg_size])})={rolling_average_ping:.1f}ms')
-    
+        session = self.sessions[connection_details]
+        return (f'Ping={format_ms(session.last)}ms, '
+                f'Min={format_ms(session.min)}ms, '
+                f'Max={format_ms(session.max)}ms, '
+                f'Avg({len(session.recent)})={session.recent.mean:.1f}ms, '
+                f'Jitter={session.jitter:.1f}ms, '
+                f'Loss={session.loss_ratio:.0%}')
+
     def end_session(self, connection_details: Optional[ConnectionDetails]) -> None:
         if connection_details is None or connection_details.ip == '0.0.0.0':
             return
 
+        # Nothing to summarise if the server never replied
+        session = self.sessions.pop(connection_details, None)
+        if session is None or session.count == 0:
+            return
+
         now = datetime.now()
-        min_ping = min(self.recent_pings[connection_details])
-        max_ping = max(self.recent_pings[connection_details])
-        median_ping = median(self.recent_pings[connection_details])
-        mean_ping = mean(self.recent_pings[connection_details])
-        try:
-            percentile_75 = float(quantiles(self.recent_pings[connection_details], method='inclusive')[-1])
-        except StatisticsError:
+        if session.count > 1:
+            percentile_75: Union[float, str] = round(session.quantile(0.75), 2)
+            percentile_90: Union[float, str] = round(session.quantile(0.9), 2)
+        else:
             percentile_75 = ''
-
-        try:
-            percentile_90 = float(quantiles(self.recent_pings[connection_details], n=10, method='inclusive')[-1])
-        except StatisticsError:
             percentile_90 = ''
 
-        with open(self.stats_csv_path, 'a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                self.ping_start_time[connection_details].strftime('%Y-%m-%d %H:%M:%S'),
-                now.strftime('%Y-%m-%d %H:%M:%S'),
-                connection_details.ip,
-                connection_details.port,
-                self.ping_count[connection_details],
-                min_ping,
-                max_ping,
-                median_ping,
-                mean_ping,
-                percentile_75,
-                percentile_90
-            ])
-
-        del self.recent_pings[connection_details]
-        del self.ping_count[connection_details]
-        del self.ping_start_time[connection_details]
\ No newline at end of file
+        self.store.add_session(SessionSummary(
+            session.start_time.strftime('%Y-%m-%d %H:%M:%S'),
+            now.strftime('%Y-%m-%d %H:%M:%S'),
+            connection_details.ip,
+            connection_details.port,
+            session.count,
+            session.min,
+            session.max,
+            round(session.quantile(0.5), 2),
+            round(session.mean, 2),
+            percentile_75,
+            percentile_90,
+            round(session.jitter, 3),
+            round(session.loss_ratio, 4),
+        ))
+        if self.rollups is not None:
+            self.rollups.add_session(connection_details.ip, session)
@@ -0,0 +1,321 @@
+# Standard Library
+import csv
+import queue
+import sqlite3
+import logging
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from os.path import expandvars
+from typing import NamedTuple, Optional, Union
+
+# Local Modules
+from .log_reader import ConnectionDetails
+from .streaming_stats import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+STATS_CSV_HEADER = 'Start Time,End Time,IP Address,Port,Count,Min,Max,Median,Mean,75th,90th,Jitter,Loss'
+
+# How a stats.csv row's pings are spread over its quantile columns when they are counted in to a sketch, so the
+# sketch's 50th and 90th percentiles land on the rows' own: (column, share of the pings)
+ROW_QUANTILE_SHARES = (('Min', 0.25), ('Median', 0.25), ('75th', 0.25), ('90th', 0.15), ('Max', 0.10))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    ip TEXT NOT NULL,
+    port TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    min REAL,
+    max REAL,
+    median REAL,
+    mean REAL,
+    p75 REAL,
+    p90 REAL,
+    jitter REAL,
+    loss REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_start_time ON sessions (start_time);
+CREATE INDEX IF NOT EXISTS sessions_ip ON sessions (ip, start_time);
+
+-- ping_ms is NULL for a lost ping
+CREATE TABLE IF NOT EXISTS pings (
+    time REAL NOT NULL,
+    ip TEXT NOT NULL,
+    port TEXT NOT NULL,
+    ping_ms REAL
+);
+CREATE INDEX IF NOT EXISTS pings_ip_time ON pings (ip, time);
+"""
+
+INSERT_SESSION = 'INSERT INTO sessions VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+INSERT_PING = 'INSERT INTO pings VALUES (?, ?, ?, ?)'
+
+
+class SessionSummary(NamedTuple):
+    start_time: str
+    end_time: str
+    ip: str
+    port: str
+    count: int
+    min: float
+    max: float
+    median: float
+    mean: float
+    percentile_75: Union[float, str]
+    percentile_90: Union[float, str]
+    jitter: float
+    loss: float
+
+
+# Marks a text not yet in parsed_values, as None is the parsed value of an empty column
+UNPARSED = (0.0, 0)
+
+
+def row_quantile_indexes(header: list[str]) -> list[Optional[int]]:
+    """
+    Where each of ROW_QUANTILE_SHARES is in a stats.csv header, None for columns older versions didn't write
+    """
+    return [header.index(name) if name in header else None for name, _ in ROW_QUANTILE_SHARES]
+
+
+def parse_row_value(text: str) -> Optional[tuple[float, int]]:
+    """
+    A positive stats.csv value and its sketch bucket, None if empty or not positive
+    """
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return (value, QuantileSketch.key(value)) if value > 0 else None
+
+
+@lru_cache(maxsize=4096)
+def row_weights(count: int) -> tuple[int, ...]:
+    """
+    How many of a row's count pings go to each of ROW_QUANTILE_SHARES, the rest to Max
+    """
+    weights = []
+    remaining = count
+    for _, share in ROW_QUANTILE_SHARES[:-1]:
+        weight = min(remaining, round(count * share))
+        weights.append(weight)
+        remaining -= weight
+    weights.append(remaining)
+    return tuple(weights)
+
+
+def add_row_quantiles(sketch: QuantileSketch, count: int, mean: float, fields: list[str], indexes: list[Optional[int]],
+                      parsed_values: dict[str, Optional[tuple[float, int]]]) -> list[Optional[tuple[float, int]]]:
+    """
+    Add a stats.csv row's count pings at its quantile columns, or all at its median or mean if that's all it has
+
+    stats.csv only has a few quantiles of each session, so a sketch built
+    from it approximates the one kept while playing. The report and the
+    rollup rebuild both use this, so they agree on a region's quantiles.
+    Values repeat a lot, so parsed_values keeps each distinct text's value
+    and bucket. Returns the row's parsed quantile columns.
+    """
+    quantiles = []
+    for index in indexes:
+        text = fields[index] if index is not None and index < len(fields) else ''
+        value = parsed_values.get(text, UNPARSED)
+        if value is UNPARSED:
+            # Bounded in case every value differs
+            if len(parsed_values) > 100_000:
+                parsed_values.clear()
+            value = parsed_values[text] = parse_row_value(text)
+        quantiles.append(value)
+
+    buckets = sketch.buckets
+    sketch.count += count
+    if count == 1 or None in quantiles:
+        key = quantiles[1][1] if quantiles[1] is not None else QuantileSketch.key(mean)
+        buckets[key] = buckets.get(key, 0) + count
+    else:
+        for weight, (_, key) in zip(row_weights(count), quantiles):
+            buckets[key] = buckets.get(key, 0) + weight
+    return quantiles
+
+
+class StatsStore(ABC):
+    """
+    Where Stats writes session summaries and individual pings
+    """
+    @abstractmethod
+    def add_session(self, summary: SessionSummary) -> None:
+        ...
+
+    def add_ping(self, timestamp: float, connection_details: ConnectionDetails, time: Optional[float]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class CSVStatsStore(StatsStore):
+    """
+    Appends one row per session to stats.csv, pings aren't kept
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists():
+            self.path.write_text(STATS_CSV_HEADER + '\n')
+        else:
+            self._upgrade_header()
+
+    def _upgrade_header(self) -> None:
+        """
+        Older versions wrote fewer columns, extend the header so new rows line up
+        """
+        with open(self.path, newline='') as f:
+            header = f.readline().rstrip('\r\n')
+            if header == STATS_CSV_HEADER or not STATS_CSV_HEADER.startswith(header):
+                return
+            rest = f.read()
+        with open(self.path, 'w', newline='') as f:
+            f.write(STATS_CSV_HEADER + '\r\n' + rest)
+
+    def add_session(self, summary: SessionSummary) -> None:
+        with open(self.path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(summary)
+
+
+class MultiStatsStore(StatsStore):
+    """
+    Writes sessions and pings to each of several stores
+    """
+    def __init__(self, *stores: StatsStore):
+        self.stores = stores
+
+    def add_session(self, summary: SessionSummary) -> None:
+        for store in self.stores:
+            store.add_session(summary)
+
+    def add_ping(self, timestamp: float, connection_details: ConnectionDetails, time: Optional[float]) -> None:
+        for store in self.stores:
+            store.add_ping(timestamp, connection_details, time)
+
+    def close(self) -> None:
+        for store in self.stores:
+            store.close()
+
+
+class SQLiteStatsStore(StatsStore):
+    """
+    Stores sessions and every ping in SQLite
+
+    Writes are queued and a background thread inserts each batch in a single
+    transaction every flush_interval seconds, so callers never wait on disk.
+    Closing writes whatever is still queued.
+    """
+    def __init__(self, path: Path, flush_interval: float = 5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._pending: queue.SimpleQueue[tuple[str, tuple]] = queue.SimpleQueue()
+        self._stop_event = threading.Event()
+
+        # Create the schema up front so errors surface to the caller
+        connection = connect(self.path)
+        connection.close()
+
+        self._thread = threading.Thread(target=self._run, name='stats-writer', daemon=True)
+        self._thread.start()
+
+    def add_session(self, summary: SessionSummary) -> None:
+        self._pending.put((INSERT_SESSION, tuple(None if value == '' else value for value in summary)))
+
+    def add_ping(self, timestamp: float, connection_details: ConnectionDetails, time: Optional[float]) -> None:
+        self._pending.put((INSERT_PING, (timestamp, connection_details.ip, connection_details.port, time)))
+
+    def close(self) -> None:
+        self._stop_event.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        connection = connect(self.path)
+        try:
+            while True:
+                stopping = self._stop_event.wait(self.flush_interval)
+                try:
+                    self._write_batch(connection)
+                except sqlite3.Error:
+                    logger.exception('Unable to write stats to %s', self.path)
+                if stopping:
+                    return
+        finally:
+            connection.close()
+
+    def _write_batch(self, connection: sqlite3.Connection) -> None:
+        batches: dict[str, list[tuple]] = {}
+        while True:
+            try:
+                statement, parameters = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            batches.setdefault(statement, []).append(parameters)
+
+        if not batches:
+            return
+
+        with connection:
+            for statement, rows in batches.items():
+                connection.executemany(statement, rows)
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    connection = sqlite3.connect(str(path))
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def import_stats_csv(csv_path: Path, db_path: Path) -> int:
+    """
+    Copy the sessions in a stats.csv in to the SQLite store, returns the number of sessions imported
+
+    Sessions already in the store, by start time, IP and port, are skipped
+    so importing the same file again adds nothing.
+    """
+    connection = connect(db_path)
+    try:
+        with open(csv_path, newline='') as f, connection:
+            existing = set(connection.execute('SELECT start_time, ip, port FROM sessions'))
+            reader = csv.reader(f)
+            next(reader, None)
+            rows = []
+            for row in reader:
+                if not row:
+                    continue
+                values = tuple(value if value != '' else None for value in (row + [''] * 13)[:13])
+                key = (values[0], values[2], values[3])
+                if key in existing:
+                    continue
+                existing.add(key)
+                rows.append(values)
+            connection.executemany(INSERT_SESSION, rows)
+            return len(rows)
+    finally:
+        connection.close()
+
+
+def main(args=None) -> None:
+    parser = argparse.ArgumentParser(prog='fgpe.stats_store', description='Import stats.csv in to the SQLite stats store')
+    parser.add_argument('--csv', type=Path, default=Path(expandvars(r'%APPDATA%\fgpe\stats.csv')))
+    parser.add_argument('--db', type=Path, default=Path(expandvars(r'%APPDATA%\fgpe\stats.db')))
+    parsed = parser.parse_args(args)
+    imported = import_stats_csv(parsed.csv, parsed.db)
+    print(f'Imported {imported} sessions from {parsed.csv} in to {parsed.db}')
+
+
+if __name__ == '__main__':
+    main()
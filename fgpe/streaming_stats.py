@@ -0,0 +1,157 @@
+# Standard Library
+import math
+from array import array
+from datetime import datetime
+from typing import Any, Optional
+
+
+class RingBuffer:
+    """
+    Fixed size window of the most recent values with a running sum
+    """
+    def __init__(self, size: int):
+        self.size = size
+        self._values = array('d', bytes(8 * size))
+        self._next = 0
+        self._count = 0
+        self._sum = 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, value: float) -> None:
+        if self._count == self.size:
+            self._sum -= self._values[self._next]
+        else:
+            self._count += 1
+        self._values[self._next] = value
+        self._sum += value
+        self._next = (self._next + 1) % self.size
+
+    @property
+    def last(self) -> float:
+        return self._values[self._next - 1]
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self._count
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with a relative error guarantee, in the style of DDSketch
+
+    Values are counted in logarithmically sized buckets so any quantile is
+    returned within relative_accuracy of a true sample value, memory is
+    bounded by the range of values rather than how many were added, and two
+    sketches with the same accuracy merge by adding their bucket counts.
+    """
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    @classmethod
+    def key(cls, value: float, relative_accuracy: float = 0.01) -> int:
+        """
+        Bucket a positive value is counted in
+        """
+        return math.ceil(math.log(value) / math.log((1 + relative_accuracy) / (1 - relative_accuracy)))
+
+    def add(self, value: float, weight: int = 1) -> None:
+        if value <= 0:
+            self.zero_count += weight
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + weight
+        self.count += weight
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Can only merge sketches with the same relative accuracy')
+        for key, bucket_count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + bucket_count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return 2 * self._gamma ** key / (self._gamma + 1)
+        return 2 * self._gamma ** max(self.buckets) / (self._gamma + 1)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'zero_count': self.zero_count,
+            'buckets': {str(key): bucket_count for key, bucket_count in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'QuantileSketch':
+        sketch = cls(data['relative_accuracy'])
+        sketch.zero_count = data['zero_count']
+        sketch.buckets = {int(key): bucket_count for key, bucket_count in data['buckets'].items()}
+        sketch.count = sketch.zero_count + sum(sketch.buckets.values())
+        return sketch
+
+
+class ConnectionStats:
+    """
+    Fixed memory running statistics for one connection, every update is O(1)
+    """
+    def __init__(self, avg_size: int = 10):
+        self.start_time = datetime.now()
+        self.count = 0
+        self.lost = 0
+        self.min: float = math.inf
+        self.max: float = -math.inf
+        self.sum = 0.0
+        self.jitter = 0.0
+        self.last: float = 0
+        self.recent = RingBuffer(avg_size)
+        self.sketch = QuantileSketch()
+
+    def add(self, time: float) -> None:
+        if self.count:
+            # Interarrival jitter from RFC 3550 section 6.4.1
+            self.jitter += (abs(time - self.last) - self.jitter) / 16
+        self.last = time
+        self.count += 1
+        self.min = min(self.min, time)
+        self.max = max(self.max, time)
+        self.sum += time
+        self.recent.append(time)
+        self.sketch.add(time)
+
+    def add_loss(self) -> None:
+        self.lost += 1
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count
+
+    @property
+    def loss_ratio(self) -> float:
+        sent = self.count + self.lost
+        return self.lost / sent if sent else 0.0
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Sketch estimate clamped to the exact min and max
+        """
+        estimate = self.sketch.quantile(q)
+        if estimate is None:
+            return None
+        return min(max(estimate, self.min), self.max)
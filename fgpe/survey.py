@@ -0,0 +1,147 @@
+# Standard Library
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ipaddress import IPv4Address, IPv6Address
+from typing import Callable, NamedTuple, Optional, Union
+
+# Local Modules
+from .ip_index import IPNetworkIndex
+from .locations import FallGuysLocation
+from .pinger import Pinger, PingConnect, ProbeBackend, format_host
+
+logger = logging.getLogger(__name__)
+
+
+class RegionLatency(NamedTuple):
+    region: str
+    ping_time: Optional[float]  # Lowest reply in the region, None if no host replied
+    replies: int
+    probes: int
+    host: Optional[str]  # Host with the lowest reply
+
+
+def representative_hosts(index: IPNetworkIndex[FallGuysLocation], per_region: int = 3) -> dict[str, list[str]]:
+    """
+    Up to per_region hosts for each region, from different locations where there are enough
+    """
+    by_location: dict[tuple[str, str], list[tuple[int, int, int]]] = {}
+    for version, network_int, prefix_length, location in index.entries():
+        if location.region == 'Unknown':
+            continue
+        by_location.setdefault((location.region, location.location), []).append((version, prefix_length, network_int))
+
+    hosts: dict[str, list[str]] = {}
+    for (region, _), networks in sorted(by_location.items()):
+        region_hosts = hosts.setdefault(region, [])
+        if len(region_hosts) >= per_region:
+            continue
+        # The narrowest network in each location is the most likely to be game servers rather than a whole provider
+        version, prefix_length, network_int = min(networks, key=lambda network: (network[0], -network[1], network[2]))
+        host_int = network_int + 1 if prefix_length < (32 if version == 4 else 128) else network_int
+        region_hosts.append(str(IPv4Address(host_int) if version == 4 else IPv6Address(host_int)))
+    return hosts
+
+
+class RegionSurvey:
+    """
+    Probes a few hosts in every region at once to show which regions are closest
+
+    hosts maps each region to the hosts to probe, or is a function returning
+    that map which is called at the start of every survey so updated IP
+    networks are picked up. At most max_workers probes are in flight at a
+    time. Results are cached for ttl seconds, and after start() a background
+    thread surveys again whenever they expire and calls on_result with each
+    new set.
+    """
+    def __init__(self,
+                 hosts: Union[dict[str, list[str]], Callable[[], dict[str, list[str]]]],
+                 backend: Optional[ProbeBackend] = None,
+                 port: Optional[int] = None,
+                 max_workers: int = 8,
+                 ttl: float = 300.0,
+                 on_result: Optional[Callable[[dict[str, RegionLatency]], None]] = None):
+        self.hosts = hosts
+        self.backend = backend
+        self.port = port
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self.on_result = on_result
+        self.latest: Optional[dict[str, RegionLatency]] = None
+        self.updated_at: Optional[float] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def survey(self) -> dict[str, RegionLatency]:
+        hosts = self.hosts() if callable(self.hosts) else self.hosts
+        targets = [
+            (region, host)
+            for region, region_hosts in hosts.items()
+            for host in region_hosts
+        ]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='survey') as executor:
+            results = list(executor.map(self._probe, (host for _, host in targets)))
+
+        replies: dict[str, list[tuple[float, str]]] = {region: [] for region in hosts}
+        for (region, host), (status, ping_time) in zip(targets, results):
+            if status == PingConnect.CONNECTED and ping_time is not None:
+                replies[region].append((ping_time, host))
+
+        latencies = {}
+        for region, region_replies in replies.items():
+            ping_time, host = min(region_replies) if region_replies else (None, None)
+            latencies[region] = RegionLatency(region, ping_time, len(region_replies), len(hosts[region]), host)
+
+        self.latest = latencies
+        self.updated_at = time.monotonic()
+        return latencies
+
+    def results(self) -> dict[str, RegionLatency]:
+        """
+        Cached results, surveying first if there are none or they are older than ttl
+        """
+        if self.latest is None or self.updated_at is None or time.monotonic() - self.updated_at >= self.ttl:
+            return self.survey()
+        return self.latest
+
+    def _probe(self, host: str) -> tuple[PingConnect, Optional[float]]:
+        target = host if self.port is None else format_host(host, self.port)
+        try:
+            return Pinger(target, self.backend).get_ping_time()
+        except Exception:
+            logger.exception('Unexpected exception surveying %s', host)
+            return PingConnect.NOT_CONNECTED, None
+
+    def start(self) -> None:
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop_event,), name='survey', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._thread = None
+
+    def _run(self, stop_event: threading.Event) -> None:
+        while not stop_event.is_set():
+            try:
+                latencies = self.survey()
+            except Exception:
+                logger.exception('Unexpected exception surveying regions')
+                stop_event.wait(self.ttl)
+                continue
+            if self.on_result is not None and not stop_event.is_set():
+                self.on_result(latencies)
+            stop_event.wait(self.ttl)
+
+
+def format_survey(latencies: dict[str, RegionLatency]) -> str:
+    """
+    Regions from closest to furthest, unreachable regions last
+    """
+    ordered = sorted(latencies.values(),
+                     key=lambda latency: (latency.ping_time is None, latency.ping_time or 0, latency.region))
+    return ', '.join(
+        f'{latency.region}={latency.ping_time:.0f}ms' if latency.ping_time is not None else f'{latency.region}=-'
+        for latency in ordered
+    )
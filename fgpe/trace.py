@@ -0,0 +1,287 @@
+"""
+Record the inputs of every update to a compact binary trace, and replay a trace as fast as possible
+
+Run with: python -m fgpe.trace TRACE_FILE
+"""
+# Standard Library
+import os
+import mmap
+import math
+import time
+import struct
+import logging
+import argparse
+import threading
+from pathlib import Path
+from functools import lru_cache
+from collections import Counter
+from ipaddress import IPv6Address, ip_address
+from typing import Iterator, NamedTuple, Optional
+
+# Local Modules
+from .stats import Stats
+from .pinger import PingConnect
+from .ping_worker import PingSample
+from .stats_store import StatsStore, SessionSummary
+from .locations import LocationLookup
+from .log_reader import LogReader, ServerState, ConnectionDetails, CONNECTED_MARKER, SHUTDOWN_MARKER
+
+logger = logging.getLogger(__name__)
+
+# File layout: header, then fixed width records appended until the trace is closed
+TRACE_MAGIC = b'FGTR'
+TRACE_FORMAT_VERSION = 1
+TRACE_HEADER = struct.Struct('<4sHH')  # magic, format version, record size
+RECORD = struct.Struct('<BBHd16sd')  # kind, flag, port, timestamp, IP as IPv6 (IPv4 mapped), ping ms
+
+# Record kinds, the flag is whether the log shows a connection, the ping replied or the game is running
+LOG_RECORD = 1
+PING_RECORD = 2
+PROCESS_RECORD = 3
+
+NO_IP = bytes(16)
+CHUNK_RECORDS = 16_384
+
+
+@lru_cache(maxsize=1024)
+def pack_ip(ip: str) -> bytes:
+    try:
+        address = ip_address(ip)
+    except ValueError:
+        return NO_IP
+    if address.version == 4:
+        return IPv6Address(f'::ffff:{address}').packed
+    return address.packed
+
+
+def unpack_ip(packed: bytes) -> str:
+    address = IPv6Address(packed)
+    if address.ipv4_mapped is not None:
+        return str(address.ipv4_mapped)
+    return str(address)
+
+
+def pack_port(port: str) -> int:
+    return int(port) if port.isdigit() and int(port) <= 0xFFFF else 0
+
+
+class TraceRecord(NamedTuple):
+    kind: int
+    flag: bool
+    timestamp: float
+    connection: ConnectionDetails
+    ping_time: Optional[float]
+
+
+class TraceRecorder:
+    """
+    Appends fixed width records to a binary trace
+
+    Records are packed in to a buffer and written at most every
+    flush_interval seconds, and on close, so recording costs a struct pack
+    per input. A new file gets a header, an existing trace is appended to.
+    A file that isn't a trace of this version is moved aside to
+    trace.bin.old and a new trace started.
+    """
+    def __init__(self, path: Path, flush_interval: float = 5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.records = 0
+        self._buffer = bytearray()
+        self._last_flush = time.monotonic()
+        # Ping samples may be recorded from a listener thread while the GUI records log events
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists() and self.path.stat().st_size:
+            try:
+                check_header(self.path)
+                return
+            except ValueError as e:
+                old_path = self.path.with_name(self.path.name + '.old')
+                logger.warning('%s, moving it to %s and starting a new trace', e, old_path)
+                os.replace(self.path, old_path)
+        self._buffer += TRACE_HEADER.pack(TRACE_MAGIC, TRACE_FORMAT_VERSION, RECORD.size)
+
+    def _append(self, kind: int, flag: bool, connection: ConnectionDetails, timestamp: Optional[float],
+                ping_time: Optional[float] = None) -> None:
+        record = RECORD.pack(
+            kind,
+            flag,
+            pack_port(connection.port),
+            time.time() if timestamp is None else timestamp,
+            pack_ip(connection.ip),
+            math.nan if ping_time is None else ping_time,
+        )
+        with self._lock:
+            self._buffer += record
+            self.records += 1
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def log_event(self, status: ServerState, connection: ConnectionDetails, timestamp: Optional[float] = None) -> None:
+        self._append(LOG_RECORD, status == ServerState.CONNECTED, connection, timestamp)
+
+    def ping(self, sample: PingSample) -> None:
+        self._append(PING_RECORD, sample.status == PingConnect.CONNECTED, sample.connection, sample.timestamp,
+                     sample.ping_time)
+
+    def process(self, running: bool, timestamp: Optional[float] = None) -> None:
+        self._append(PROCESS_RECORD, running, ConnectionDetails('0.0.0.0', '0'), timestamp)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._buffer:
+                return
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        try:
+            with open(self.path, 'ab') as f:
+                f.write(data)
+        except OSError:
+            logger.exception('Unable to write trace to %s', self.path)
+
+    def close(self) -> None:
+        self.flush()
+
+
+def check_header(path: Path) -> None:
+    with open(path, 'rb') as f:
+        header = f.read(TRACE_HEADER.size)
+    if len(header) < TRACE_HEADER.size:
+        raise ValueError(f'{path} is not a trace')
+    magic, version, record_size = TRACE_HEADER.unpack(header)
+    if magic != TRACE_MAGIC or version != TRACE_FORMAT_VERSION or record_size != RECORD.size:
+        raise ValueError(f'{path} is not a version {TRACE_FORMAT_VERSION} trace')
+
+
+def read_trace(path: Path) -> Iterator[TraceRecord]:
+    """
+    Yield every record, the file is memory mapped so large traces aren't read in to memory
+
+    A partly written record at the end, left by a crash, is ignored.
+    """
+    check_header(path)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        end = TRACE_HEADER.size + (size - TRACE_HEADER.size) // RECORD.size * RECORD.size
+        if end == TRACE_HEADER.size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # Servers repeat, so each distinct IP and port is decoded once
+            connections: dict[tuple[bytes, int], ConnectionDetails] = {}
+            # Unpacked a chunk at a time, copying a chunk keeps no buffer exported from the map while yielding
+            for chunk_start in range(TRACE_HEADER.size, end, CHUNK_RECORDS * RECORD.size):
+                chunk = mapped[chunk_start:min(end, chunk_start + CHUNK_RECORDS * RECORD.size)]
+                for kind, flag, port, timestamp, packed_ip, ping_time in RECORD.iter_unpack(chunk):
+                    connection = connections.get((packed_ip, port))
+                    if connection is None:
+                        connection = connections[(packed_ip, port)] = ConnectionDetails(unpack_ip(packed_ip), str(port))
+                    yield TraceRecord(kind, bool(flag), timestamp, connection,
+                                      None if math.isnan(ping_time) else ping_time)
+
+
+class _MemoryStatsStore(StatsStore):
+    """
+    Keeps the sessions a replay summarises instead of writing them to stats.csv
+    """
+    def __init__(self):
+        self.sessions: list[SessionSummary] = []
+        self.pings = 0
+
+    def add_session(self, summary: SessionSummary) -> None:
+        self.sessions.append(summary)
+
+    def add_ping(self, timestamp: float, connection_details: ConnectionDetails, time: Optional[float]) -> None:
+        self.pings += 1
+
+
+class ReplayResult(NamedTuple):
+    records: int
+    log_events: int
+    samples: int
+    sessions: list[SessionSummary]
+    regions: Counter
+    seconds: float
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.seconds if self.seconds else 0.0
+
+
+def log_line(record: TraceRecord) -> bytes:
+    """
+    The log line the game writes for a log record
+    """
+    if record.flag:
+        return CONNECTED_MARKER + f' Host: {record.connection.ip}:{record.connection.port}\n'.encode('ascii')
+    return SHUTDOWN_MARKER + b'\n'
+
+
+def replay(path: Path, locations: Optional[LocationLookup] = None) -> ReplayResult:
+    """
+    Feed a trace through LogReader, Stats and LocationLookup without waiting between records
+
+    Log records become log lines for LogReader.process_bytes, samples for
+    the current connection are added to Stats, and each new connection is
+    looked up. A session ends when the connection changes or the game stops,
+    as it does in the overlay.
+    """
+    reader = LogReader(log_location=os.devnull)
+    if locations is None:
+        locations = LocationLookup()
+    store = _MemoryStatsStore()
+    stats = Stats(store=store)
+
+    current: Optional[ConnectionDetails] = None
+    records = log_events = samples = 0
+    regions: Counter = Counter()
+    start = time.perf_counter()
+    for record in read_trace(path):
+        records += 1
+        if record.kind == LOG_RECORD:
+            log_events += 1
+            reader.process_bytes(log_line(record))
+            connection = ConnectionDetails(reader.current_ip, reader.current_port)
+            if connection == current:
+                continue
+            stats.end_session(current)
+            current = None
+            if connection.ip != '0.0.0.0':
+                current = connection
+                regions[locations.lookup(connection.ip, record_unknown=False).region] += 1
+        elif record.kind == PING_RECORD:
+            if record.connection != current:
+                continue
+            samples += 1
+            if record.flag and record.ping_time is not None:
+                stats.add(current, record.ping_time, record.timestamp)
+            else:
+                stats.add_loss(current, record.timestamp)
+        elif record.kind == PROCESS_RECORD and not record.flag:
+            stats.end_session(current)
+            current = None
+    stats.end_session(current)
+    seconds = time.perf_counter() - start
+    return ReplayResult(records, log_events, samples, store.sessions, regions, seconds)
+
+
+def main(args=None) -> None:
+    parser = argparse.ArgumentParser(prog='fgpe.trace', description='Replay a trace recorded with --trace')
+    parser.add_argument('trace', type=Path)
+    parsed = parser.parse_args(args)
+    try:
+        result = replay(parsed.trace)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    print(f'Replayed {result.records:,} records ({result.log_events:,} log events, {result.samples:,} samples) '
+          f'in {result.seconds:.3f}s, {result.records_per_second:,.0f} records/s')
+    for summary in result.sessions:
+        print(f'{summary.ip}:{summary.port:<6} Pings={summary.count:<6,} Min={summary.min} Avg={summary.mean} '
+              f'Max={summary.max} Loss={summary.loss:.0%}')
+    for region, connections in result.regions.most_common():
+        print(f'{region:<18} {connections:>6,} connections')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+# Standard Library
+import os
+import csv
+import time
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Optional
+
+# Local Modules
+from .ip_index import IPNetworkIndex
+
+logger = logging.getLogger(__name__)
+
+# Time and IP Address are the columns older versions wrote, one row per lookup
+UNKNOWN_IPS_HEADER = ['Time', 'IP Address', 'Last Seen', 'Count']
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class UnknownIP:
+    __slots__ = ('first_seen', 'last_seen', 'count')
+
+    def __init__(self, first_seen: str, last_seen: str, count: int):
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+        self.count = count
+
+
+class UnknownIPStore:
+    """
+    IP addresses with no known location, one entry per IP with when it was first and last seen and how often
+
+    Kept in memory and written to the CSV flush_interval seconds after the
+    first change since the last write, and on close. The CSV keeps the Time and IP Address columns
+    older versions wrote so it can still be attached to an issue as is,
+    a file in the older one row per lookup format is merged on load.
+    """
+    def __init__(self, path: Path, flush_interval: float = 5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.ips: dict[str, UnknownIP] = {}
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._flush_timer: Optional[threading.Timer] = None
+        # Reclassified from the IP updater thread while the GUI records
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self.ips)
+
+    def __contains__(self, ip: str) -> bool:
+        return ip in self.ips
+
+    def load(self) -> None:
+        try:
+            f = open(self.path, newline='')
+        except FileNotFoundError:
+            return
+
+        with f, self._lock:
+            for row in csv.DictReader(f):
+                ip = row.get('IP Address')
+                first_seen = row.get('Time') or ''
+                if not ip:
+                    continue
+                last_seen = row.get('Last Seen') or first_seen
+                try:
+                    count = int(row.get('Count') or 1)
+                except ValueError:
+                    count = 1
+
+                entry = self.ips.get(ip)
+                if entry is None:
+                    self.ips[ip] = UnknownIP(first_seen, last_seen, count)
+                else:
+                    # Times are compared as text, which orders correctly in TIME_FORMAT
+                    self._dirty = True
+                    entry.first_seen = min(entry.first_seen, first_seen)
+                    entry.last_seen = max(entry.last_seen, last_seen)
+                    entry.count += count
+
+    def record(self, ip: str, seen: Optional[datetime] = None) -> None:
+        seen_text = (seen or datetime.now()).strftime(TIME_FORMAT)
+        with self._lock:
+            entry = self.ips.get(ip)
+            if entry is None:
+                self.ips[ip] = UnknownIP(seen_text, seen_text, 1)
+            else:
+                entry.last_seen = seen_text
+                entry.count += 1
+            self._dirty = True
+            due_in = self._last_flush + self.flush_interval - time.monotonic()
+            # Written from a timer so nothing sits unwritten until close if no more IPs are recorded
+            if due_in > 0 and self._flush_timer is None:
+                self._flush_timer = threading.Timer(due_in, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+        if due_in <= 0:
+            self.flush()
+
+    def reclassify(self, added_networks: IPNetworkIndex) -> list[str]:
+        """
+        Remove IPs that fall in one of the newly added networks, returns the IPs removed
+        """
+        if not len(added_networks):
+            return []
+
+        with self._lock:
+            removed = [ip for ip in self.ips if added_networks.lookup(ip) is not None]
+            for ip in removed:
+                del self.ips[ip]
+            if removed:
+                self._dirty = True
+
+        if removed:
+            self.flush()
+        return removed
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._flush_timer is not None and self._flush_timer is not threading.current_thread():
+                self._flush_timer.cancel()
+            self._flush_timer = None
+            self._last_flush = time.monotonic()
+            if not self._dirty:
+                return
+            rows = [
+                [entry.first_seen, ip, entry.last_seen, entry.count]
+                for ip, entry in sorted(self.ips.items(), key=lambda item: item[1].first_seen)
+            ]
+            self._dirty = False
+
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with self._write_lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(temp_path, 'w', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(UNKNOWN_IPS_HEADER)
+                    writer.writerows(rows)
+                os.replace(temp_path, self.path)
+        except OSError:
+            logger.exception('Unable to write unknown IP addresses to %s', self.path)
+            with self._lock:
+                self._dirty = True
+
+    def close(self) -> None:
+        self.flush()
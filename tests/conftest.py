@@ -0,0 +1,136 @@
+import socket
+import threading
+import pytest
+from fgpe.stats_store import StatsStore
+
+
+@pytest.fixture
+def udp_echo_server():
+    """
+    Stand in for a game server that echoes UDP datagrams on loopback, yields (ip, port)
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.settimeout(0.1)
+    stop_event = threading.Event()
+
+    def echo():
+        while not stop_event.is_set():
+            try:
+                data, address = sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            sock.sendto(data, address)
+
+    thread = threading.Thread(target=echo, daemon=True)
+    thread.start()
+    yield sock.getsockname()
+    stop_event.set()
+    thread.join()
+    sock.close()
+
+
+@pytest.fixture
+def tcp_listener():
+    """
+    Stand in for a server accepting TCP connections on loopback, yields (ip, port)
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(128)
+    sock.settimeout(0.1)
+    stop_event = threading.Event()
+
+    def accept():
+        while not stop_event.is_set():
+            try:
+                connection, _ = sock.accept()
+            except socket.timeout:
+                continue
+            connection.close()
+
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    yield sock.getsockname()
+    stop_event.set()
+    thread.join()
+    sock.close()
+
+
+class FakeClock:
+    """
+    A clock for Scheduler that only moves when told to
+    """
+    def __init__(self, now=1_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class StubProcessTracker:
+    """
+    Stand in for ProcessTracker that counts its checks
+    """
+    def __init__(self, running=True):
+        self.running = running
+        self.checks = 0
+
+    def is_running(self):
+        self.checks += 1
+        return self.running
+
+
+class MemoryStatsStore(StatsStore):
+    """
+    Keeps sessions and counts pings instead of writing them to stats.csv
+    """
+    def __init__(self):
+        self.sessions = []
+        self.pings = 0
+
+    def add_session(self, summary):
+        self.sessions.append(summary)
+
+    def add_ping(self, timestamp, connection_details, time):
+        self.pings += 1
+
+
+@pytest.fixture
+def connect_line():
+    """
+    The line Player.log gets when the game joins the server at ip and port
+    """
+    def connect_line(ip, port):
+        return f"[StateConnectToGame] We're connected to the server! Host: {ip}:{port}\n"
+
+    return connect_line
+
+
+@pytest.fixture
+def shutdown_line():
+    """
+    The line Player.log gets when the game leaves a server
+    """
+    return '[FG_UnityInternetNetworkManager] FG_NetworkManager shutdown completed!\n'
+
+
+@pytest.fixture
+def fake_clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def stub_process_tracker():
+    """
+    Makes StubProcessTrackers, running unless given running=False
+    """
+    return StubProcessTracker
+
+
+@pytest.fixture
+def memory_store():
+    return MemoryStatsStore()
@@ -0,0 +1,106 @@
+import time
+import pytest
+from fgpe.__main__ import Events, parse_args, parse_log_locations
+from fgpe.stats import Stats
+from fgpe.ping_worker import PooledPingWorker
+
+
+def test_parse_log_locations():
+    assert parse_log_locations(None) is None
+    assert parse_log_locations(['main=C:\\Logs\\Player.log', '/mnt/vm2/Player.log', '/mnt/a=b/Player.log']) == {
+        'main': 'C:\\Logs\\Player.log',
+        'Client 2': '/mnt/vm2/Player.log',
+        'Client 3': '/mnt/a=b/Player.log',
+    }
+    assert parse_args(['--log', 'a=1.log', '--log', 'b=2.log']).log_locations == {'a': '1.log', 'b': '2.log'}
+    with pytest.raises(ValueError):
+        parse_log_locations(['a=1.log', 'a=2.log'])
+    with pytest.raises(SystemExit):
+        parse_args(['--log', 'Client 2=1.log', '--log', '2.log'])
+
+
+def test_events_with_several_clients(tmp_path, udp_echo_server, connect_line, shutdown_line, memory_store):
+    ip, port = udp_echo_server
+    connected_log = tmp_path / 'connected.log'
+    connected_log.write_text(connect_line(ip, port))
+    shutdown_log = tmp_path / 'shutdown.log'
+    shutdown_log.write_text(connect_line(ip, port) + shutdown_line)
+
+    store = memory_store
+    events = Events(probe='udp', stats=Stats(store=store),
+                    log_locations={'a': str(connected_log), 'b': str(shutdown_log)})
+    events.has_first_run = True
+    try:
+        assert events.ping_pool is not None
+        assert all(isinstance(client.ping_worker, PooledPingWorker) for client in events.clients)
+
+        deadline = time.monotonic() + 5
+        text = ''
+        while time.monotonic() < deadline:
+            _, text = events.update_text()
+            if 'Ping=' in text:
+                break
+            time.sleep(0.02)
+        first, second = text.splitlines()
+        assert first.startswith(f'a: IP={ip}, Ping=')
+        assert second == 'b: Not Connected to Fall Guys Server'
+        assert events.clients[0].current_connection.ip == ip
+        assert events.clients[1].current_connection is None
+    finally:
+        events.shutdown()
+    assert [session.ip for session in store.sessions] == [ip]
+
+
+def test_clients_on_one_server_keep_their_own_sessions(tmp_path, udp_echo_server, connect_line, shutdown_line, memory_store):
+    ip, port = udp_echo_server
+    logs = {name: tmp_path / f'{name}.log' for name in ('a', 'b')}
+    for log in logs.values():
+        log.write_text(connect_line(ip, port))
+
+    store = memory_store
+    events = Events(probe='udp', stats=Stats(store=store), log_locations={name: str(log) for name, log in logs.items()})
+    events.has_first_run = True
+    sample_clients = set()
+    events.sample_listeners.append(lambda sample, location, client: sample_clients.add(client))
+    try:
+        assert events.clients[0].stats is not events.clients[1].stats
+        deadline = time.monotonic() + 5
+        while sample_clients != {'a', 'b'} and time.monotonic() < deadline:
+            events.update_text()
+            time.sleep(0.02)
+        assert sample_clients == {'a', 'b'}
+
+        # b leaving the server ends only its own session
+        with open(logs['b'], 'a') as f:
+            f.write(shutdown_line)
+        events.clients[1].reader.handle_file_event(None)
+        events.scheduler.reset(events.clients[1].log_timer)
+        _, text = events.update_text()
+        assert text.splitlines()[1] == 'b: Not Connected to Fall Guys Server'
+        assert len(store.sessions) == 1
+        assert events.clients[0].stats.sessions
+    finally:
+        events.shutdown()
+    assert [session.ip for session in store.sessions] == [ip, ip]
+
+
+def test_graph_samples(tmp_path, udp_echo_server, connect_line, memory_store):
+    ip, port = udp_echo_server
+    log = tmp_path / 'Player.log'
+    log.write_text(connect_line(ip, port))
+    events = Events(probe='udp', stats=Stats(store=memory_store), log_location=str(log), graph=True)
+    events.has_first_run = True
+    events.clients[0].probe_interval = 0.01
+    try:
+        assert events.graph_samples() == (None, [])
+        deadline = time.monotonic() + 5
+        ping_times = []
+        while len(ping_times) < 3 and time.monotonic() < deadline:
+            events.update_text()
+            connection, new_ping_times = events.graph_samples()
+            ping_times.extend(new_ping_times)
+            time.sleep(0.02)
+    finally:
+        events.shutdown()
+    assert connection.ip == ip
+    assert len(ping_times) >= 3 and all(ping_time >= 0 for ping_time in ping_times)
@@ -0,0 +1,104 @@
+import os
+import sys
+import queue
+import pytest
+from fgpe.file_watch import FileEvent, InotifyFileWatcher, PollingFileWatcher
+from fgpe.log_reader import LogReader, ServerState, ConnectionDetails
+
+
+WATCHERS = [PollingFileWatcher]
+if sys.platform.startswith('linux'):
+    WATCHERS.append(InotifyFileWatcher)
+
+
+def write(path, text, mode='a'):
+    with open(path, mode, newline='') as f:
+        f.write(text)
+
+
+def wait_for(events, expected, timeout=2.0):
+    # A single write may be seen as more than one change
+    while True:
+        try:
+            if events.get(timeout=timeout) == expected:
+                return True
+        except queue.Empty:
+            return False
+
+
+@pytest.mark.parametrize('watcher_class', WATCHERS)
+def test_watcher_reports_appends_and_rotation(tmp_path, watcher_class):
+    log = tmp_path / 'Player.log'
+    write(log, 'first\n', 'w')
+    events: queue.SimpleQueue = queue.SimpleQueue()
+    watcher = watcher_class(str(log), events.put)
+    watcher.start()
+    try:
+        write(log, 'second\n')
+        assert wait_for(events, FileEvent.APPENDED)
+
+        os.replace(log, tmp_path / 'Player-prev.log')
+        write(log, 'new log\n', 'w')
+        assert wait_for(events, FileEvent.ROTATED)
+
+        write(log, 'more\n')
+        assert wait_for(events, FileEvent.APPENDED)
+
+        write(log, 'x\n', 'w')
+        assert wait_for(events, FileEvent.ROTATED)
+    finally:
+        watcher.stop()
+
+
+def test_watched_reader_notifies_listeners(tmp_path, connect_line):
+    log = tmp_path / 'Player.log'
+    write(log, 'Some other log line\n', 'w')
+    changes: queue.SimpleQueue = queue.SimpleQueue()
+    reader = LogReader(str(log))
+    reader.add_listener(lambda *change: changes.put(change))
+    reader.watch()
+    try:
+        assert reader.get_connection_details()[0] == ServerState.NOT_CONNECTED
+        assert reader.log_age() is not None
+
+        write(log, connect_line('10.0.0.7', 7000))
+        connected = (ServerState.CONNECTED, ConnectionDetails('10.0.0.7', '7000'))
+        assert changes.get(timeout=2) == connected
+        assert reader.get_connection_details() == connected
+    finally:
+        reader.stop_watching()
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='inotify is Linux only')
+def test_inotify_watcher_opens_on_start_and_closes_on_stop(tmp_path):
+    log = tmp_path / 'Player.log'
+    write(log, 'first\n', 'w')
+    open_fds = len(os.listdir('/proc/self/fd'))
+    events: queue.SimpleQueue = queue.SimpleQueue()
+    watcher = InotifyFileWatcher(str(log), events.put)
+    assert len(os.listdir('/proc/self/fd')) == open_fds
+
+    for text in ('second\n', 'third\n'):
+        watcher.start()
+        try:
+            write(log, text)
+            assert wait_for(events, FileEvent.APPENDED)
+        finally:
+            watcher.stop()
+        assert len(os.listdir('/proc/self/fd')) == open_fds
+
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='inotify is Linux only')
+def test_inotify_watcher_polls_when_watch_fails(tmp_path):
+    # A directory that doesn't exist yet can't be watched
+    log = tmp_path / 'missing' / 'Player.log'
+    events: queue.SimpleQueue = queue.SimpleQueue()
+    watcher = InotifyFileWatcher(str(log), events.put)
+    watcher.start()
+    try:
+        log.parent.mkdir()
+        write(log, 'first\n', 'w')
+        assert wait_for(events, FileEvent.ROTATED, timeout=5)
+    finally:
+        watcher.stop()
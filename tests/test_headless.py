@@ -0,0 +1,91 @@
+import io
+import sys
+import json
+import time
+import subprocess
+import urllib.request
+from fgpe.__main__ import Events, parse_args
+from fgpe.headless import JSONLinesWriter, run_headless_loop
+from fgpe.metrics import PingMetrics, MetricsServer
+from fgpe.exceptions import GracefulExit
+from fgpe.stats import Stats
+from fgpe.pinger import PingConnect
+from fgpe.ping_worker import PingSample
+from fgpe.log_reader import ConnectionDetails
+from fgpe.locations import FallGuysLocation
+
+LOCATION = FallGuysLocation('Europe', 'Frankfurt', 'AWS')
+
+
+def test_headless_loop_writes_json_lines(tmp_path, udp_echo_server, connect_line, memory_store):
+    ip, port = udp_echo_server
+    log = tmp_path / 'Player.log'
+    log.write_text(connect_line(ip, port))
+
+    events = Events(probe='udp', log_location=str(log), stats=Stats(store=memory_store))
+    events.has_first_run = True
+    output = io.StringIO()
+    events.sample_listeners.append(JSONLinesWriter(output))
+
+    def sleep(seconds):
+        if output.getvalue():
+            raise GracefulExit
+        time.sleep(0.02)
+
+    run_headless_loop(events, max_updates=200, sleep=sleep)
+    sample = json.loads(output.getvalue().splitlines()[0])
+    assert sample['ip'] == ip and sample['port'] == str(port)
+    assert sample['connected'] and sample['ping_ms'] >= 0
+    assert sample['region'] == 'Unknown'
+
+
+def test_metrics_endpoint():
+    metrics = PingMetrics()
+    connection = ConnectionDetails('10.0.0.1', '1234')
+    for ping_time in (5, 25, 25, 2000):
+        metrics.observe(PingSample(0, connection, PingConnect.CONNECTED, ping_time), LOCATION)
+    metrics.observe(PingSample(0, connection, PingConnect.NOT_CONNECTED, None), LOCATION)
+
+    server = MetricsServer(metrics, port=0)
+    server.start()
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.port}/metrics', timeout=5) as response:
+            text = response.read().decode()
+    finally:
+        server.stop()
+
+    assert 'fgpe_ping_ms_bucket{region="Europe",le="10"} 1' in text
+    assert 'fgpe_ping_ms_bucket{region="Europe",le="30"} 3' in text
+    assert 'fgpe_ping_ms_bucket{region="Europe",le="+Inf"} 4' in text
+    assert 'fgpe_ping_ms_count{region="Europe"} 4' in text
+    assert 'fgpe_ping_lost_total{region="Europe"} 1' in text
+
+
+def test_headless_args():
+    args = parse_args(['--headless', '--metrics-port', '9464'])
+    assert args.headless and args.metrics_port == 9464
+
+
+def test_headless_runs_without_tkinter():
+    # A None entry in sys.modules makes importing tkinter fail, as it does where Tk isn't installed
+    code = ("import sys; sys.modules['tkinter'] = None; "
+            "import fgpe.__main__, fgpe.headless, fgpe.metrics; fgpe.__main__.parse_args(['--headless'])")
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_samples_name_their_client():
+    connection = ConnectionDetails('10.0.0.1', '1234')
+    sample = PingSample(0, connection, PingConnect.CONNECTED, 25)
+    output = io.StringIO()
+    writer = JSONLinesWriter(output)
+    metrics = PingMetrics()
+    for client in ('alt', 'main', 'main'):
+        writer(sample, LOCATION, client)
+        metrics.observe(sample, LOCATION, client)
+    metrics.observe(sample, LOCATION)
+
+    assert [json.loads(line)['client'] for line in output.getvalue().splitlines()] == ['alt', 'main', 'main']
+    text = metrics.render().decode()
+    assert 'fgpe_ping_ms_count{client="alt",region="Europe"} 1' in text
+    assert 'fgpe_ping_ms_count{client="main",region="Europe"} 2' in text
+    assert 'fgpe_ping_ms_count{region="Europe"} 1' in text
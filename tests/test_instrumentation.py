@@ -0,0 +1,45 @@
+import pstats
+import time
+from fgpe.instrumentation import Instrumentation, NULL_PHASE
+
+
+def test_disabled_records_nothing():
+    instrumentation = Instrumentation()
+    assert instrumentation.phase('log') is NULL_PHASE
+    assert instrumentation.tick() is NULL_PHASE
+    with instrumentation.tick():
+        with instrumentation.phase('log'):
+            pass
+    instrumentation.count('samples')
+    assert instrumentation.phases == {} and instrumentation.counters == {}
+
+
+def test_phases_counters_and_dump(tmp_path):
+    dump_path = tmp_path / 'timings.txt'
+    instrumentation = Instrumentation(enabled=True, dump_path=dump_path, dump_interval=0)
+    for _ in range(5):
+        with instrumentation.tick():
+            with instrumentation.phase('log'):
+                time.sleep(0.001)
+            instrumentation.count('samples', 2)
+
+    assert instrumentation.phases['tick'].count == 5
+    assert instrumentation.phases['log'].count == 5
+    assert instrumentation.phases['log'].mean_ms >= 1
+    assert instrumentation.phases['tick'].total_ns >= instrumentation.phases['log'].total_ns
+    assert instrumentation.counters == {'samples': 10}
+    assert 'log=' in instrumentation.summary_line()
+
+    text = dump_path.read_text()
+    assert text.startswith('Phase') and 'samples' in text
+
+
+def test_profile_ticks(tmp_path):
+    profile_path = tmp_path / 'profile.prof'
+    instrumentation = Instrumentation(profile_ticks=2, profile_path=profile_path)
+    assert instrumentation.enabled
+    for _ in range(3):
+        with instrumentation.tick():
+            sorted(range(1000))
+    assert instrumentation.profile_ticks_remaining == 0
+    assert pstats.Stats(str(profile_path)).total_calls > 0
@@ -0,0 +1,107 @@
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from fgpe.ip_updater import IPNetworkUpdater
+from fgpe.locations import LocationLookup
+from fgpe.unknown_ips import UnknownIPStore
+
+CSV_V1 = 'Fall Guys Region,IP Network,Location,Provider\nEurope,203.0.113.0/24,Frankfurt,AWS\n'
+CSV_V2 = CSV_V1 + 'US East,198.51.100.0/24,Virginia,AWS\n'
+
+
+@pytest.fixture
+def csv_server():
+    """
+    Stand in for raw.githubusercontent.com that honours If-None-Match, yields (server, requests seen)
+    """
+    state = {'body': CSV_V1.encode(), 'etag': '"v1"'}
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            seen.append(dict(self.headers))
+            if self.headers.get('If-None-Match') == state['etag']:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', state['etag'])
+            self.send_header('Last-Modified', 'Tue, 01 Jun 2021 00:00:00 GMT')
+            self.send_header('Content-Length', str(len(state['body'])))
+            self.end_headers()
+            self.wfile.write(state['body'])
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.state = state
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server, seen
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def locations(tmp_path):
+    locations = LocationLookup()
+    locations.download_csv_file_path = tmp_path / 'Fall_Guys_IP_Networks.csv'
+    locations.index_cache_path = tmp_path / 'Fall_Guys_IP_Networks.idx'
+    locations.unknown_ips = UnknownIPStore(tmp_path / 'unknown_ip_addresses.csv')
+    return locations
+
+
+def test_conditional_updates_swap_in_new_networks(csv_server, locations):
+    server, seen = csv_server
+    updated = []
+    updater = IPNetworkUpdater(locations, url=f'http://127.0.0.1:{server.server_port}/ips.csv',
+                               on_update=lambda: updated.append(True))
+
+    assert updater.check()
+    assert seen[0].get('If-None-Match') is None
+    assert locations.lookup('203.0.113.5', record_unknown=False).location == 'Frankfurt'
+
+    # Unchanged file is a 304 and nothing is replaced
+    mtime = locations.download_csv_file_path.stat().st_mtime_ns
+    assert not updater.check()
+    assert seen[1]['If-None-Match'] == '"v1"'
+    assert seen[1]['If-Modified-Since'] == 'Tue, 01 Jun 2021 00:00:00 GMT'
+    assert locations.download_csv_file_path.stat().st_mtime_ns == mtime
+
+    # Changed file replaces the lookups already cached and clears IPs it now knows
+    assert locations.lookup('198.51.100.5').location == 'Unknown'
+    assert '198.51.100.5' in locations.unknown_ips
+    server.state.update(body=CSV_V2.encode(), etag='"v2"')
+    assert updater.check()
+    assert locations.lookup('198.51.100.5', record_unknown=False).location == 'Virginia'
+    assert '198.51.100.5' not in locations.unknown_ips
+    assert updated == [True, True]
+
+
+def test_bad_download_keeps_current_file(csv_server, locations):
+    server, _ = csv_server
+    updater = IPNetworkUpdater(locations, url=f'http://127.0.0.1:{server.server_port}/ips.csv')
+    assert updater.check()
+
+    server.state.update(body=b'Not a CSV of networks\n', etag='"broken"')
+    with pytest.raises(ValueError, match='No IP networks downloaded'):
+        updater.check()
+    assert locations.download_csv_file_path.read_text() == CSV_V1
+    assert list(locations.download_csv_file_path.parent.glob('*.tmp')) == []
+
+
+def test_background_thread_runs_periodically(csv_server, locations):
+    server, seen = csv_server
+    updater = IPNetworkUpdater(locations, url=f'http://127.0.0.1:{server.server_port}/ips.csv', interval=0.05)
+    updater.start()
+    try:
+        deadline = threading.Event()
+        for _ in range(100):
+            if len(seen) >= 3:
+                break
+            deadline.wait(0.05)
+    finally:
+        updater.stop()
+    assert len(seen) >= 3
+    assert updater.status == 'IP Addresses are already up to date'
@@ -0,0 +1,101 @@
+import time
+import threading
+from datetime import datetime
+from ipaddress import ip_network
+from fgpe.ip_index import IPNetworkIndex, read_index_cache, write_index_cache
+from fgpe.locations import LocationLookup, UNKNOWN_LOCATION
+from fgpe.unknown_ips import UnknownIPStore
+import fgpe.locations
+
+
+def test_longest_prefix_wins_regardless_of_order():
+    for networks in (['129.227.0.0/16', '129.227.152.0/22'], ['129.227.152.0/22', '129.227.0.0/16']):
+        index = IPNetworkIndex()
+        for network in networks:
+            index.add_network(ip_network(network), network)
+        assert index.lookup('129.227.153.1') == '129.227.152.0/22'
+        assert index.lookup('129.227.1.1') == '129.227.0.0/16'
+        assert index.lookup('129.228.1.1') is None
+
+
+def test_ipv6_networks():
+    index = IPNetworkIndex()
+    index.add_network(ip_network('2001:db8::/32'), 'wide')
+    index.add_network(ip_network('2001:db8:1::/48'), 'narrow')
+    assert index.lookup('2001:db8:1::1') == 'narrow'
+    assert index.lookup('2001:db8:2::1') == 'wide'
+    assert index.lookup('10.0.0.1') is None
+    assert len(index) == 2
+
+
+def test_location_lookup_uses_most_specific_network():
+    locations = LocationLookup()
+    assert locations.lookup('129.227.152.1', record_unknown=False).location == 'Hong Kong'
+    assert locations.lookup('0.0.0.1', record_unknown=False) is UNKNOWN_LOCATION
+
+
+def test_lookup_cache_is_bounded_and_cleared():
+    locations = LocationLookup(cache_size=2)
+    for ip in ('129.227.152.1', '129.227.152.1', '0.0.0.1', '0.0.0.2'):
+        locations.lookup(ip, record_unknown=False)
+    info = locations.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 3, 2)
+
+    locations.clear_ip_network_lookup_cache()
+    assert locations.cache_info().currsize == 0
+    locations.close()
+
+
+def test_index_cache_round_trip(tmp_path):
+    index = IPNetworkIndex()
+    index.add_network(ip_network('129.227.152.0/22'), ('Asia East', 'Hong Kong', 'Zenlayer'))
+    index.add_network(ip_network('2001:db8::/32'), ('Asia East', 'Taipei', 'Zenlayer'))
+    cache_path = tmp_path / 'networks.idx'
+    write_index_cache(cache_path, 'key', index)
+
+    loaded = read_index_cache(cache_path, 'key', tuple)
+    assert sorted(loaded.entries()) == sorted(index.entries())
+    assert read_index_cache(cache_path, 'stale key', tuple) is None
+    assert read_index_cache(tmp_path / 'missing.idx', 'key', tuple) is None
+
+
+def test_repeat_unknown_lookups_are_recorded(tmp_path, monkeypatch):
+    seen = iter(datetime(2021, 1, 1, hour) for hour in range(1, 6))
+
+    class FakeDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return next(seen)
+
+    monkeypatch.setattr('fgpe.unknown_ips.datetime', FakeDatetime)
+    locations = LocationLookup()
+    path = tmp_path / 'unknown_ip_addresses.csv'
+    locations.unknown_ips = UnknownIPStore(path, flush_interval=60)
+    for _ in range(5):
+        assert locations.lookup('203.0.113.9') is UNKNOWN_LOCATION
+    assert locations.cache_info().hits == 4
+    locations.close()
+    assert path.read_text().splitlines()[1] == '2021-01-01 01:00:00,203.0.113.9,2021-01-01 05:00:00,5'
+
+
+def test_index_compiled_once_across_threads(tmp_path, monkeypatch):
+    compiles = []
+    read_ip_network_csv = fgpe.locations.read_ip_network_csv
+
+    def slow_read(csv_file_path):
+        compiles.append(csv_file_path)
+        time.sleep(0.05)
+        return read_ip_network_csv(csv_file_path)
+
+    monkeypatch.setattr('fgpe.locations.read_ip_network_csv', slow_read)
+    locations = LocationLookup()
+    locations.index_cache_path = tmp_path / 'networks.idx'
+    indexes = []
+    threads = [threading.Thread(target=lambda: indexes.append(locations.ip_network_index)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(compiles) == 1
+    assert all(index is indexes[0] for index in indexes)
+    locations.close()
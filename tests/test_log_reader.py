@@ -0,0 +1,56 @@
+import os
+from fgpe.log_reader import LogReader, ServerState, ConnectionDetails
+
+NOISE = 'Some other log line that is not interesting\n'
+
+
+def write(path, text, mode='a'):
+    with open(path, mode, newline='') as f:
+        f.write(text)
+
+
+def test_cold_start_finds_most_recent_marker(tmp_path, connect_line, shutdown_line):
+    log = tmp_path / 'Player.log'
+    write(log, NOISE * 50 + connect_line('10.0.0.1', 1000) + NOISE * 50 + shutdown_line
+          + NOISE * 50 + connect_line('10.0.0.2', 2000) + NOISE * 500, 'w')
+
+    # Small blocks so markers straddle block boundaries
+    for block_size in (64, 100, 1024 * 1024):
+        reader = LogReader(str(log), block_size=block_size)
+        assert reader.get_connection_details() == (ServerState.CONNECTED, ConnectionDetails('10.0.0.2', '2000'))
+        assert reader.position == log.stat().st_size
+
+
+def test_appended_lines_and_partial_lines(tmp_path, connect_line, shutdown_line):
+    log = tmp_path / 'Player.log'
+    write(log, NOISE * 10, 'w')
+    reader = LogReader(str(log), block_size=64)
+    assert reader.get_connection_details()[0] == ServerState.NOT_CONNECTED
+
+    line = connect_line('10.0.0.3', 3000)
+    write(log, NOISE * 10 + line[:30])
+    assert reader.get_connection_details()[0] == ServerState.NOT_CONNECTED
+    write(log, line[30:] + NOISE * 10)
+    assert reader.get_connection_details() == (ServerState.CONNECTED, ConnectionDetails('10.0.0.3', '3000'))
+
+    write(log, shutdown_line)
+    assert reader.get_connection_details()[0] == ServerState.NOT_CONNECTED
+
+
+def test_rotation_and_truncation(tmp_path, connect_line):
+    log = tmp_path / 'Player.log'
+    write(log, NOISE * 100 + connect_line('10.0.0.4', 4000), 'w')
+    reader = LogReader(str(log))
+    assert reader.get_connection_details()[1].ip == '10.0.0.4'
+
+    # Game restart moves the log aside and starts a new one
+    os.replace(log, tmp_path / 'Player-prev.log')
+    write(log, NOISE, 'w')
+    assert reader.get_connection_details()[0] == ServerState.NOT_CONNECTED
+
+    write(log, connect_line('10.0.0.5', 5000))
+    assert reader.get_connection_details()[1].ip == '10.0.0.5'
+
+    # Truncated in place
+    write(log, connect_line('10.0.0.6', 6000), 'w')
+    assert reader.get_connection_details()[1].ip == '10.0.0.6'
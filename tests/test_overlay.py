@@ -0,0 +1,109 @@
+import pytest
+from fgpe.overlay import Sparkline
+
+
+class FakeCanvas:
+    """
+    Records items and calls the way a Tk Canvas would apply them
+    """
+    def __init__(self):
+        self.items = {}
+        self.calls = 0
+
+    def create_line(self, *coords, **options):
+        item = len(self.items) + 1
+        self.items[item] = {'coords': list(coords), 'state': options.get('state', 'normal'),
+                            'tags': options.get('tags', ())}
+        return item
+
+    def coords(self, item, *coords):
+        self.calls += 1
+        self.items[item]['coords'] = list(coords)
+
+    def itemconfigure(self, item, **options):
+        self.calls += 1
+        self.items[item].update(options)
+
+    def move(self, tag, dx, dy):
+        self.calls += 1
+        for item in self.items.values():
+            if tag in item['tags']:
+                coords = item['coords']
+                item['coords'] = [value + (dx if index % 2 == 0 else dy) for index, value in enumerate(coords)]
+
+    def visible(self, items):
+        return [self.items[item]['coords'] for item in items if self.items[item]['state'] == 'normal']
+
+
+def test_sparkline_reuses_items_with_constant_calls():
+    canvas = FakeCanvas()
+    sparkline = Sparkline(canvas, width=100, height=21, max_samples=11, initial_max_ms=100)
+    items = len(canvas.items)
+
+    calls = []
+    for sample in range(200):
+        before = canvas.calls
+        sparkline.extend([float(sample % 50)])
+        calls.append(canvas.calls - before)
+
+    assert len(canvas.items) == items
+    assert max(calls) == min(calls[1:])
+    # The newest segment ends at the right edge, and every visible segment is on the canvas
+    segments = canvas.visible(sparkline.segments)
+    assert len(segments) == 11
+    assert max(coords[2] for coords in segments) == 100
+    assert min(round(coords[0]) for coords in segments) == -10
+    assert sparkline.rescales == 0
+
+
+def test_sparkline_marks_loss_and_average():
+    canvas = FakeCanvas()
+    sparkline = Sparkline(canvas, width=100, height=21, max_samples=11, avg_size=3, initial_max_ms=100)
+    sparkline.extend([20.0, None, 40.0])
+    sparkline.extend([60.0])
+
+    loss_markers = canvas.visible(sparkline.loss_markers)
+    assert loss_markers == [[80.0, 0, 80.0, 21]]
+    # 20 + 40 + 60 over 3 is 40% of the scale, drawn between 1 pixel margins
+    assert canvas.items[sparkline.average]['coords'] == [0, pytest.approx(12.4), 100, pytest.approx(12.4)]
+    assert canvas.items[sparkline.average]['state'] == 'normal'
+
+
+def test_sparkline_rescales_and_clears():
+    canvas = FakeCanvas()
+    sparkline = Sparkline(canvas, width=100, height=21, max_samples=11, initial_max_ms=100)
+    sparkline.extend([50.0, 50.0])
+    sparkline.extend([300.0])
+    assert sparkline.rescales == 1
+    assert sparkline.max_ms == 400
+    # Every sample is redrawn on the new scale, ending at the right edge
+    segments = canvas.visible(sparkline.segments)
+    assert sorted(coords[0] for coords in segments) == [80.0, 80.0, 90.0]
+    assert [coords[3] for coords in segments if coords[2] == 100.0] == [5.75]
+
+    calls = canvas.calls
+    sparkline.extend([])
+    assert canvas.calls == calls
+
+    sparkline.clear()
+    assert canvas.visible(sparkline.segments + sparkline.loss_markers + [sparkline.average]) == []
+    assert sparkline.max_ms == 100
+
+
+def test_sparkline_scale_drops_once_spike_scrolls_off():
+    canvas = FakeCanvas()
+    sparkline = Sparkline(canvas, width=100, height=21, max_samples=11, initial_max_ms=100)
+    sparkline.extend([50.0, 2_000.0])
+    assert sparkline.max_ms == 3_200
+
+    for _ in range(10):
+        sparkline.extend([50.0])
+    # The spike is the oldest sample still shown
+    assert sparkline.max_ms == 3_200 and sparkline.rescales == 1
+
+    sparkline.extend([50.0])
+    assert sparkline.max_ms == 100 and sparkline.rescales == 2
+    # Redrawn on the initial scale, with the average too
+    # 50ms is half of the scale, drawn between 1 pixel margins
+    assert [coords[3] for coords in canvas.visible(sparkline.segments)] == [pytest.approx(10.5)] * 11
+    assert canvas.items[sparkline.average]['coords'][1] == pytest.approx(10.5)
@@ -0,0 +1,138 @@
+import sys
+import time
+import threading
+from fgpe.pinger import PingConnect, parse_ping_line
+from fgpe.ping_worker import PingPool, PingWorker, StreamingPingWorker
+from fgpe.log_reader import ConnectionDetails
+
+
+class FakePinger:
+    def __init__(self, ip_address):
+        self.ip_address = ip_address
+
+    def get_ping_time(self):
+        return PingConnect.CONNECTED, 42
+
+
+def wait_for_samples(worker, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        samples = worker.drain()
+        if samples:
+            return samples
+        time.sleep(0.01)
+    return []
+
+
+def test_worker_publishes_samples_for_current_connection():
+    worker = PingWorker(interval=0.01, pinger_factory=FakePinger)
+    first = ConnectionDetails('10.0.0.1', '1234')
+    second = ConnectionDetails('10.0.0.2', '1234')
+
+    worker.start(first)
+    samples = wait_for_samples(worker)
+    assert samples and all(sample.connection == first and sample.ping_time == 42 for sample in samples)
+
+    worker.start(second)
+    time.sleep(0.05)
+    assert wait_for_samples(worker)[-1].connection == second
+
+    worker.stop()
+    time.sleep(0.05)
+    worker.drain()
+    time.sleep(0.05)
+    assert worker.drain() == []
+
+
+def fake_ping_command(ip_address, interval):
+    script = (
+        'import time\n'
+        f'print("PING {ip_address} ({ip_address}) 56(84) bytes of data.")\n'
+        f'print("64 bytes from {ip_address}: icmp_seq=1 ttl=57 time=12.3 ms")\n'
+        'print("no answer yet for icmp_seq=2")\n'
+        f'print("64 bytes from {ip_address}: icmp_seq=3 ttl=57 time=14.0 ms")\n'
+    )
+    return [sys.executable, '-u', '-c', script]
+
+
+def test_streaming_worker_parses_lines_and_restarts():
+    worker = StreamingPingWorker(command_factory=fake_ping_command, min_restart_delay=0.01)
+    connection = ConnectionDetails('10.0.0.1', '1234')
+    worker.start(connection)
+
+    samples = []
+    deadline = time.monotonic() + 5
+    while len(samples) < 6 and time.monotonic() < deadline:
+        samples += wait_for_samples(worker)
+    worker.stop()
+
+    assert [(sample.status, sample.ping_time) for sample in samples[:3]] == [
+        (PingConnect.CONNECTED, 12),
+        (PingConnect.NOT_CONNECTED, None),
+        (PingConnect.CONNECTED, 14),
+    ]
+    assert worker.restarts >= 1
+
+
+def test_parse_windows_and_linux_ping_lines():
+    assert parse_ping_line('Reply from 1.2.3.4: bytes=32 time=23ms TTL=57') == (PingConnect.CONNECTED, 23)
+    assert parse_ping_line('Reply from 1.2.3.4: bytes=32 time<1ms TTL=57') == (PingConnect.CONNECTED, 1)
+    assert parse_ping_line('Request timed out.') == (PingConnect.NOT_CONNECTED, None)
+    assert parse_ping_line('64 bytes from 1.2.3.4: icmp_seq=1 ttl=57 time=23.4 ms') == (PingConnect.CONNECTED, 23)
+    assert parse_ping_line('Pinging 1.2.3.4 with 32 bytes of data:') is None
+
+
+def test_burst_publishes_every_probe_per_interval():
+    worker = PingWorker(interval=10, pinger_factory=FakePinger, burst_size=3)
+    worker.start(ConnectionDetails('10.0.0.1', '1234'))
+    samples = wait_for_samples(worker)
+    worker.stop()
+    assert len(samples) == 3
+    assert len({sample.timestamp for sample in samples}) == 1
+
+
+class SlowPinger:
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def __init__(self, ip_address):
+        self.ip_address = ip_address
+
+    def get_ping_time(self):
+        with SlowPinger.lock:
+            SlowPinger.in_flight += 1
+            SlowPinger.max_in_flight = max(SlowPinger.max_in_flight, SlowPinger.in_flight)
+        time.sleep(0.02)
+        with SlowPinger.lock:
+            SlowPinger.in_flight -= 1
+        return PingConnect.CONNECTED, float(self.ip_address.split('.')[-1].split(':')[0])
+
+
+def test_pool_pings_each_client_on_shared_threads():
+    pool = PingPool(interval=0.01, pinger_factory=SlowPinger, burst_size=2, max_workers=3)
+    workers = [pool.worker() for _ in range(6)]
+    threads_before = threading.active_count()
+    for number, worker in enumerate(workers, 1):
+        worker.start(ConnectionDetails(f'10.0.0.{number}', '1234'))
+
+    try:
+        for number, worker in enumerate(workers, 1):
+            samples = wait_for_samples(worker)
+            assert samples and all(sample.ping_time == number for sample in samples)
+            assert all(sample.connection.ip == f'10.0.0.{number}' for sample in samples)
+        # Scheduler thread and pool threads, however many clients there are
+        assert threading.active_count() - threads_before <= 1 + 3
+        assert SlowPinger.max_in_flight <= 3
+
+        workers[0].start(ConnectionDetails('10.0.0.9', '1234'))
+        time.sleep(0.1)
+        assert wait_for_samples(workers[0])[-1].ping_time == 9
+
+        workers[1].stop()
+        time.sleep(0.05)
+        workers[1].drain()
+        time.sleep(0.05)
+        assert workers[1].drain() == []
+    finally:
+        pool.stop()
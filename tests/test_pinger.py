@@ -0,0 +1,77 @@
+import pytest
+import socket
+from statistics import median
+from time import perf_counter_ns
+from fgpe.pinger import Pinger, PingConnect, TCPConnectBackend, UDPProbeBackend, format_host, split_host
+from fgpe.__main__ import parse_args
+
+
+def measure_probe(pinger, n=200):
+    """
+    Returns the median reported round trip and the least time get_ping_time spent outside it, both in ms
+
+    The least overhead is used as a busy machine can only make some probes slower.
+    """
+    reported, overheads = [], []
+    for _ in range(n):
+        start = perf_counter_ns()
+        status, ping_time = pinger.get_ping_time()
+        elapsed = (perf_counter_ns() - start) / 1_000_000
+        assert status == PingConnect.CONNECTED
+        reported.append(ping_time)
+        overheads.append(elapsed - ping_time)
+    return median(reported), min(overheads)
+
+
+def test_udp_probe_overhead(udp_echo_server):
+    ip, port = udp_echo_server
+    reported, overhead = measure_probe(Pinger(f'{ip}:{port}', UDPProbeBackend()))
+    assert 0 < reported < 5
+    # Socket set up and tear down around the timed round trip
+    assert overhead < 1
+
+
+def test_tcp_probe_overhead(tcp_listener):
+    ip, port = tcp_listener
+    # Fewer probes than the listener's backlog, as they can get ahead of the thread accepting them
+    reported, overhead = measure_probe(Pinger(f'{ip}:{port}', TCPConnectBackend()), n=100)
+    assert 0 < reported < 5
+    assert overhead < 1
+
+
+def test_refused_probes_still_measure_round_trip():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        _, closed_port = sock.getsockname()
+
+    for backend in (TCPConnectBackend(), UDPProbeBackend()):
+        status, ping_time = Pinger(f'127.0.0.1:{closed_port}', backend).get_ping_time()
+        assert status == PingConnect.CONNECTED and ping_time is not None
+
+
+def test_probe_without_port_is_not_connected():
+    assert Pinger('127.0.0.1', TCPConnectBackend()).get_ping_time() == (PingConnect.NOT_CONNECTED, None)
+
+
+def test_hosts_with_ipv6_addresses():
+    assert format_host('10.0.0.1', '1234') == '10.0.0.1:1234'
+    assert format_host('2001:db8::1', 1234) == '[2001:db8::1]:1234'
+    assert split_host('10.0.0.1:1234') == ('10.0.0.1', '1234')
+    assert split_host('10.0.0.1') == ('10.0.0.1', None)
+    assert split_host('[2001:db8::1]:1234') == ('2001:db8::1', '1234')
+    assert split_host('2001:db8::1:1234') == ('2001:db8::1:1234', None)
+    pinger = Pinger(format_host('::1', 1234))
+    assert (pinger.ip_address, pinger.port) == ('::1', '1234')
+
+
+def test_streaming_ping_needs_the_ping_probe():
+    assert parse_args(['--streaming-ping']).streaming_ping
+    with pytest.raises(SystemExit):
+        parse_args(['--streaming-ping', '--probe', 'udp'])
+
+
+def test_burst_must_be_positive():
+    assert parse_args(['--burst', '3']).burst_size == 3
+    for burst in ('0', '-2', 'two'):
+        with pytest.raises(SystemExit):
+            parse_args(['--burst', burst])
@@ -0,0 +1,44 @@
+import os
+import shutil
+import subprocess
+import pytest
+from fgpe.process_tracker import ProcessTracker
+
+
+@pytest.fixture
+def dummy_process(tmp_path):
+    # Copy of sleep under a unique name, short enough not to be truncated
+    name = f'fgpe_test_{os.getpid() % 10000}'
+    sleep = shutil.which('sleep')
+    if sleep is None:
+        pytest.skip('sleep is not available')
+    executable = tmp_path / name
+    shutil.copy(sleep, executable)
+    process = subprocess.Popen([str(executable), '60'])
+    yield name, process
+    process.kill()
+    process.wait()
+
+
+def test_tracker_caches_pid_until_process_exits(dummy_process):
+    name, process = dummy_process
+    tracker = ProcessTracker(name)
+
+    assert tracker.is_running()
+    assert tracker.pid == process.pid
+    for _ in range(10):
+        assert tracker.is_running()
+    assert tracker.scans == 1
+
+    process.kill()
+    process.wait()
+    assert not tracker.is_running()
+    assert tracker.pid is None
+    assert tracker.scans == 2
+
+
+def test_tracker_not_running():
+    tracker = ProcessTracker('fgpe_no_such_process.exe')
+    assert not tracker.is_running()
+    assert not tracker.is_running()
+    assert tracker.scans == 2
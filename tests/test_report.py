@@ -0,0 +1,47 @@
+import pytest
+from fgpe.report import Report, main
+from fgpe.rollups import RollupStore
+from fgpe.locations import LocationLookup
+from fgpe.stats_store import STATS_CSV_HEADER
+
+
+def test_report_aggregates_by_region_location_and_window(tmp_path):
+    csv_path = tmp_path / 'stats.csv'
+    csv_path.write_text(
+        STATS_CSV_HEADER + '\n'
+        '2022-01-03 10:00:00,2022-01-03 10:05:00,129.227.152.1,1234,10,20,40,30,30.0,35,38,1,0\n'
+        '2022-01-04 10:00:00,2022-01-04 10:05:00,129.227.152.2,1234,30,30,50,40,40.0,45,48,1,0\n'
+        '2022-02-01 10:00:00,2022-02-01 10:05:00,0.0.0.1,1234,5,90,110,100,100.0,105,108,1,0\n'
+        '2022-02-01 11:00:00,2022-02-01 11:05:00,0.0.0.1,1234,0,,,,,,,,\n'
+        '2022-02-01 12:00:00,2022-02-01 12:05:00,not an ip,1234,5,90,110,100,100.0,105,108,1,0\n'
+    )
+    report = Report(LocationLookup(), 'week')
+    report.add_file(csv_path, chunk_size=64)
+    by_region, by_location, by_window = report.aggregates()
+
+    assert (report.rows, report.skipped) == (5, 2)
+    assert by_region['Asia East'].sessions == 2
+    assert by_region['Asia East'].weighted_mean == (10 * 30 + 30 * 40) / 40
+    assert by_location['Asia East', 'Hong Kong'].pings == 40
+    assert by_window['Asia East', '2022-W01'].sessions == 2
+    # A 5 ping session's 90th percentile is its Max column
+    assert abs(by_window['Unknown', '2022-W05'].sketch.quantile(0.9) - 110) < 2
+    assert 'Hong Kong' in report.format()
+
+    # The rollups rebuilt from the same file have the same percentiles
+    rollups = RollupStore(tmp_path / 'rollups.json', LocationLookup())
+    rollups.rebuild(csv_path)
+    sketch = by_region['Asia East'].sketch
+    assert rollups.typical('Asia East') == (sketch.quantile(0.5), sketch.quantile(0.9))
+
+
+def test_report_rejects_files_that_are_not_stats_csv(tmp_path, capsys):
+    empty = tmp_path / 'empty.csv'
+    empty.write_text('')
+    other = tmp_path / 'other.csv'
+    other.write_text('Start Time,IP Address,Mean\n')
+    for path, message in ((tmp_path / 'missing.csv', 'unable to read'), (empty, 'has no Start Time, IP Address'),
+                          (other, 'has no Count column')):
+        with pytest.raises(SystemExit):
+            main([str(path)])
+        assert message in capsys.readouterr().err
@@ -0,0 +1,96 @@
+import time
+from fgpe.__main__ import Events
+from fgpe.stats import Stats
+from fgpe.rollups import RollupStore, format_typical
+from fgpe.locations import LocationLookup
+from fgpe.log_reader import ConnectionDetails
+from fgpe.stats_store import CSVStatsStore
+
+HONG_KONG = ConnectionDetails('129.227.152.1', '1234')
+HONG_KONG_2 = ConnectionDetails('129.227.152.2', '1234')
+UNKNOWN = ConnectionDetails('0.0.0.1', '1234')
+
+
+def play(stats, connection, pings):
+    for ping in pings:
+        stats.add(connection, ping)
+    stats.end_session(connection)
+
+
+def test_sessions_update_rollups_and_persist(tmp_path):
+    path = tmp_path / 'rollups.json'
+    store = RollupStore(path, LocationLookup(), flush_interval=60)
+    stats = Stats(store=CSVStatsStore(tmp_path / 'stats.csv'), rollups=store)
+    play(stats, HONG_KONG, range(10, 101))
+    play(stats, HONG_KONG_2, [200, 200])
+    play(stats, UNKNOWN, [5, 5, 5])
+    # Written behind, not as each session ends
+    assert not path.exists()
+
+    assert list(store.rollups) == [('Asia East', 'Hong Kong')]
+    region = store.regions['Asia East']
+    assert (region.sessions, region.count, region.min, region.max) == (2, 93, 10, 200)
+    assert region.sum == sum(range(10, 101)) + 400
+    p50, p90 = store.typical('Asia East')
+    assert abs(p50 - 56) < 1 and abs(p90 - 92) < 1
+    assert store.typical('Unknown') is None
+    assert format_typical((55.6, 91.6)) == ', Typical p50/p90=56/92ms'
+
+    stats.close()
+    reloaded = RollupStore(path, LocationLookup())
+    assert reloaded.typical('Asia East') == (p50, p90)
+    assert reloaded.regions['Asia East'].to_dict() == region.to_dict()
+
+
+def test_rebuild_from_stats_csv(tmp_path):
+    csv_path = tmp_path / 'stats.csv'
+    stats = Stats(store=CSVStatsStore(csv_path))
+    play(stats, HONG_KONG, range(10, 101))
+    play(stats, HONG_KONG_2, [40])
+    play(stats, UNKNOWN, [5, 5, 5])
+    with open(csv_path, 'a') as f:
+        f.write('2022-02-01 11:00:00,2022-02-01 11:05:00,129.227.152.1,1234,0,,,,,,,,\n')
+
+    store = RollupStore(tmp_path / 'rollups.json', LocationLookup())
+    assert store.rebuild(csv_path) == (4, 1)
+    region = store.regions['Asia East']
+    assert (region.sessions, region.count, region.min, region.max) == (2, 92, 10, 100)
+    assert abs(region.sum - (sum(range(10, 101)) + 40)) < 1e-6
+    p50, p90 = store.typical('Asia East')
+    assert abs(p50 - 55) < 2 and abs(p90 - 91) < 2
+    assert RollupStore(tmp_path / 'rollups.json', LocationLookup()).typical('Asia East') == (p50, p90)
+
+
+def test_unreadable_rollups_start_empty(tmp_path):
+    path = tmp_path / 'rollups.json'
+    path.write_text('{not json')
+    store = RollupStore(path, LocationLookup())
+    assert store.rollups == {} and store.typical('Asia East') is None
+
+
+def test_overlay_shows_typical_ping_once_server_is_resolved(tmp_path, connect_line, memory_store):
+    store = RollupStore(tmp_path / 'rollups.json', LocationLookup())
+    stats = Stats(store=memory_store, rollups=store)
+    play(stats, HONG_KONG_2, [30, 40, 50])
+
+    log = tmp_path / 'Player.log'
+    log.write_text(connect_line(HONG_KONG.ip, HONG_KONG.port))
+    events = Events(probe='udp', stats=stats, log_location=str(log))
+    events.has_first_run = True
+    try:
+        _, text = events.update_text()
+    finally:
+        events.shutdown()
+    assert events.rollups is store
+    assert text.endswith(format_typical(store.typical('Asia East')))
+    assert HONG_KONG.ip in text
+
+
+def test_rollups_are_written_after_flush_interval(tmp_path, memory_store):
+    path = tmp_path / 'rollups.json'
+    store = RollupStore(path, LocationLookup(), flush_interval=0.05)
+    play(Stats(store=memory_store, rollups=store), HONG_KONG, [30, 40])
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert RollupStore(path, LocationLookup()).regions['Asia East'].count == 2
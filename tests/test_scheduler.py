@@ -0,0 +1,174 @@
+import pytest
+from fgpe.__main__ import Events
+from fgpe.stats import Stats
+from fgpe.scheduler import Scheduler
+from fgpe.pinger import PingConnect
+from fgpe.ping_worker import PingSample
+
+
+def test_timer_backs_off_and_resets(fake_clock):
+    clock = fake_clock
+    scheduler = Scheduler(clock, coalesce=0)
+    scheduler.add('log', 1, 10)
+    assert scheduler.due('log')
+
+    waits = []
+    for _ in range(6):
+        scheduler.ran('log', active=False)
+        waits.append(scheduler.wait_ms())
+    assert waits == [2_000, 4_000, 8_000, 10_000, 10_000, 10_000]
+    assert not scheduler.due('log')
+
+    scheduler.ran('log')
+    assert scheduler.wait_ms() == 1_000
+    clock.advance(0.5)
+    scheduler.reset('log')
+    assert scheduler.due('log') and scheduler.wait_ms() == 0
+    assert scheduler.wakeups == 8
+
+
+def test_due_timers_coalesce_in_to_one_wakeup(fake_clock):
+    clock = fake_clock
+    scheduler = Scheduler(clock, coalesce=0.1)
+    scheduler.add('log', 1)
+    scheduler.add('process', 1.05)
+    scheduler.add('probe', 0.5, wakes=False)
+    scheduler.ran('log')
+    scheduler.ran('process')
+    scheduler.ran('probe')
+
+    # Probe doesn't wake, and process is close enough to run with log
+    assert scheduler.wait_ms() == 1_000
+    clock.advance(1)
+    assert scheduler.due('log') and scheduler.due('process') and scheduler.due('probe')
+
+
+def test_no_waking_timers(fake_clock):
+    scheduler = Scheduler(fake_clock)
+    scheduler.add('probe', 1, wakes=False)
+    with pytest.raises(ValueError):
+        scheduler.wait_ms()
+
+
+def test_events_back_off_while_game_not_running(tmp_path, fake_clock, memory_store):
+    clock = fake_clock
+    events = Events(log_location=str(tmp_path / 'Player.log'), stats=Stats(store=memory_store),
+                    scheduler=Scheduler(clock))
+    events.has_first_run = True
+    try:
+        waits = []
+        for _ in range(6):
+            wait_time, text = events.update_text()
+            assert text == 'Fall Guys Game is not Running'
+            waits.append(wait_time)
+            clock.advance(wait_time / 1_000)
+    finally:
+        events.shutdown()
+    assert waits == [2_000, 4_000, 8_000, 10_000, 10_000, 10_000]
+
+
+def test_events_process_checked_when_due(tmp_path, fake_clock, stub_process_tracker, memory_store):
+    log = tmp_path / 'Player.log'
+    log.write_text('Some other log line\n')
+    clock = fake_clock
+    events = Events(log_location=str(log), stats=Stats(store=memory_store), scheduler=Scheduler(clock))
+    events.has_first_run = True
+    events.process_tracker = stub_process_tracker(running=False)
+    events.reader.modified_time -= 60
+    try:
+        waits = []
+        for _ in range(20):
+            wait_time, _ = events.update_text()
+            waits.append(wait_time)
+            clock.advance(wait_time / 1_000)
+    finally:
+        events.shutdown()
+    # Process checks back off 10, 20, 40, 60 seconds while the game isn't running
+    assert sum(waits) / 1_000 < 10 + 20 + 40 + 60 + 60
+    assert events.process_tracker.checks <= 6
+    assert max(waits) == 10_000
+
+
+def test_events_probe_fast_after_new_connection(tmp_path, connect_line, fake_clock, memory_store):
+    log = tmp_path / 'Player.log'
+    log.write_text(connect_line('10.0.0.1', '7777'))
+    clock = fake_clock
+    events = Events(log_location=str(log), stats=Stats(store=memory_store), scheduler=Scheduler(clock))
+    events.has_first_run = True
+    worker = events.ping_worker
+    worker.start = lambda connection: None
+    try:
+        intervals = []
+        for _ in range(6):
+            wait_time, _ = events.update_text()
+            intervals.append(worker.interval)
+            connection = events.current_connection
+            worker.samples.put(PingSample(clock.now, connection, PingConnect.CONNECTED, 30.0))
+            clock.advance(wait_time / 1_000)
+        assert wait_time == 1_000
+
+        # A new server probes quickly again
+        with open(log, 'a') as f:
+            f.write(connect_line('10.0.0.2', '7777'))
+        events.reader.handle_file_event(None)
+        events.update_text()
+        assert worker.interval == 1.0
+    finally:
+        events.shutdown()
+    assert intervals == [1.0, 1.0, 1.5, 2.25, 3.375, 5.0]
+
+
+def test_events_wake_when_log_shows_a_connection(tmp_path, connect_line, fake_clock, stub_process_tracker, memory_store):
+    log = tmp_path / 'Player.log'
+    log.write_text('Some other log line\n')
+    clock = fake_clock
+    events = Events(log_location=str(log), stats=Stats(store=memory_store), scheduler=Scheduler(clock))
+    events.has_first_run = True
+    events.ping_worker.start = lambda connection: None
+    woken = []
+    events.wake_listeners.append(lambda: woken.append(clock.now))
+    try:
+        # The log is old, so the game is idle and updates back off
+        events.reader.modified_time -= 60
+        events.process_tracker = stub_process_tracker(running=True)
+        for _ in range(4):
+            wait_time, text = events.update_text()
+            clock.advance(1)
+        assert text == 'Not Connected to Fall Guys Server' and wait_time > 1_000
+        assert not events.scheduler.due(events.clients[0].log_timer)
+
+        with open(log, 'a') as f:
+            f.write(connect_line('10.0.0.1', '7777'))
+        events.reader.handle_file_event(None)
+        assert woken == [clock.now]
+        wait_time, text = events.update_text()
+        assert text == 'Pinging Fall Guys IP: 10.0.0.1'
+    finally:
+        events.shutdown()
+
+
+def test_idle_client_backs_off_while_another_is_active(tmp_path, connect_line, fake_clock, memory_store):
+    log = tmp_path / 'Player.log'
+    log.write_text(connect_line('10.0.0.1', '7777'))
+    clock = fake_clock
+    events = Events(log_locations={'active': str(log), 'idle': str(tmp_path / 'missing.log')},
+                    stats=Stats(store=memory_store), scheduler=Scheduler(clock))
+    events.has_first_run = True
+    updates = {'active': 0, 'idle': 0}
+    update_client = events._update_client
+
+    def counting_update_client(client):
+        updates[client.name] += 1
+        return update_client(client)
+
+    events._update_client = counting_update_client
+    try:
+        for _ in range(30):
+            wait_time, text = events.update_text()
+            clock.advance(wait_time / 1_000)
+    finally:
+        events.shutdown()
+    assert text.splitlines()[1] == 'idle: Fall Guys Game is not Running'
+    # Every second for the active client, backing off to every 10 seconds for the idle one
+    assert updates['active'] == 30
+    assert updates['idle'] <= 6
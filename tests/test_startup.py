@@ -0,0 +1,25 @@
+from fgpe.startup import ImportTime, deferred_imports, measure_startup, parse_importtime
+
+
+def test_parse_importtime():
+    text = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       264 |        264 |   fgpe\n'
+        'import time:      4650 |      76171 | fgpe.__main__\n'
+    )
+    imports = parse_importtime(text)
+    assert [item.module for item in imports] == ['fgpe', 'fgpe.__main__']
+    assert imports[1].cumulative_us == 76171
+
+
+def test_deferred_imports_include_submodules():
+    imports = [ImportTime(module, 1, 1) for module in ('requests', 'requests.adapters', 'requestsx', 'fgpe.metrics')]
+    assert deferred_imports(imports) == ['requests', 'requests.adapters', 'fgpe.metrics']
+
+
+def test_nothing_deferred_is_imported_before_first_frame():
+    # Which modules load is what keeps the first frame fast, and unlike the wall time it doesn't depend on the machine
+    _, imports = measure_startup()
+    modules = {item.module for item in imports}
+    assert 'fgpe.__main__' in modules
+    assert deferred_imports(imports) == []
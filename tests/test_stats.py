@@ -0,0 +1,65 @@
+import csv
+import random
+from statistics import median, quantiles
+from fgpe.stats import Stats
+from fgpe.stats_store import CSVStatsStore, STATS_CSV_HEADER
+from fgpe.log_reader import ConnectionDetails
+from fgpe.streaming_stats import QuantileSketch, RingBuffer
+
+CONNECTION = ConnectionDetails('10.0.0.1', '1234')
+
+
+def make_stats(tmp_path):
+    return Stats(store=CSVStatsStore(tmp_path / 'stats.csv'))
+
+
+def test_jitter_and_loss(tmp_path):
+    stats = make_stats(tmp_path)
+    for ping in (20, 30, 20):
+        stats.add(CONNECTION, ping)
+    stats.add_loss(CONNECTION)
+
+    # J = 0 + (10 - 0) / 16, then J + (10 - J) / 16
+    expected_jitter = 10 / 16 + (10 - 10 / 16) / 16
+    session = stats.sessions[CONNECTION]
+    assert abs(session.jitter - expected_jitter) < 1e-9
+    assert session.loss_ratio == 0.25
+    assert stats.stats_string(CONNECTION) == (
+        f'Ping=20ms, Min=20ms, Max=30ms, Avg(3)=23.3ms, Jitter={expected_jitter:.1f}ms, Loss=25%'
+    )
+
+    stats.end_session(CONNECTION)
+    with open(stats.store.path, newline='') as f:
+        row = next(csv.DictReader(f))
+    assert (row['Count'], row['Min'], row['Max']) == ('3', '20', '30')
+    assert float(row['Loss']) == 0.25
+    assert abs(float(row['Jitter']) - expected_jitter) < 1e-3
+
+
+def test_session_without_replies_is_not_written(tmp_path):
+    stats = make_stats(tmp_path)
+    stats.add_loss(CONNECTION)
+    stats.end_session(CONNECTION)
+    assert stats.store.path.read_text() == STATS_CSV_HEADER + '\n'
+    assert CONNECTION not in stats.sessions
+
+
+def test_ring_buffer_keeps_rolling_window():
+    ring = RingBuffer(3)
+    for value in range(1, 6):
+        ring.append(value)
+    assert (len(ring), ring.last, ring.mean) == (3, 5, 4)
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    rng = random.Random(0)
+    values = [rng.lognormvariate(3.5, 0.4) for _ in range(20_000)]
+    first, second = QuantileSketch(), QuantileSketch()
+    for i, value in enumerate(values):
+        (first if i % 2 else second).add(value)
+    first.merge(second)
+
+    exact_75, exact_90 = quantiles(values, n=20)[14], quantiles(values, n=10)[-1]
+    for q, exact in ((0.5, median(values)), (0.75, exact_75), (0.9, exact_90)):
+        assert abs(first.quantile(q) - exact) / exact < 0.02
+    assert QuantileSketch.from_dict(first.to_dict()).quantile(0.9) == first.quantile(0.9)
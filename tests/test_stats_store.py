@@ -0,0 +1,63 @@
+import sqlite3
+from fgpe.stats import Stats
+from fgpe.log_reader import ConnectionDetails
+from fgpe.stats_store import CSVStatsStore, MultiStatsStore, SQLiteStatsStore, STATS_CSV_HEADER, import_stats_csv
+
+CONNECTION = ConnectionDetails('10.0.0.1', '1234')
+OLD_HEADER = 'Start Time,End Time,IP Address,Port,Count,Min,Max,Median,Mean,75th,90th'
+
+
+def count_rows(db_path, table):
+    with sqlite3.connect(db_path) as connection:
+        return connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_sqlite_store_batches_writes_until_flush(tmp_path):
+    db_path = tmp_path / 'stats.db'
+    stats = Stats(store=SQLiteStatsStore(db_path, flush_interval=60))
+    for ping in (20, 30, 25):
+        stats.add(CONNECTION, ping)
+    stats.add_loss(CONNECTION)
+    stats.end_session(CONNECTION)
+    assert count_rows(db_path, 'pings') == 0
+
+    stats.close()
+    assert count_rows(db_path, 'pings') == 4
+    with sqlite3.connect(db_path) as connection:
+        assert connection.execute('SELECT count, min, max, loss FROM sessions').fetchall() == [(3, 20, 30, 0.25)]
+        assert connection.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+
+def test_import_stats_csv(tmp_path):
+    csv_path = tmp_path / 'stats.csv'
+    csv_path.write_text(
+        OLD_HEADER + '\n'
+        '2022-01-01 10:00:00,2022-01-01 10:05:00,10.0.0.1,1234,1,20,20,20,20,,\n'
+        '2022-01-01 11:00:00,2022-01-01 11:05:00,10.0.0.2,1234,3,20,30,25,25,27.5,29.0\n'
+    )
+    assert import_stats_csv(csv_path, tmp_path / 'stats.db') == 2
+    with sqlite3.connect(tmp_path / 'stats.db') as connection:
+        assert connection.execute('SELECT ip, p75, jitter FROM sessions ORDER BY id').fetchall() == [
+            ('10.0.0.1', None, None),
+            ('10.0.0.2', 27.5, None),
+        ]
+    assert import_stats_csv(csv_path, tmp_path / 'stats.db') == 0
+    assert count_rows(tmp_path / 'stats.db', 'sessions') == 2
+
+
+def test_csv_store_extends_old_header(tmp_path):
+    csv_path = tmp_path / 'stats.csv'
+    csv_path.write_text(OLD_HEADER + '\na,b,c,d,1,2,3,4,5,6,7\n')
+    CSVStatsStore(csv_path)
+    assert csv_path.read_text().splitlines() == [STATS_CSV_HEADER, 'a,b,c,d,1,2,3,4,5,6,7']
+
+
+def test_multi_store_writes_to_each_store(tmp_path):
+    stats = Stats(store=MultiStatsStore(CSVStatsStore(tmp_path / 'stats.csv'),
+                                        SQLiteStatsStore(tmp_path / 'stats.db', flush_interval=60)))
+    stats.add(CONNECTION, 20)
+    stats.end_session(CONNECTION)
+    stats.close()
+    assert len((tmp_path / 'stats.csv').read_text().splitlines()) == 2
+    assert count_rows(tmp_path / 'stats.db', 'sessions') == 1
+    assert count_rows(tmp_path / 'stats.db', 'pings') == 1
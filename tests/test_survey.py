@@ -0,0 +1,117 @@
+# Standard Library
+import time
+import socket
+import threading
+from ipaddress import ip_network
+
+# Third Party Modules
+import pytest
+
+# Local Modules
+from fgpe.__main__ import parse_args
+from fgpe.ip_index import IPNetworkIndex
+from fgpe.locations import FallGuysLocation
+from fgpe.pinger import PingConnect, UDPProbeBackend
+from fgpe.survey import RegionLatency, RegionSurvey, format_survey, representative_hosts
+
+
+def test_representative_hosts():
+    index: IPNetworkIndex[FallGuysLocation] = IPNetworkIndex()
+    index.add_network(ip_network('10.0.0.0/24'), FallGuysLocation('EU', 'Frankfurt', 'AWS'))
+    index.add_network(ip_network('10.0.1.0/28'), FallGuysLocation('EU', 'Frankfurt', 'AWS'))
+    index.add_network(ip_network('10.1.0.0/24'), FallGuysLocation('EU', 'London', 'AWS'))
+    index.add_network(ip_network('10.2.0.7/32'), FallGuysLocation('US', 'Virginia', 'AWS'))
+    index.add_network(ip_network('10.3.0.0/24'), FallGuysLocation('Unknown', 'Unknown', 'Unknown'))
+    assert representative_hosts(index) == {'EU': ['10.0.1.1', '10.1.0.1'], 'US': ['10.2.0.7']}
+    assert representative_hosts(index, per_region=1) == {'EU': ['10.0.1.1'], 'US': ['10.2.0.7']}
+
+
+def test_survey_loopback(udp_echo_server):
+    ip, port = udp_echo_server
+    # Bound but never read, so probes to it time out like an unreachable region
+    silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    silent.bind(('127.0.0.1', 0))
+    silent_port = silent.getsockname()[1]
+    try:
+        hosts = {'Local': [f'{ip}:{port}', f'{ip}:{port}'], 'Nowhere': [f'127.0.0.1:{silent_port}']}
+        latencies = RegionSurvey(hosts, UDPProbeBackend(timeout=0.2)).survey()
+    finally:
+        silent.close()
+
+    assert latencies['Local'].replies == 2
+    assert latencies['Local'].probes == 2
+    assert latencies['Local'].host == f'{ip}:{port}'
+    assert latencies['Local'].ping_time is not None
+    assert latencies['Nowhere'] == RegionLatency('Nowhere', None, 0, 1, None)
+    assert format_survey(latencies).endswith(', Nowhere=-')
+
+
+class CountingBackend:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def probe(self, ip, port):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.02)
+        with self._lock:
+            self.in_flight -= 1
+        return PingConnect.CONNECTED, float(ip.rsplit('.', 1)[1])
+
+
+def test_survey_bounded_parallelism():
+    backend = CountingBackend()
+    hosts = {f'Region {i}': [f'127.0.0.{i * 4 + j}' for j in range(1, 5)] for i in range(5)}
+    latencies = RegionSurvey(hosts, backend, port=1, max_workers=3).survey()
+
+    assert backend.calls == 20
+    assert backend.max_in_flight == 3
+    assert latencies['Region 2'] == RegionLatency('Region 2', 9.0, 4, 4, '127.0.0.9')
+
+
+def test_survey_results_cached_for_ttl():
+    backend = CountingBackend()
+    survey = RegionSurvey(lambda: {'Local': ['127.0.0.1']}, backend, port=1, ttl=0.2)
+
+    first = survey.results()
+    assert survey.results() is first
+    assert backend.calls == 1
+
+    time.sleep(0.3)
+    assert survey.results() is not first
+    assert backend.calls == 2
+
+
+def test_survey_thread_reports_results():
+    results = []
+    survey = RegionSurvey({'Local': ['127.0.0.1']}, CountingBackend(), port=1, ttl=60, on_result=results.append)
+    survey.start()
+    deadline = time.monotonic() + 5
+    while not results and time.monotonic() < deadline:
+        time.sleep(0.01)
+    survey.stop()
+
+    assert results and results[0]['Local'].ping_time == 1.0
+    assert survey.latest is results[0]
+
+
+def test_format_survey_orders_by_ping():
+    latencies = {
+        'US': RegionLatency('US', 95.4, 1, 1, '10.0.0.1'),
+        'EU': RegionLatency('EU', 20.2, 1, 1, '10.0.1.1'),
+        'AS': RegionLatency('AS', None, 0, 1, None),
+    }
+    assert format_survey(latencies) == 'EU=20ms, US=95ms, AS=-'
+
+
+def test_socket_probe_survey_needs_a_port():
+    assert parse_args(['--survey']).survey
+    assert parse_args(['--survey', '--probe', 'udp', '--survey-port', '7777']).survey_port == 7777
+    for probe in ('tcp', 'udp'):
+        with pytest.raises(SystemExit):
+            parse_args(['--survey', '--probe', probe])
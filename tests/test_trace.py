@@ -0,0 +1,123 @@
+import time
+import pytest
+from fgpe.__main__ import Events
+from fgpe.stats import Stats
+from fgpe.pinger import PingConnect
+from fgpe.ping_worker import PingSample, PingWorker
+from fgpe.log_reader import ServerState, ConnectionDetails
+from fgpe.trace import (
+    LOG_RECORD, PING_RECORD, PROCESS_RECORD, RECORD, TraceRecord, TraceRecorder, read_trace, replay, main,
+)
+
+ASIA = ConnectionDetails('129.227.152.1', '7777')
+LOCAL = ConnectionDetails('2001:db8::1', '1234')
+NOT_CONNECTED = ConnectionDetails('0.0.0.0', '0')
+
+
+def record_session(path):
+    trace = TraceRecorder(path)
+    trace.process(True, 1.0)
+    trace.log_event(ServerState.CONNECTED, ASIA, 2.0)
+    for i, ping_time in enumerate((30, 50, None, 40)):
+        status = PingConnect.CONNECTED if ping_time is not None else PingConnect.NOT_CONNECTED
+        trace.ping(PingSample(3.0 + i, ASIA, status, ping_time))
+    trace.log_event(ServerState.CONNECTED, LOCAL, 8.0)
+    trace.ping(PingSample(9.0, LOCAL, PingConnect.CONNECTED, 12.5))
+    # A sample from the previous server arriving late is not part of the session
+    trace.ping(PingSample(9.5, ASIA, PingConnect.CONNECTED, 99.0))
+    trace.log_event(ServerState.NOT_CONNECTED, NOT_CONNECTED, 10.0)
+    trace.process(False, 11.0)
+    trace.close()
+    return trace
+
+
+def test_trace_round_trip(tmp_path):
+    path = tmp_path / 'trace.bin'
+    trace = record_session(path)
+
+    records = list(read_trace(path))
+    assert len(records) == trace.records == 11
+    assert records[0] == TraceRecord(PROCESS_RECORD, True, 1.0, NOT_CONNECTED, None)
+    assert records[1] == TraceRecord(LOG_RECORD, True, 2.0, ASIA, None)
+    assert records[2] == TraceRecord(PING_RECORD, True, 3.0, ASIA, 30.0)
+    assert records[4] == TraceRecord(PING_RECORD, False, 5.0, ASIA, None)
+    assert records[7] == TraceRecord(PING_RECORD, True, 9.0, LOCAL, 12.5)
+    assert records[-1] == TraceRecord(PROCESS_RECORD, False, 11.0, NOT_CONNECTED, None)
+
+
+def test_trace_appends_and_ignores_partial_record(tmp_path):
+    path = tmp_path / 'trace.bin'
+    record_session(path)
+    trace = TraceRecorder(path)
+    trace.process(True, 12.0)
+    trace.close()
+    with open(path, 'ab') as f:
+        f.write(b'\x01' * (RECORD.size // 2))
+
+    records = list(read_trace(path))
+    assert len(records) == 12
+    assert records[-1].timestamp == 12.0
+
+
+def test_trace_rejects_other_files(tmp_path):
+    path = tmp_path / 'trace.bin'
+    path.write_bytes(b'not a trace at all')
+    with pytest.raises(ValueError):
+        list(read_trace(path))
+    with pytest.raises(SystemExit):
+        main([str(path)])
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / 'missing.bin')])
+
+
+def test_recorder_moves_other_files_aside(tmp_path):
+    path = tmp_path / 'trace.bin'
+    path.write_bytes(b'not a trace at all')
+    trace = TraceRecorder(path)
+    trace.process(True, 1.0)
+    trace.close()
+    assert (tmp_path / 'trace.bin.old').read_bytes() == b'not a trace at all'
+    assert [record.timestamp for record in read_trace(path)] == [1.0]
+
+
+def test_replay(tmp_path):
+    path = tmp_path / 'trace.bin'
+    record_session(path)
+
+    result = replay(path)
+    assert result.records == 11
+    assert result.log_events == 3
+    assert result.samples == 5
+    assert result.regions['Asia East'] == 1
+    asia, local = result.sessions
+    assert (asia.ip, asia.port, asia.count, asia.min, asia.max, asia.loss) == ('129.227.152.1', '7777', 3, 30, 50, 0.25)
+    assert (local.ip, local.count, local.min) == ('2001:db8::1', 1, 12.5)
+
+
+class StubPinger:
+    def __init__(self, ip_address: str):
+        self.ip_address = ip_address
+
+    def get_ping_time(self):
+        return PingConnect.CONNECTED, 42.0
+
+
+def test_events_trace_replays_to_same_session(tmp_path, connect_line, stub_process_tracker, memory_store):
+    log = tmp_path / 'Player.log'
+    log.write_text(connect_line(ASIA.ip, ASIA.port))
+    path = tmp_path / 'trace.bin'
+    store = memory_store
+    events = Events(log_location=str(log), stats=Stats(store=store), trace=TraceRecorder(path))
+    events.has_first_run = True
+    events.process_tracker = stub_process_tracker()
+    events.ping_worker = PingWorker(interval=0.001, pinger_factory=StubPinger)
+
+    deadline = time.monotonic() + 5
+    while store.pings < 5 and time.monotonic() < deadline:
+        events.update_text()
+        time.sleep(0.005)
+    events.shutdown()
+
+    result = replay(path)
+    assert result.samples == store.pings
+    assert [session[2:] for session in result.sessions] == [session[2:] for session in store.sessions]
@@ -0,0 +1,68 @@
+import time
+from datetime import datetime
+from ipaddress import ip_network
+from fgpe.ip_index import IPNetworkIndex
+from fgpe.unknown_ips import UnknownIPStore
+
+OLD_FORMAT = (
+    'Time,IP Address\n'
+    '2021-01-02 10:00:00,203.0.113.5\n'
+    '2021-01-01 09:00:00,203.0.113.5\n'
+    '2021-01-03 11:00:00,198.51.100.7\n'
+)
+
+
+def test_old_format_is_merged_and_rewritten(tmp_path):
+    path = tmp_path / 'unknown_ip_addresses.csv'
+    path.write_text(OLD_FORMAT)
+    store = UnknownIPStore(path)
+    entry = store.ips['203.0.113.5']
+    assert (entry.first_seen, entry.last_seen, entry.count) == ('2021-01-01 09:00:00', '2021-01-02 10:00:00', 2)
+    assert len(store) == 2
+
+    store.close()
+    lines = path.read_text().splitlines()
+    assert lines[0] == 'Time,IP Address,Last Seen,Count'
+    assert lines[1] == '2021-01-01 09:00:00,203.0.113.5,2021-01-02 10:00:00,2'
+    assert len(lines) == 3
+
+
+def test_records_are_buffered_and_deduplicated(tmp_path):
+    path = tmp_path / 'unknown_ip_addresses.csv'
+    store = UnknownIPStore(path, flush_interval=60)
+    for hour in (1, 2, 3):
+        store.record('203.0.113.5', datetime(2021, 1, 1, hour))
+    assert not path.exists()
+
+    store.close()
+    assert UnknownIPStore(path).ips['203.0.113.5'].count == 3
+    assert path.read_text().splitlines()[1] == '2021-01-01 01:00:00,203.0.113.5,2021-01-01 03:00:00,3'
+
+
+def test_reclassify_against_added_networks(tmp_path):
+    old = IPNetworkIndex()
+    old.add_network(ip_network('192.0.2.0/24'), 'old')
+    new = IPNetworkIndex()
+    new.add_network(ip_network('192.0.2.0/24'), 'old')
+    new.add_network(ip_network('203.0.113.0/24'), 'new')
+    added = new.added_since(old)
+    assert [value for *_, value in added.entries()] == ['new']
+
+    store = UnknownIPStore(tmp_path / 'unknown_ip_addresses.csv')
+    store.record('203.0.113.5')
+    store.record('198.51.100.7')
+    assert store.reclassify(added) == ['203.0.113.5']
+    assert '203.0.113.5' not in store and '198.51.100.7' in store
+    assert '203.0.113.5' not in (tmp_path / 'unknown_ip_addresses.csv').read_text()
+
+
+def test_records_are_written_without_close(tmp_path):
+    path = tmp_path / 'unknown_ip_addresses.csv'
+    store = UnknownIPStore(path, flush_interval=0.05)
+    store.record('203.0.113.5')
+    store.record('203.0.113.6')
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(path.read_text().splitlines()) == 3
+    store.close()